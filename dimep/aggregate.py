@@ -0,0 +1,259 @@
+"""Constant-memory aggregation of estimates across a session
+
+Estimates are consumed in batches, e.g. as returned by :func:`dimep.api.all` or by the batched algorithms, and summarized without keeping them in memory. Mean and variance are tracked with Welford's algorithm, quantiles with a mergeable sketch with bounded relative error. Partial aggregates, e.g. from parallel workers, can be merged and give the same result as if all estimates had been consumed by a single aggregate.
+
+Example::
+
+    from dimep.aggregate import Session
+    session = Session()
+    for subject, condition, trace in recordings:
+        session.update(all(trace, tms_sampleidx=1000), subject, condition)
+    session[subject, condition]["chen"].summary()
+"""
+from numpy import ndarray
+import numpy as np
+from math import log
+from typing import Dict, Hashable, Iterator, Mapping, Sequence, Tuple, Union
+
+Estimates = Union[float, Sequence[float], ndarray]
+
+
+class QuantileSketch:
+    """a mergeable quantile sketch with bounded relative error
+
+    Values are counted in logarithmically spaced buckets, so that every quantile is estimated with a relative error of at most `relative_accuracy`. Memory is bounded by `max_buckets` per sign. If more buckets would be needed, the buckets closest to zero are collapsed into the smallest remaining one, and quantiles among these smallest magnitudes are no longer within `relative_accuracy`. Merging two sketches adds their bucket counts. A collapse always keeps the `max_buckets` largest buckets ever seen, so the result does not depend on the order of updates and merges, and is identical to a single sketch of all values, including its loss of accuracy after a collapse.
+
+    args
+    ----
+    relative_accuracy: float
+        the maximal relative error of the estimated quantiles
+    max_buckets: int
+        the maximal number of buckets for positive and negative values each
+    min_value: float
+        absolute values below this are counted as zero
+    """
+
+    def __init__(
+        self,
+        relative_accuracy: float = 0.01,
+        max_buckets: int = 2048,
+        min_value: float = 1e-9,
+    ):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.min_value = min_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = log(self.gamma)
+        self.positive: Dict[int, int] = dict()
+        self.negative: Dict[int, int] = dict()
+        self.zero = 0
+        self.count = 0
+
+    def _add(self, store: Dict[int, int], magnitudes: ndarray):
+        keys = np.ceil(np.log(magnitudes) / self._log_gamma).astype(int)
+        for key, count in zip(*np.unique(keys, return_counts=True)):
+            store[int(key)] = store.get(int(key), 0) + int(count)
+        self._collapse(store)
+
+    def _collapse(self, store: Dict[int, int]):
+        if len(store) <= self.max_buckets:
+            return
+        # collapse the buckets closest to zero into the smallest remaining.
+        # Each value ends in the larger of its own bucket and the
+        # max_buckets-th largest bucket seen, independent of order
+        keys = sorted(store.keys())
+        smallest = keys[len(keys) - self.max_buckets]
+        for key in keys[: len(keys) - self.max_buckets]:
+            store[smallest] += store.pop(key)
+
+    def update(self, values: Estimates):
+        "add a batch of finite values to the sketch"
+        data = np.asarray(values, dtype=float).ravel()
+        data = data[np.isfinite(data)]
+        small = np.abs(data) < self.min_value
+        self.zero += int(np.sum(small))
+        self._add(self.positive, data[(data > 0) & ~small])
+        self._add(self.negative, -data[(data < 0) & ~small])
+        self.count += data.shape[0]
+
+    def merge(self, other: "QuantileSketch"):
+        "add the counts of another sketch with identical parameters"
+        if (
+            other.relative_accuracy != self.relative_accuracy
+            or other.min_value != self.min_value
+        ):
+            raise ValueError("Can only merge sketches with identical accuracy")
+        for store, others in (
+            (self.positive, other.positive),
+            (self.negative, other.negative),
+        ):
+            for key, count in others.items():
+                store[key] = store.get(key, 0) + count
+            self._collapse(store)
+        self.zero += other.zero
+        self.count += other.count
+
+    def _value(self, key: int) -> float:
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def quantile(self, q: float) -> float:
+        "estimate the q-th quantile, with q between 0 and 1"
+        if self.count == 0:
+            return np.nan
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.negative.keys(), reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self.zero
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive.keys()):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.positive.keys()))
+
+
+class Aggregate:
+    """running summary statistics of the estimates of a single algorithm
+
+    Tracks the number of estimates, their mean and variance (Welford), their quantiles (see :class:`QuantileSketch`) and how many estimates indicated a response, i.e. were larger than zero. Non-finite estimates, e.g. from invalid trials, are only counted as missing.
+
+    args
+    ----
+    relative_accuracy: float
+        the maximal relative error of the estimated quantiles
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.responses = 0
+        self.missing = 0
+        self.sketch = QuantileSketch(relative_accuracy=relative_accuracy)
+
+    def _combine(self, count: int, mean: float, m2: float):
+        # Chan et al.'s pairwise update, identical to Welford for count == 1
+        total = self.count + count
+        if total == 0:
+            return
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta ** 2 * self.count * count / total
+        self.count = total
+
+    def update(self, estimates: Estimates):
+        "consume a batch of estimates"
+        data = np.asarray(estimates, dtype=float).ravel()
+        finite = np.isfinite(data)
+        self.missing += int(np.sum(~finite))
+        data = data[finite]
+        if data.shape[0] == 0:
+            return
+        mean = float(data.mean())
+        m2 = float(np.sum((data - mean) ** 2))
+        self._combine(data.shape[0], mean, m2)
+        self.responses += int(np.sum(data > 0))
+        self.sketch.update(data)
+
+    def merge(self, other: "Aggregate"):
+        "merge a partial aggregate, e.g. from another worker, into this one"
+        self._combine(other.count, other.mean, other.m2)
+        self.responses += other.responses
+        self.missing += other.missing
+        self.sketch.merge(other.sketch)
+
+    @property
+    def var(self) -> float:
+        "the sample variance (ddof=1) of all estimates"
+        return self.m2 / (self.count - 1) if self.count > 1 else np.nan
+
+    @property
+    def std(self) -> float:
+        "the sample standard deviation (ddof=1) of all estimates"
+        return float(np.sqrt(self.var))
+
+    @property
+    def response_rate(self) -> float:
+        "the fraction of estimates indicating a response, i.e. larger than 0"
+        return self.responses / self.count if self.count > 0 else np.nan
+
+    def quantile(self, q: float) -> float:
+        "estimate the q-th quantile, with q between 0 and 1"
+        return self.sketch.quantile(q)
+
+    def summary(
+        self, quantiles: Tuple[float, ...] = (0.25, 0.5, 0.75)
+    ) -> Dict[str, float]:
+        "summarize the aggregate as a dictionary"
+        out = dict(
+            count=float(self.count),
+            missing=float(self.missing),
+            mean=self.mean if self.count > 0 else np.nan,
+            var=self.var,
+            std=self.std,
+            response_rate=self.response_rate,
+        )
+        for q in quantiles:
+            out[f"q{q:g}"] = self.quantile(q)
+        return out
+
+
+class Session(Mapping):
+    """aggregates of all algorithms, grouped e.g. by subject and condition
+
+    Maps each group to a dictionary of :class:`Aggregate`, with the algorithm name as key.
+
+    args
+    ----
+    relative_accuracy: float
+        the maximal relative error of the estimated quantiles
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self._groups: Dict[Hashable, Dict[str, Aggregate]] = dict()
+
+    def __getitem__(self, group: Hashable) -> Dict[str, Aggregate]:
+        return self._groups[group]
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self._groups)
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    def _group(self, group: Hashable) -> Dict[str, Aggregate]:
+        return self._groups.setdefault(group, dict())
+
+    def update(
+        self, estimates: Mapping[str, Estimates], *group: Hashable
+    ) -> None:
+        """consume a batch of estimates
+
+        args
+        ----
+        estimates: Mapping[str, Estimates]
+            a single estimate or a batch of estimates, with the algorithm name as key
+        group: Hashable
+            the group these estimates belong to, e.g. subject and condition
+        """
+        aggregates = self._group(group)
+        for algo, values in estimates.items():
+            if algo not in aggregates:
+                aggregates[algo] = Aggregate(self.relative_accuracy)
+            aggregates[algo].update(values)
+
+    def merge(self, other: "Session") -> None:
+        "merge a partial session, e.g. from another worker, into this one"
+        for group, others in other.items():
+            aggregates = self._group(group)
+            for algo, aggregate in others.items():
+                if algo not in aggregates:
+                    aggregates[algo] = Aggregate(self.relative_accuracy)
+                aggregates[algo].merge(aggregate)
@@ -6,8 +6,50 @@ Bawa, P., J.D. Hamm, P. Dhillon, and P.A. Gross. “Bilateral Responses of Upper
 """
 import numpy as np
 from numpy import ndarray, inf
-from typing import Tuple
-from math import ceil
+from typing import Tuple, Union, overload
+from math import ceil, isfinite
+from dimep.result import Literal, Result, detailed
+from dimep.tools import bounded
+
+
+@overload
+def bawa(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    mep_window_in_ms: Tuple[float, float] = ...,
+    details: Literal[False] = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> float:
+    ...
+
+
+@overload
+def bawa(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    mep_window_in_ms: Tuple[float, float] = ...,
+    *,
+    details: Literal[True],
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> Result:
+    ...
+
+
+@overload
+def bawa(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    mep_window_in_ms: Tuple[float, float] = ...,
+    details: bool = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> Union[float, Result]:
+    ...
 
 
 def bawa(
@@ -15,7 +57,10 @@ def bawa(
     tms_sampleidx: int,
     fs: float = 1000,
     mep_window_in_ms: Tuple[float, float] = (0, inf),
-) -> float:
+    details: bool = False,
+    horizon_in_ms: float = inf,
+    baseline_in_ms: float = inf,
+) -> Union[float, Result]:
     """Estimate the peak-to-peak amplitude of an iMEP based on Bawa 2004
 
     Calculates the PtP-Amplitude of the unrectified EMG from 
@@ -30,6 +75,12 @@ def bawa(
         the sampling rate of the signal
     mep_window_in_ms: Tuple[float, float]
         the search window after TMS to look for an iMEP. The manuscript did not specify a restricted search window, and by default we search the whole trace, starting from the TMS to the end of the supplied samples.
+    details: bool
+        whether to return a :class:`~dimep.result.Result` with the intermediates of the estimation instead of the bare estimate. defaults to False
+    horizon_in_ms: float
+        the maximal duration after TMS which is analysed. Later samples are ignored, so the cost of a call does not grow with the length of the trace. Defaults to inf, i.e. the whole trace after TMS, so the cost is only bounded if a finite horizon is passed
+    baseline_in_ms: float
+        the maximal duration before TMS which is analysed. Earlier samples are ignored. Defaults to inf, i.e. the whole trace before TMS
 
     returns
     -------
@@ -47,10 +98,21 @@ def bawa(
         :func:`~.odergreen` and :func:`~.lewis` also return the PtP amplitude, but only if they are formally discernible
 
     """
+    if isfinite(horizon_in_ms) or isfinite(baseline_in_ms):
+        return bounded(
+            bawa,
+            trace,
+            tms_sampleidx,
+            fs,
+            horizon_in_ms,
+            baseline_in_ms,
+            mep_window_in_ms=mep_window_in_ms,
+            details=details,
+        )
     a = tms_sampleidx + ceil(mep_window_in_ms[0] * fs / 1000)
     # b should not be higher then the len of the trace
     b = ceil(
         min((tms_sampleidx + (mep_window_in_ms[1] * fs / 1000)), len(trace))
     )
-    return np.ptp(trace[a:b])
+    return detailed(details, np.ptp(trace[a:b]), trace, onset=a, offset=b)
 
@@ -6,14 +6,66 @@ iMEP = (iMEPAREA - EMGAREA) x 1,000
 where iMEPAREA is the area calculated between iMEP onset and offset latencies, EMGAREA isthe background EMG area calculated over the same duration as the iMEPAREA, converted to mV·s. 
 """
 from numpy import ndarray
-from typing import Tuple
+from typing import Tuple, Union, overload
 import numpy as np
-from math import ceil
+from math import ceil, inf, isfinite
+from dimep.result import Literal, Result, detailed
+from dimep.tools import bounded
 
 
+@overload
 def bradnam(
-    trace: ndarray, tms_sampleidx: int, fs: float = 1000, unit: float = 1.0
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    unit: float = ...,
+    details: Literal[False] = ...,
+    baseline: Union[Tuple[float, float], None] = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
 ) -> float:
+    ...
+
+
+@overload
+def bradnam(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    unit: float = ...,
+    *,
+    details: Literal[True],
+    baseline: Union[Tuple[float, float], None] = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> Result:
+    ...
+
+
+@overload
+def bradnam(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    unit: float = ...,
+    details: bool = ...,
+    baseline: Union[Tuple[float, float], None] = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> Union[float, Result]:
+    ...
+
+
+def bradnam(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = 1000,
+    unit: float = 1.0,
+    details: bool = False,
+    baseline: Union[Tuple[float, float], None] = None,
+    horizon_in_ms: float = inf,
+    baseline_in_ms: float = inf,
+) -> Union[float, Result]:
     """Estimate the normalized area of an iMEP based on Bradnam 2010
 
     Similar to :func:`~.chen`, the iMEP area is calculated from the rectified EMG, if at least 5ms are 1SD above the mean of the baseline. In addition, the window looking for an iMEP is limited to 10 to 30ms after the TMS (see :func:`~.lewis`) and the value for an area of identical duration during the baseline period immediatly before the TMS is subtracted and multiplied by 1000:
@@ -32,6 +84,14 @@ def bradnam(
         te units of the data relative to microvolts, e.g.
             - if the unit is mV -> 1000
             - if the unit is µV -> 1
+    details: bool
+        whether to return a :class:`~dimep.result.Result` with the intermediates of the estimation instead of the bare estimate. defaults to False
+    baseline: Union[Tuple[float, float], None]
+        the precomputed mean and SD of the rectified baseline period, e.g. from :func:`~.chen_baseline`. If None, they are calculated from the trace
+    horizon_in_ms: float
+        the maximal duration after TMS which is analysed. Later samples are ignored, so the cost of a call does not grow with the length of the trace. Defaults to inf, i.e. the whole trace after TMS, so the cost is only bounded if a finite horizon is passed
+    baseline_in_ms: float
+        the maximal duration before TMS which is analysed. Earlier samples are ignored, but never those of the baseline from -100 to 0ms. Defaults to inf, i.e. the whole trace before TMS
     returns
     -------
     amplitude:float
@@ -48,17 +108,30 @@ def bradnam(
         :func:`~.lewis` measures the PtP amplitude of an iMEP in the window 10 to 30 ms after TMS if it passes specific criterions.
 
     """
-    from dimep.algo.chen import chen_onoff
+    if isfinite(horizon_in_ms) or isfinite(baseline_in_ms):
+        return bounded(
+            bradnam,
+            trace,
+            tms_sampleidx,
+            fs,
+            horizon_in_ms,
+            baseline_in_ms,
+            unit=unit,
+            details=details,
+            baseline=baseline,
+        )
+    from dimep.algo.chen import _chen_onoff
 
     # inspected for iMEPs between 10 and 30 ms poststimulus,
     # For each subject, the surface EMG from the right FDI muscle for each
     # stimulus intensity and coil orientation were rectified and averaged.
 
-    onset, offset = chen_onoff(
+    onset, offset, bl_m, bl_s, threshold = _chen_onoff(
         trace=trace,
         tms_sampleidx=tms_sampleidx,
         mep_window_in_ms=(10, 30),
         fs=fs,
+        baseline=baseline,
     )
     # For each subject, the surface EMG from the right FDI muscle for each
     # stimulus intensity and coil orientation were rectified and averaged.
@@ -77,5 +150,14 @@ def bradnam(
     # this would be the case if me divivde by fs, not necessarily 1000:
     # therefore
     area = ((iMEPArea - EMGArea) / fs) * 1000 / (1 / unit * 1000)
-    return max((area, 0.0))
+    return detailed(
+        details,
+        max((area, 0.0)),
+        trace,
+        onset=onset,
+        offset=offset,
+        bl_m=bl_m,
+        bl_s=bl_s,
+        threshold=threshold,
+    )
 
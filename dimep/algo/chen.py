@@ -4,18 +4,62 @@ Because  iMEP  and  iSP  were  generally  of  small amplitude  and  were  variab
 #NOTE for ISP and iMEP, different inequalities are given, but the sample-wise description is identical. 
 """
 from numpy import ndarray, inf
-from typing import Tuple
-from math import ceil
-from dimep.tools import bw_boundaries
+from typing import Tuple, Union, overload
+from math import ceil, isfinite
+from dimep.tools import (
+    bounded,
+    bw_boundaries,
+    coarse_blocksize,
+    coarse_first,
+    coarse_runs,
+)
+from dimep.result import Literal, Result, detailed
 import numpy as np
 
 
+def chen_baseline(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = 1000,
+    baseline_duration_in_ms: float = 100,
+) -> Tuple[float, float]:
+    """Estimate the mean and SD of the rectified baseline based on Chen 2003
+
+    The baseline statistics are shared by :func:`~.chen` and :func:`~.bradnam` and can be calculated once and passed to both.
+
+    args
+    ----
+    trace:ndarray
+        the one-dimensional (samples,) EMG signal
+    tms_sampleidx: int
+        the sample at which the TMS pulse was applied
+    fs:float
+        the sampling rate of the signal
+    baseline_duration_in_ms: float
+        the duration of the baseline period immediatly before TMS
+
+    returns
+    -------
+    baseline:Tuple[float, float]
+        the mean and SD of the rectified baseline
+
+    """
+    # The mean and SD of the baseline EMG level for 100 ms before TMS  was
+    # determined.
+    # NOTE: Formula for SD calculation not given in paper
+    baseline_start = tms_sampleidx - ceil(baseline_duration_in_ms * fs / 1000)
+    baseline = np.abs(trace[baseline_start:tms_sampleidx])
+    return baseline.mean(), baseline.std(ddof=1)
+
+
 def chen_onoff(
     trace: ndarray,
     tms_sampleidx: int,
     fs: float = 1000,
     mep_window_in_ms: Tuple[float, float] = (0, inf),
     baseline_duration_in_ms: float = 100,
+    baseline: Union[Tuple[float, float], None] = None,
+    coarse_in_ms: Union[float, None] = None,
 ) -> Tuple[int, int]:
     """Estimate iMEP onset and offset based on Chen 2003
     
@@ -31,6 +75,10 @@ def chen_onoff(
         the search window after TMS to look for an iMEP
     baseline_duration_in_ms: float
         the duration of the baseline period immediatly before TMS
+    baseline: Union[Tuple[float, float], None]
+        the precomputed mean and SD of the rectified baseline period, e.g. from :func:`~.chen_baseline`. If None, they are calculated from the trace
+    coarse_in_ms: Union[float, None]
+        the duration of the blocks for an opt-in coarse-to-fine detection, e.g. 1ms. This gives identical results, but is faster at high sampling rates. If None, every sample is scanned
 
     returns
     -------
@@ -38,19 +86,38 @@ def chen_onoff(
         the iMEP onset and offset
 
     """
+    onset, offset, _, _, _ = _chen_onoff(
+        trace,
+        tms_sampleidx,
+        fs,
+        mep_window_in_ms,
+        baseline_duration_in_ms,
+        baseline,
+        coarse_in_ms,
+    )
+    return (onset, offset)
+
+
+def _chen_onoff(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = 1000,
+    mep_window_in_ms: Tuple[float, float] = (0, inf),
+    baseline_duration_in_ms: float = 100,
+    baseline: Union[Tuple[float, float], None] = None,
+    coarse_in_ms: Union[float, None] = None,
+) -> Tuple[int, int, float, float, float]:
+    "onset and offset, together with baseline mean, SD and threshold"
     # For each subject, the surface EMG from the right FDI muscle for each
     # stimulus intensity and coil orientation were rectified and averaged.
     rect = np.abs(trace)
 
     # select baseline and response
-
-    # The mean and SD of the baseline EMG level for 100 ms before TMS  was
-    # determined.
-    # NOTE: Formula for SD calculation not given in paper
-    baseline_start = tms_sampleidx - ceil(baseline_duration_in_ms * fs / 1000)
-    baseline = rect[baseline_start:tms_sampleidx]
-    bl_m = baseline.mean()
-    bl_s = baseline.std(ddof=1)
+    if baseline is None:
+        baseline = chen_baseline(
+            trace, tms_sampleidx, fs, baseline_duration_in_ms
+        )
+    bl_m, bl_s = baseline
     threshold = bl_m + 1 * bl_s
 
     # find the peak, which needs to exceed the prestimulus mean by >1 SD
@@ -58,6 +125,14 @@ def chen_onoff(
     maxlatency = mep_window_in_ms[1] * fs / 1000
     maxlatency = ceil(min(maxlatency, len(trace) - tms_sampleidx))
     response = rect[tms_sampleidx + minlatency : tms_sampleidx + maxlatency]
+    if coarse_in_ms is not None:
+        onoff = _chen_coarse(
+            response, threshold, bl_m, fs, coarse_blocksize(coarse_in_ms, fs)
+        )
+        if onoff is None:
+            return (0, 0, bl_m, bl_s, threshold)
+        start = tms_sampleidx + minlatency
+        return (start + onoff[0], start + onoff[1], bl_m, bl_s, threshold)
     L = bw_boundaries(response > threshold)
     n = max(L)
     peak_onset = None
@@ -70,7 +145,7 @@ def chen_onoff(
     # iMEP onset was defined as last crossing of the mean baseline EMG level
     # before the iMEP peak
     if peak_onset is None:
-        return (0, 0)
+        return (0, 0, bl_m, bl_s, threshold)
     else:
         onoff = response > bl_m
 
@@ -93,10 +168,95 @@ def chen_onoff(
             if v == 0:
                 break
         offset = tms_sampleidx + minlatency + peak_onset + ix
-        return (onset, offset)
+        return (onset, offset, bl_m, bl_s, threshold)
+
+
+def _chen_coarse(
+    response: ndarray,
+    threshold: float,
+    bl_m: float,
+    fs: float,
+    blocksize: int,
+) -> Union[Tuple[int, int], None]:
+    "the coarse-to-fine equivalent of the scan in _chen_onoff, relative to the response"
+    peak_onset = None
+    for first, after in coarse_runs(response, threshold, blocksize):
+        if ((after - first) / fs) * 1000 >= 5:
+            peak_onset = first
+            break
+    if peak_onset is None:
+        return None
+    # the sample after the last crossing of the mean before the peak. If
+    # there is none, the backwards scan stops at the second sample
+    crossing = coarse_first(
+        response, bl_m, blocksize, "not >", stop=peak_onset, last=True
+    )
+    if crossing >= 0:
+        onset = crossing + 1
+    else:
+        onset = min(peak_onset, 1)
+    # the first crossing after the peak. If there is none, the forwards scan
+    # stops at the last sample
+    crossing = coarse_first(
+        response, bl_m, blocksize, "not >", start=peak_onset
+    )
+    offset = len(response) - 1 if crossing < 0 else crossing
+    return (onset, offset)
 
 
-def chen(trace: ndarray, tms_sampleidx: int, fs: float = 1000) -> float:
+@overload
+def chen(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    details: Literal[False] = ...,
+    baseline: Union[Tuple[float, float], None] = ...,
+    coarse_in_ms: Union[float, None] = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> float:
+    ...
+
+
+@overload
+def chen(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    *,
+    details: Literal[True],
+    baseline: Union[Tuple[float, float], None] = ...,
+    coarse_in_ms: Union[float, None] = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> Result:
+    ...
+
+
+@overload
+def chen(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    details: bool = ...,
+    baseline: Union[Tuple[float, float], None] = ...,
+    coarse_in_ms: Union[float, None] = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> Union[float, Result]:
+    ...
+
+
+def chen(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = 1000,
+    details: bool = False,
+    baseline: Union[Tuple[float, float], None] = None,
+    coarse_in_ms: Union[float, None] = None,
+    horizon_in_ms: float = inf,
+    baseline_in_ms: float = inf,
+) -> Union[float, Result]:
     """Estimate the area of a an iMEP based on Chen 2003
 
     The iMEP area is calculated from the rectified EMG, if at least 5ms are 1SD above the mean of the baseline.
@@ -110,6 +270,16 @@ def chen(trace: ndarray, tms_sampleidx: int, fs: float = 1000) -> float:
         the sample at which the TMS pulse was applied
     fs:float
         the sampling rate of the signal
+    details: bool
+        whether to return a :class:`~dimep.result.Result` with the intermediates of the estimation instead of the bare estimate. defaults to False
+    baseline: Union[Tuple[float, float], None]
+        the precomputed mean and SD of the rectified baseline period, e.g. from :func:`~.chen_baseline`. If None, they are calculated from the trace
+    coarse_in_ms: Union[float, None]
+        the duration of the blocks for an opt-in coarse-to-fine detection, e.g. 1ms. This gives identical results, but is faster at high sampling rates. If None, every sample is scanned
+    horizon_in_ms: float
+        the maximal duration after TMS which is analysed. Later samples are ignored, so the cost of a call does not grow with the length of the trace. Defaults to inf, i.e. the whole trace after TMS, so the cost is only bounded if a finite horizon is passed
+    baseline_in_ms: float
+        the maximal duration before TMS which is analysed. Earlier samples are ignored, but never those of the baseline from -100 to 0ms. Defaults to inf, i.e. the whole trace before TMS
 
     returns
     -------
@@ -126,11 +296,38 @@ def chen(trace: ndarray, tms_sampleidx: int, fs: float = 1000) -> float:
         :py:func:`~.bradnam` is based on :func:`~.chen` but normalizes the iMEP amplitude by baseline EMG activity
 
     """
+    if isfinite(horizon_in_ms) or isfinite(baseline_in_ms):
+        return bounded(
+            chen,
+            trace,
+            tms_sampleidx,
+            fs,
+            horizon_in_ms,
+            baseline_in_ms,
+            details=details,
+            baseline=baseline,
+            coarse_in_ms=coarse_in_ms,
+        )
     # We factored the determination of onset and offset out of this function, # because it will also be used for :func:`~.bradnam`
-    onset, offset = chen_onoff(trace=trace, tms_sampleidx=tms_sampleidx, fs=fs)
+    onset, offset, bl_m, bl_s, threshold = _chen_onoff(
+        trace=trace,
+        tms_sampleidx=tms_sampleidx,
+        fs=fs,
+        baseline=baseline,
+        coarse_in_ms=coarse_in_ms,
+    )
 
     # For each subject, the surface EMG from the right FDI muscle for each
     # stimulus intensity and coil orientation were rectified and averaged.
     response = np.abs(trace)
     iMEPArea = np.sum(response[onset:offset])
-    return iMEPArea
+    return detailed(
+        details,
+        iMEPArea,
+        trace,
+        onset=onset,
+        offset=offset,
+        bl_m=bl_m,
+        bl_s=bl_s,
+        threshold=threshold,
+    )
@@ -2,6 +2,14 @@ import numpy as np
 from numpy import ndarray
 from scipy.interpolate import interp1d
 from scipy.linalg import norm
+from scipy.fft import rfft, irfft, next_fast_len
+from scipy.signal import correlate
+from functools import lru_cache
+from typing import Sequence, Tuple, Union, overload
+from dimep.result import Literal, Result, detailed
+from math import ceil, floor, inf, isfinite
+from dimep.tools import as_trials, bounded
+from dimep.ragged import Ragged
 
 template: ndarray = np.array(
     [
@@ -112,8 +120,17 @@ template: ndarray = np.array(
 )
 
 
+#: the approximate number of bytes of the cross-correlations of one FFT pass of :func:`match_bank`
+BANK_BYTES = 2 ** 26
+
+
 def get_template(fs: float) -> ndarray:
     "return the template at the requested sampling rate"
+    return _get_template(float(fs)).copy()
+
+
+@lru_cache(maxsize=16)
+def _get_template(fs: float) -> ndarray:
     if fs == 1000.0:
         return template / norm(template)  # type: ignore
 
@@ -124,9 +141,87 @@ def get_template(fs: float) -> ndarray:
     return itemplate / norm(itemplate)  # type: ignore
 
 
+def get_bank(fs: float, widths: Sequence[float] = (0.8, 1.0, 1.25)) -> ndarray:
+    """return a bank of templates of different widths
+
+    The template is stretched (or compressed) in time by each factor in widths, normalized, and zero-padded to the length of the widest template.
+
+    args
+    ----
+    fs:float
+        the sampling rate of the signal
+    widths: Sequence[float]
+        the factors by which the duration of the template is scaled
+
+    returns
+    -------
+    bank: ndarray
+        the (templates, samples) bank, to be used with :func:`match_template`
+    """
+    templates = [get_template(fs * width) for width in widths]
+    bank = np.zeros((len(templates), max(len(t) for t in templates)))
+    for row, t in zip(bank, templates):
+        row[: len(t)] = t
+    return bank
+
+
+@overload
 def guggenberger(
-    trace: ndarray, tms_sampleidx: int, fs: float = 1000,
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    details: Literal[False] = ...,
+    template: Union[ndarray, None] = ...,
+    latency_in_ms: Union[Tuple[float, float], None] = ...,
+    normalization: str = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
 ) -> float:
+    ...
+
+
+@overload
+def guggenberger(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    *,
+    details: Literal[True],
+    template: Union[ndarray, None] = ...,
+    latency_in_ms: Union[Tuple[float, float], None] = ...,
+    normalization: str = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> Result:
+    ...
+
+
+@overload
+def guggenberger(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    details: bool = ...,
+    template: Union[ndarray, None] = ...,
+    latency_in_ms: Union[Tuple[float, float], None] = ...,
+    normalization: str = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> Union[float, Result]:
+    ...
+
+
+def guggenberger(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = 1000,
+    details: bool = False,
+    template: Union[ndarray, None] = None,
+    latency_in_ms: Union[Tuple[float, float], None] = None,
+    normalization: str = "global",
+    horizon_in_ms: float = inf,
+    baseline_in_ms: float = inf,
+) -> Union[float, Result]:
     """Estimate amplitude of an iMEP based on Guggenberger (in preparation) 
 
     Based on the maximal cross-correlation of the signal with the template
@@ -141,11 +236,23 @@ def guggenberger(
         the sample at which the TMS pulse was applied
     fs:float
         the sampling rate of the signal
-    
+    details: bool
+        whether to return a :class:`~dimep.result.Result` with the intermediates of the estimation instead of the bare estimate. defaults to False
+    template: Union[ndarray, None]
+        the template, or a (templates, samples) bank of templates of which the best matching one is used. Defaults to the template at the sampling rate fs
+    latency_in_ms: Union[Tuple[float, float], None]
+        the range of plausible latencies of the iMEP onset after TMS. Only lags within this range are evaluated, directly or by FFT depending on their number. Defaults to None, i.e. every lag at which the template overlaps the post-stimulus signal
+    normalization: str
+        "global" divides the post-stimulus signal by its norm, so large artifacts anywhere after TMS shrink the score. "local" divides the cross-correlation at each lag by the norm of the signal within the template window, computed from running sums, i.e. the cosine similarity of the template with each window. Defaults to "global"
+    horizon_in_ms: float
+        the maximal duration after TMS which is analysed. Later samples are ignored, so the cost of a call does not grow with the length of the trace. Defaults to inf, i.e. the whole trace after TMS, so the cost is only bounded if a finite horizon is passed
+    baseline_in_ms: float
+        the maximal duration before TMS which is analysed. Earlier samples are ignored. Defaults to inf, i.e. the whole trace before TMS
+
     returns
     -------
     iMEP: float
-        the maximal cross-correlation score of the iMEP
+        the maximal cross-correlation score of the iMEP. The lag of the best match relative to TMS in samples is reported as `lag` of the :class:`~dimep.result.Result`
 
 
     .. admonition:: Reference
@@ -154,13 +261,268 @@ def guggenberger(
     
 
     """
-    template = get_template(fs)
-    return match_template(template, trace, tms_sampleidx, fs)
+    if isfinite(horizon_in_ms) or isfinite(baseline_in_ms):
+        return bounded(
+            guggenberger,
+            trace,
+            tms_sampleidx,
+            fs,
+            horizon_in_ms,
+            baseline_in_ms,
+            details=details,
+            template=template,
+            latency_in_ms=latency_in_ms,
+            normalization=normalization,
+        )
+    if template is None:
+        template = get_template(fs)
+    if template.ndim == 2:
+        scores, _, lags = match_bank(
+            template,
+            trace,
+            tms_sampleidx,
+            fs,
+            latency_in_ms=latency_in_ms,
+            normalization=normalization,
+        )
+        score, lag = scores[0], int(lags[0])
+    else:
+        score, lag = _match_template(
+            template, trace, tms_sampleidx, fs, latency_in_ms, normalization
+        )
+    onset = tms_sampleidx + lag
+    return detailed(
+        details,
+        score,
+        trace,
+        onset=max(onset, 0),
+        offset=onset + template.shape[0],
+        lag=lag,
+    )
 
 
 def match_template(
-    template: ndarray, trace: ndarray, tms_sampleidx: int, fs: float = 1000,
+    template: ndarray,
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = 1000,
+    latency_in_ms: Union[Tuple[float, float], None] = None,
+    normalization: str = "global",
 ) -> float:
+    """the maximal absolute cross-correlation of the trace with the template
+
+    args
+    ----
+    template:ndarray
+        a normalized one-dimensional (samples,) template. For a (templates, samples) bank of templates, use :func:`match_bank`
+    trace:ndarray
+        the one-dimensional (samples,) EMG signal
+    tms_sampleidx: int
+        the sample at which the TMS pulse was applied
+    fs:float
+        the sampling rate of the signal
+    latency_in_ms: Union[Tuple[float, float], None]
+        the range of plausible latencies of the iMEP onset after TMS. Only lags within this range are evaluated, directly or by FFT depending on their number. Defaults to None, i.e. every lag at which the template overlaps the post-stimulus signal
+    normalization: str
+        "global" divides the post-stimulus signal by its norm, so large artifacts anywhere after TMS shrink the score. "local" divides the cross-correlation at each lag by the norm of the signal within the template window, computed from running sums, i.e. the cosine similarity of the template with each window. Defaults to "global"
+
+    returns
+    -------
+    score: float
+        the maximal cross-correlation score
+    """
+    if np.ndim(template) != 1:
+        raise ValueError("Use match_bank for a bank of templates")
+    return float(
+        _match_template(
+            template, trace, tms_sampleidx, fs, latency_in_ms, normalization
+        )[0]
+    )
+
+
+def match_bank(
+    bank: ndarray,
+    traces: Union[ndarray, Ragged],
+    tms_sampleidx: Union[int, ndarray],
+    fs: float = 1000,
+    axis: int = -1,
+    latency_in_ms: Union[Tuple[float, float], None] = None,
+    normalization: str = "global",
+    chunksize: Union[int, None] = None,
+) -> Tuple[ndarray, ndarray, ndarray]:
+    """score every trace against every template of a bank
+
+    All cross-correlations are calculated in batched FFT passes over chunks of trials. The spectrum of each trace and of each template is calculated only once, and only the elementwise product of the spectra scales with the number of trials times the number of templates.
+
+    args
+    ----
+    bank:ndarray
+        the (templates, samples) bank of templates, e.g. from :func:`get_bank`. Each template is normalized to unit norm, so scores are comparable across templates
+    traces: Union[ndarray, Ragged]
+        the one-dimensional (samples,) or two-dimensional (trials, samples) EMG signals, or a :class:`~.Ragged` batch of trials of different length
+    tms_sampleidx: Union[int, ndarray]
+        the sample at which the TMS pulse was applied, either for all or for each trial
+    fs:float
+        the sampling rate of the signal
+    axis: int
+        the axis of the samples in traces, e.g. 0 for a (samples, trials) matrix. No copy is made for either layout, see :func:`~.as_trials`
+    latency_in_ms: Union[Tuple[float, float], None]
+        the range of plausible latencies of the iMEP onset after TMS. Only lags within this range are evaluated, directly or by FFT depending on their number. Defaults to None, i.e. every lag at which the template overlaps the post-stimulus signal
+    normalization: str
+        "global" divides the post-stimulus signal by its norm, so large artifacts anywhere after TMS shrink the score. "local" divides the cross-correlation at each lag by the norm of the signal within the template window, computed from running sums, i.e. the cosine similarity of the template with each window. Defaults to "global"
+    chunksize: Union[int, None]
+        the number of trials per FFT pass. If None, a pass holds the (trials, templates, lags) cross-correlations of about :data:`BANK_BYTES`
+
+    returns
+    -------
+    score:ndarray
+        the maximal absolute cross-correlation of each trace with any template
+    index:ndarray
+        the index of the best matching template for each trace
+    lag:ndarray
+        the lag of the best match relative to the TMS in samples
+    """
+    bank = np.atleast_2d(bank)
+    bank = bank / norm(bank, axis=1, keepdims=True)
+    n_templates, m = bank.shape
+    n_samples: Union[int, ndarray]
+
+    # the post-stimulus signals, zero-padded to a common length
+    if isinstance(traces, Ragged):
+        # the signals of each trial end at its own last sample
+        n_trials = len(traces)
+        tms = np.broadcast_to(
+            np.asarray(tms_sampleidx, dtype=int), (n_trials,)
+        )
+        n_samples = traces.lengths
+        length = int(np.max(n_samples - tms))
+        sigs, _ = traces.gather(tms, length)
+    else:
+        traces = as_trials(traces, axis)
+        n_trials, n_samples = traces.shape
+        tms = np.broadcast_to(
+            np.asarray(tms_sampleidx, dtype=int), (n_trials,)
+        )
+        length = int(n_samples - tms.min())
+        ix = tms[:, None] + np.arange(length)
+        sigs = np.where(
+            ix < n_samples,
+            np.take_along_axis(traces, np.clip(ix, 0, n_samples - 1), axis=1),
+            0.0,
+        )
+    if np.min(n_samples - tms) < m:
+        from warnings import warn
+
+        warn(
+            "We recommend that the duration of the trace post TMS should to be at least as long as the template, i.e. 103ms"
+        )
+    sigs = sigs / norm(sigs, axis=1, keepdims=True)
+    first, last = lag_range(length, m, fs, latency_in_ms)
+    # later samples do not overlap the template at any lag within the range
+    sigs = sigs[:, : last + m]
+
+    # correlation with the template is convolution with the reversed template
+    n_lags = sigs.shape[1] + m - 1
+    nfft = next_fast_len(n_lags, real=True)
+    kernels = rfft(bank[:, ::-1], nfft, axis=1)
+    local = _is_local(normalization)
+    # each template is only normalized by the window of its own support
+    support = m - np.argmax(bank[:, ::-1] != 0, axis=1)
+    lags = np.arange(first, last + 1)
+    if chunksize is None:
+        chunksize = BANK_BYTES // (8 * n_templates * nfft)
+    chunksize = max(int(chunksize), 1)
+    score = np.zeros(n_trials)
+    best = np.zeros(n_trials, dtype=int)
+    for start in range(0, n_trials, chunksize):
+        chunk = sigs[start : start + chunksize]
+        spectra = rfft(chunk, nfft, axis=1)
+        xcorr = np.abs(
+            irfft(spectra[:, None, :] * kernels[None, :, :], nfft, axis=-1)
+        )[..., first + m - 1 : last + m]
+        if local:
+            energy = _energy(chunk[:, None, :], lags, support[None, :, None])
+            xcorr = _normalize(xcorr, energy)
+        xcorr = xcorr.reshape(len(chunk), -1)
+        rows = slice(start, start + len(chunk))
+        best[rows] = np.argmax(xcorr, axis=1)
+        score[rows] = xcorr[np.arange(len(chunk)), best[rows]]
+    index, k = np.unravel_index(best, (n_templates, last - first + 1))
+    return score, index, k + first
+
+
+def lag_range(
+    length: int,
+    m: int,
+    fs: float = 1000,
+    latency_in_ms: Union[Tuple[float, float], None] = None,
+) -> Tuple[int, int]:
+    """the first and last lag to evaluate in samples relative to TMS
+
+    args
+    ----
+    length: int
+        the number of samples of the post-stimulus signal
+    m: int
+        the number of samples of the template
+    fs:float
+        the sampling rate of the signal
+    latency_in_ms: Union[Tuple[float, float], None]
+        the range of plausible latencies of the iMEP onset after TMS. If None, every lag at which the template overlaps the signal
+
+    returns
+    -------
+    lags: Tuple[int, int]
+        the first and last lag, clipped to the lags at which the template overlaps the signal
+    """
+    first, last = -(m - 1), length - 1
+    if latency_in_ms is not None:
+        first = max(first, ceil(latency_in_ms[0] * fs / 1000))
+        last = min(last, floor(latency_in_ms[1] * fs / 1000))
+    if last < first:
+        raise ValueError("No lag within the latency range overlaps the trace")
+    return first, last
+
+
+def _is_local(normalization: str) -> bool:
+    if normalization not in ("global", "local"):
+        raise ValueError(f"Unknown normalization {normalization}")
+    return normalization == "local"
+
+
+def _energy(sigs: ndarray, lags: ndarray, m: Union[int, ndarray]) -> ndarray:
+    "the energy of the signal in the window of m samples starting at each lag"
+    n = sigs.shape[-1]
+    zero = np.zeros(sigs.shape[:-1] + (1,))
+    csum = np.concatenate((zero, np.cumsum(sigs ** 2, axis=-1)), axis=-1)
+    stop = np.clip(lags + m, 0, n)
+    start = np.broadcast_to(np.clip(lags, 0, n), stop.shape)
+    return np.take_along_axis(csum, stop, -1) - np.take_along_axis(
+        csum, start, -1
+    )
+
+
+def _normalize(xcorr: ndarray, energy: ndarray) -> ndarray:
+    "divide by the norm of each window, windows without energy score 0"
+    # the signals have unit norm, so this is relative to their total energy
+    valid = energy > np.finfo(float).eps
+    return np.divide(
+        xcorr,
+        np.sqrt(np.where(valid, energy, 1.0)),
+        out=np.zeros(np.broadcast_shapes(xcorr.shape, energy.shape)),
+        where=valid,
+    )
+
+
+def _match_template(
+    template: ndarray,
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = 1000,
+    latency_in_ms: Union[Tuple[float, float], None] = None,
+    normalization: str = "global",
+) -> Tuple[float, int]:
+    "the maximal cross-correlation and its lag relative to tms_sampleidx"
     sig = trace[tms_sampleidx:]
     if sig.shape[0] < template.shape[0]:
         from warnings import warn
@@ -169,5 +531,20 @@ def match_template(
             "We recommend that the duration of the trace post TMS should to be at least as long as the template, i.e. 103ms"
         )
     sig = sig / norm(sig)
-    xcorr = np.correlate(sig, template, mode="full")
-    return np.max(np.abs(xcorr))
+    m = template.shape[0]
+    first, last = lag_range(sig.shape[0], m, fs, latency_in_ms)
+    if latency_in_ms is None:
+        xcorr = np.abs(np.correlate(sig, template, mode="full"))
+    else:
+        # the signal covering all lags within the range, zero-padded
+        segment = np.zeros(last - first + m)
+        start, stop = max(first, 0), min(last + m, sig.shape[0])
+        segment[start - first : stop - first] = sig[start:stop]
+        xcorr = np.abs(
+            correlate(segment, template, mode="valid", method="auto")
+        )
+    if _is_local(normalization):
+        energy = _energy(sig, np.arange(first, last + 1), m)
+        xcorr = _normalize(xcorr, energy)
+    best = int(np.argmax(xcorr))
+    return xcorr[best], best + first
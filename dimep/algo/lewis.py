@@ -15,9 +15,57 @@ muscle activation.
 Responses in the muscle ipsilateral to cortical stimula-tion were analyzed in the two tasks in which the ipsilateralmuscle was activated during stimulation (ipsilateral activa-tion, bilateral activation). The number of stimuli that gave rise to a discernable ipsilateral MEP (iMEP; 10–30 ms onset, >100µV) was recorded for all stimulus intensitiesand converted to a percentage of total stimuli given.
 """
 from numpy import ndarray, inf
-from typing import Tuple
-from math import ceil
+from typing import Tuple, Union, overload
+from math import ceil, isfinite
 import numpy as np
+from dimep.result import Literal, Result, detailed
+from dimep.tools import coarse_blocksize, coarse_first, bounded
+
+
+@overload
+def lewis(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    discernible_only: bool = ...,
+    details: Literal[False] = ...,
+    baseline: Union[Tuple[float, float], None] = ...,
+    coarse_in_ms: Union[float, None] = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> float:
+    ...
+
+
+@overload
+def lewis(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    discernible_only: bool = ...,
+    *,
+    details: Literal[True],
+    baseline: Union[Tuple[float, float], None] = ...,
+    coarse_in_ms: Union[float, None] = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> Result:
+    ...
+
+
+@overload
+def lewis(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    discernible_only: bool = ...,
+    details: bool = ...,
+    baseline: Union[Tuple[float, float], None] = ...,
+    coarse_in_ms: Union[float, None] = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> Union[float, Result]:
+    ...
 
 
 def lewis(
@@ -25,7 +73,12 @@ def lewis(
     tms_sampleidx: int,
     fs: float = 1000,
     discernible_only: bool = False,
-) -> float:
+    details: bool = False,
+    baseline: Union[Tuple[float, float], None] = None,
+    coarse_in_ms: Union[float, None] = None,
+    horizon_in_ms: float = inf,
+    baseline_in_ms: float = inf,
+) -> Union[float, Result]:
     """Estimate peak-to-peak amplitude of an iMEP based on Lewis 2007
 
     Returns the Peak-to-Peak amplitude of the iMEP within 10 to 30ms after stimulus, if it is 'discernable' i.e. at least 100µV in amplitude and exceeds 3 SD of the background EMG (the 30 ms prior to stimulus).
@@ -40,6 +93,16 @@ def lewis(
         the sampling rate of the signal
     discernible_only:bool
         whether to report only discernible MEPS (i.e. onset within 10-30ms after TMS and amplitude >= 100 µV). defaults to False
+    details: bool
+        whether to return a :class:`~dimep.result.Result` with the intermediates of the estimation instead of the bare estimate. defaults to False
+    baseline: Union[Tuple[float, float], None]
+        the precomputed mean and SD of the baseline period, e.g. from :meth:`~.BaselineIndex.baseline`. If None, they are calculated from the trace
+    coarse_in_ms: Union[float, None]
+        the duration of the blocks for an opt-in coarse-to-fine detection, e.g. 1ms. This gives identical results, but is faster at high sampling rates. If None, every sample is scanned
+    horizon_in_ms: float
+        the maximal duration after TMS which is analysed. Later samples are ignored, so the cost of a call does not grow with the length of the trace. Defaults to inf, i.e. the whole trace after TMS, so the cost is only bounded if a finite horizon is passed
+    baseline_in_ms: float
+        the maximal duration before TMS which is analysed. Earlier samples are ignored, but never those of the baseline from -30 to 0ms. Defaults to inf, i.e. the whole trace before TMS
 
     returns
     -------
@@ -56,13 +119,27 @@ def lewis(
         :func:`~.bradnam`, which inherited the window of 10 to 30ms, or :func:`~.zewdie`, which also calculated PtP, but uses a window from 15 to 80ms and a lower threshold of 50µV.
 
     """
+    if isfinite(horizon_in_ms) or isfinite(baseline_in_ms):
+        return bounded(
+            lewis,
+            trace,
+            tms_sampleidx,
+            fs,
+            horizon_in_ms,
+            baseline_in_ms,
+            discernible_only=discernible_only,
+            details=details,
+            baseline=baseline,
+            coarse_in_ms=coarse_in_ms,
+        )
     # NOTE: Formula for SD calculation not given in paper
     """background EMG (30 ms prior to stimulus onset)"""
 
-    baseline_start = tms_sampleidx - ceil(30 * fs / 1000)
-    baseline = trace[baseline_start:tms_sampleidx]
-    bl_m = baseline.mean()
-    bl_s = baseline.std(ddof=1)
+    if baseline is None:
+        baseline_start = tms_sampleidx - ceil(30 * fs / 1000)
+        period = trace[baseline_start:tms_sampleidx]
+        baseline = period.mean(), period.std(ddof=1)
+    bl_m, bl_s = baseline
     sd_threshold = bl_m + 3 * bl_s
 
     response = trace[tms_sampleidx:]  # recording after TMS
@@ -78,10 +155,21 @@ def lewis(
     #  latency was defined as the first point following the stimulus
     # artifact to exceed 3 standard deviations (SD) of background EMG
     # a discernable ipsilateral MEP (iMEP; 10–30 ms onset, >100µV)
-    onset = (
-        np.where(np.abs(response[minlatency:maxlatency]) >= sd_threshold)[0]
-        + minlatency
-    )
+    if coarse_in_ms is None:
+        onset = (
+            np.where(np.abs(response[minlatency:maxlatency]) >= sd_threshold)[
+                0
+            ]
+            + minlatency
+        )
+    else:
+        first = coarse_first(
+            np.abs(response[minlatency:maxlatency]),
+            sd_threshold,
+            coarse_blocksize(coarse_in_ms, fs),
+            ">=",
+        )
+        onset = np.array([first + minlatency] if first >= 0 else [], int)
     if len(onset) > 0:
         onset = onset[0]
         # MEP amplitude was determined as the maximum peak-to-peak difference
@@ -89,10 +177,21 @@ def lewis(
         # response.
         window = onset + ceil(30 * fs / 1000)
         amp = np.ptp(response[onset : onset + window])
+        start = tms_sampleidx + onset
+        stop = min(start + window, len(trace))
     else:
         amp = 0.0
+        start = stop = None
     if discernible_only:
-        return amp if amp >= 100.0 else 0.0
-    else:
-        return amp
+        amp = amp if amp >= 100.0 else 0.0
+    return detailed(
+        details,
+        amp,
+        trace,
+        onset=start,
+        offset=stop,
+        bl_m=bl_m,
+        bl_s=bl_s,
+        threshold=sd_threshold,
+    )
 
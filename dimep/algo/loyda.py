@@ -11,9 +11,11 @@ When a facilitation (i.e., iMEP) was observed, its onset, offset, andarea (perce
 """
 import numpy as np
 from numpy import ndarray
-from typing import Tuple, Union
-from dimep.tools import bw_boundaries
-from math import ceil
+from typing import Callable, Tuple, Union, NamedTuple, overload
+from dimep.tools import as_trials, bw_boundaries, first_per_row, bounded
+from dimep.result import Literal, Result, detailed
+from dimep.ragged import Ragged, rectified
+from math import ceil, inf, isfinite
 
 
 def loyda_onoff(
@@ -23,6 +25,7 @@ def loyda_onoff(
     mep_window_in_ms: Tuple[float, float] = (0, np.inf),
     baseline_duration_in_ms: float = 200,
     minimum_duration_in_ms: float = 10,
+    baseline: Union[Tuple[float, float], None] = None,
 ) -> Tuple[int, int]:
     """Estimate iMEP onset and offset based on Loyda 2017
 
@@ -40,6 +43,8 @@ def loyda_onoff(
         the duration of the baseline period immediatly before TMS
     minimum_duration_in_ms:float
         the minimum duration above threshold to count as iMEP
+    baseline: Union[Tuple[float, float], None]
+        the precomputed mean and SD of the rectified baseline period, e.g. from :meth:`~.BaselineIndex.baseline`. If None, they are calculated from the trace
 
     returns
     -------
@@ -47,6 +52,28 @@ def loyda_onoff(
         the iMEP onset and offset
 
     """
+    onset, offset, _, _, _ = _loyda_onoff(
+        trace,
+        tms_sampleidx,
+        fs,
+        mep_window_in_ms,
+        baseline_duration_in_ms,
+        minimum_duration_in_ms,
+        baseline,
+    )
+    return (onset, offset)
+
+
+def _loyda_onoff(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = 1000,
+    mep_window_in_ms: Tuple[float, float] = (0, np.inf),
+    baseline_duration_in_ms: float = 200,
+    minimum_duration_in_ms: float = 10,
+    baseline: Union[Tuple[float, float], None] = None,
+) -> Tuple[int, int, float, float, float]:
+    "onset and offset, together with baseline mean, SD and threshold"
     # EMG responses [...] were [...] rectifiedd.
     rect = np.abs(trace)
 
@@ -54,10 +81,13 @@ def loyda_onoff(
 
     # The mean and SD of the background EMG were calculated from a 200-ms window before the onset of the TMS stimulation
     # NOTE: Formula for SD calculation not given in paper
-    baseline_start = tms_sampleidx - ceil(baseline_duration_in_ms * fs / 1000)
-    baseline = rect[baseline_start:tms_sampleidx]
-    bl_m = baseline.mean()
-    bl_s = baseline.std(ddof=1)
+    if baseline is None:
+        baseline_start = tms_sampleidx - ceil(
+            baseline_duration_in_ms * fs / 1000
+        )
+        period = rect[baseline_start:tms_sampleidx]
+        baseline = period.mean(), period.std(ddof=1)
+    bl_m, bl_s = baseline
     threshold = bl_m + 1 * bl_s
 
     # with the signal rising above the mean baseline + 1SD rather than going below
@@ -76,7 +106,7 @@ def loyda_onoff(
             break
     # onset was determined as the time point when the EMG  [rose above]  mean + 1SD for at least 10 ms, and the offset [...] was the time point when the EMG rebounded [below] the mean + 1SD.
     if onset is None:
-        return (0, 0)
+        return (0, 0, bl_m, bl_s, threshold)
     else:
         # we go forwards in time, starting at the onset
         ix = 0
@@ -87,7 +117,50 @@ def loyda_onoff(
 
         onset = tms_sampleidx + minlatency + onset
         offset = onset + ix
-        return (onset, offset)
+        return (onset, offset, bl_m, bl_s, threshold)
+
+
+@overload
+def loyda(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    sham_trace: Union[ndarray, None] = ...,
+    details: Literal[False] = ...,
+    baseline: Union[Tuple[float, float], None] = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> float:
+    ...
+
+
+@overload
+def loyda(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    sham_trace: Union[ndarray, None] = ...,
+    *,
+    details: Literal[True],
+    baseline: Union[Tuple[float, float], None] = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> Result:
+    ...
+
+
+@overload
+def loyda(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    sham_trace: Union[ndarray, None] = ...,
+    details: bool = ...,
+    baseline: Union[Tuple[float, float], None] = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> Union[float, Result]:
+    ...
 
 
 def loyda(
@@ -95,7 +168,11 @@ def loyda(
     tms_sampleidx: int,
     fs: float = 1000,
     sham_trace: Union[ndarray, None] = None,
-) -> float:
+    details: bool = False,
+    baseline: Union[Tuple[float, float], None] = None,
+    horizon_in_ms: float = inf,
+    baseline_in_ms: float = inf,
+) -> Union[float, Result]:
     """Estimate the normalized density of an iMEP based on Loyda 2017
 
     The iMEP area is calculated from the rectified EMG, if at least 10ms are 1SD above the mean of the baseline of the 200ms before TMS, and additionally normalized by the area of an identical period from a nonstimulation trial. 
@@ -115,6 +192,16 @@ def loyda(
     sham_trace: Union[ndarray, None]
         if not supplied, the function will take a period from before the TMS period to calculate a shamArea for normalization. Otherwise, support a non-stimulation trial for strict estimation following Loyda 2017
 
+    details: bool
+        whether to return a :class:`~dimep.result.Result` with the intermediates of the estimation instead of the bare estimate. defaults to False
+
+    baseline: Union[Tuple[float, float], None]
+        the precomputed mean and SD of the rectified baseline period, e.g. from :meth:`~.BaselineIndex.baseline`. If None, they are calculated from the trace
+    horizon_in_ms: float
+        the maximal duration after TMS which is analysed. Later samples are ignored, so the cost of a call does not grow with the length of the trace. Defaults to inf, i.e. the whole trace after TMS, so the cost is only bounded if a finite horizon is passed
+    baseline_in_ms: float
+        the maximal duration before TMS which is analysed. Earlier samples are ignored, but never those of the baseline from -200 to 0ms. Defaults to inf, i.e. the whole trace before TMS
+
     returns
     -------
     amplitude:float
@@ -125,9 +212,24 @@ def loyda(
         Loyda, J.-C.; Nepveu, J.-F.; Deffeyes, J. E.; Elgbeili, G.; Dancause, N. & Barthélemy, D. Interhemispheric interactions between trunk muscle representations of the primary motor cortex. Journal of neurophysiology, 2017, 118, 1488-1500 
 
     """
-    onset, offset = loyda_onoff(trace, tms_sampleidx=tms_sampleidx, fs=fs)
+    if isfinite(horizon_in_ms) or isfinite(baseline_in_ms):
+        return bounded(
+            loyda,
+            trace,
+            tms_sampleidx,
+            fs,
+            horizon_in_ms,
+            baseline_in_ms,
+            aligned=dict(sham_trace=sham_trace),
+            details=details,
+            baseline=baseline,
+        )
+    onset, offset, bl_m, bl_s, threshold = _loyda_onoff(
+        trace, tms_sampleidx=tms_sampleidx, fs=fs, baseline=baseline
+    )
+    intermediates = dict(bl_m=bl_m, bl_s=bl_s, threshold=threshold)
     if onset == offset:
-        return 0.0
+        return detailed(details, 0.0, trace, **intermediates)
     iMEPArea = np.mean(np.abs(trace[onset:offset]))
 
     """The percentage [...] was obtained by dividing the area of the
@@ -161,4 +263,269 @@ def loyda(
         raise ValueError(
             "Sham Area is too close to zero for numerical stability"
         )
-    return float((iMEPArea / shamArea) * 100)
+    return detailed(
+        details,
+        float((iMEPArea / shamArea) * 100),
+        trace,
+        onset=onset,
+        offset=offset,
+        **intermediates,
+    )
+
+
+class LoydaBatch(NamedTuple):
+    """the results of :func:`loyda_batch`, with one entry per stimulation trial"""
+
+    #: the normalized iMEP density in percent, nan for failed trials
+    estimate: ndarray
+    #: the iMEP onset, 0 if no iMEP was found
+    onset: ndarray
+    #: the iMEP offset, 0 if no iMEP was found
+    offset: ndarray
+    #: the mean rectified EMG between onset and offset of the stimulation trial
+    iMEPArea: ndarray
+    #: the mean rectified EMG between onset and offset of the sham period
+    shamArea: ndarray
+    #: the row of the sham trial paired with each stimulation trial, -1 if unpaired
+    pairing: ndarray
+    #: whether the estimate could be calculated for this trial
+    valid: ndarray
+
+
+def pair_preceding(stim_times: ndarray, sham_times: ndarray) -> ndarray:
+    """pair each stimulation trial with the nearest preceding sham trial
+
+    args
+    ----
+    stim_times: ndarray
+        the time (or running index) of each stimulation trial in the session
+    sham_times: ndarray
+        the time (or running index) of each sham trial in the session
+
+    returns
+    -------
+    pairing: ndarray
+        for each stimulation trial, the row of the sham trial which occured last before it, or -1 if no sham trial preceded it
+    """
+    stim_times = np.asarray(stim_times)
+    sham_times = np.asarray(sham_times)
+    order = np.argsort(sham_times, kind="stable")
+    pos = np.searchsorted(sham_times[order], stim_times, side="left") - 1
+    return np.where(pos >= 0, order[np.clip(pos, 0, None)], -1)
+
+
+Area = Callable[[ndarray, ndarray, ndarray], ndarray]
+
+
+def _rectified_area(rect: Ragged) -> Area:
+    "sum the rectified EMG of the given rows between on and off"
+    csum = rect.cumsum(rect.values())
+    return lambda rows, on, off: rect.between(csum, on, off, rows)
+
+
+def _runs(
+    rect: Ragged, tms: ndarray, baseline_len: int
+) -> Tuple[ndarray, ndarray, ndarray]:
+    "the runs above the baseline threshold after the TMS within each trial"
+    values = rect.values()
+    # the index of each sample relative to the TMS of its trial
+    relative = rect.local() - rect.per_sample(tms)
+    in_baseline = (relative >= -baseline_len) & (relative < 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        bl_m = rect.sum(values * in_baseline) / baseline_len
+        deviation = (values - rect.per_sample(bl_m)) * in_baseline
+        bl_s = np.sqrt(rect.sum(deviation ** 2) / (baseline_len - 1))
+    threshold = rect.per_sample(bl_m + 1 * bl_s)
+    return rect.runs((values > threshold) & (relative >= 0))
+
+
+def loyda_batch(
+    traces: Union[ndarray, Ragged],
+    tms_sampleidx: Union[int, ndarray],
+    fs: float = 1000,
+    sham_traces: Union[ndarray, Ragged, None] = None,
+    pairing: Union[ndarray, str, None] = None,
+    stim_times: Union[ndarray, None] = None,
+    sham_times: Union[ndarray, None] = None,
+    baseline_duration_in_ms: float = 200,
+    minimum_duration_in_ms: float = 10,
+    exclude: Union[ndarray, None] = None,
+    axis: int = -1,
+) -> LoydaBatch:
+    """Estimate the normalized density of iMEPs in many trials based on Loyda 2017
+
+    A vectorized version of :func:`~.loyda` for a whole session. Instead of raising an exception, trials for which no estimate can be calculated are marked as invalid, e.g. if the baseline period starts before the trace, if no sham trial could be paired, or if the sham area is zero.
+
+    args
+    ----
+    traces: Union[ndarray, Ragged]
+        the two-dimensional (trials, samples) EMG signals of the stimulation trials, or a :class:`~.Ragged` batch of trials of different length
+    tms_sampleidx: Union[int, ndarray]
+        the sample at which the TMS pulse was applied, either for all or for each trial
+    fs:float
+        the sampling rate of the signal
+    sham_traces: Union[ndarray, Ragged, None]
+        the two-dimensional (trials, samples) EMG signals of the non-stimulation trials, or a :class:`~.Ragged` batch. If not supplied, the shamArea is taken from a period before the TMS, as in :func:`~.loyda`
+    pairing: Union[ndarray, str, None]
+        which sham trial belongs to which stimulation trial. Either an array with the row of the sham trial for each stimulation trial (-1 if unpaired), "preceding" to pair each stimulation trial with the nearest preceding sham trial based on stim_times and sham_times, or None to pair trials row by row.
+    stim_times: Union[ndarray, None]
+        the time of each stimulation trial, only required for pairing="preceding"
+    sham_times: Union[ndarray, None]
+        the time of each sham trial, only required for pairing="preceding"
+    baseline_duration_in_ms: float
+        the duration of the baseline period immediatly before TMS
+    minimum_duration_in_ms:float
+        the minimum duration above threshold to count as iMEP
+    exclude: Union[ndarray, None]
+        trials to skip entirely, e.g. the reason codes returned by :func:`dimep.screen.screen`. All trials with a nonzero value are skipped and marked as invalid.
+    axis: int
+        the axis of the samples in traces and sham_traces, e.g. 0 for a (samples, trials) matrix. No copy is made for either layout, see :func:`~.as_trials`
+
+    returns
+    -------
+    results: LoydaBatch
+        the estimate, onset, offset, both areas, the pairing and the validity of each trial
+
+    """
+    traces = as_trials(traces, axis)
+    n_trials = len(traces)
+    tms = np.broadcast_to(np.asarray(tms_sampleidx, dtype=int), (n_trials,))
+    sham, paired = None, None
+    if sham_traces is not None:
+        sham_traces = as_trials(sham_traces, axis)
+        paired = _resolve_pairing(
+            pairing, n_trials, len(sham_traces), stim_times, sham_times
+        )
+        sham = rectified(sham_traces)
+    kwargs = dict(
+        fs=fs,
+        baseline_duration_in_ms=baseline_duration_in_ms,
+        minimum_duration_in_ms=minimum_duration_in_ms,
+    )
+    if exclude is None:
+        return _loyda_rectified(rectified(traces), tms, sham, paired, **kwargs)
+    # only the included trials are rectified and estimated
+    keep = np.flatnonzero(np.asarray(exclude) == 0)
+    kept = _loyda_rectified(
+        rectified(traces, keep),
+        tms[keep],
+        sham,
+        None if paired is None else paired[keep],
+        **kwargs,
+    )
+    out = dict(
+        estimate=np.full(n_trials, np.nan),
+        onset=np.zeros(n_trials, dtype=kept.onset.dtype),
+        offset=np.zeros(n_trials, dtype=kept.offset.dtype),
+        iMEPArea=np.zeros(n_trials),
+        shamArea=np.zeros(n_trials),
+        pairing=np.full(n_trials, -1),
+        valid=np.zeros(n_trials, dtype=bool),
+    )
+    for field, values in out.items():
+        values[keep] = getattr(kept, field)
+    return LoydaBatch(**out)
+
+
+def _loyda_rectified(
+    rect: Ragged,
+    tms: ndarray,
+    sham: Union[Ragged, None],
+    pairing: Union[ndarray, None],
+    fs: float,
+    baseline_duration_in_ms: float,
+    minimum_duration_in_ms: float,
+) -> LoydaBatch:
+    "loyda_batch for the rectified trials, see :func:`~.rectified`"
+    n_trials = len(rect)
+    n_samples = rect.lengths
+    # The mean and SD of the background EMG were calculated from a 200-ms
+    # window before the onset of the TMS stimulation
+    baseline_len = ceil(baseline_duration_in_ms * fs / 1000)
+    baseline_start = tms - baseline_len
+    baseline_ok = (
+        (baseline_start >= 0) & (tms < n_samples) & (baseline_len > 1)
+    )
+    # onset was determined as the time point when the EMG [rose above] mean
+    # + 1SD for at least 10 ms
+    row, start, stop = _runs(rect, tms, baseline_len)
+    qualifies = ((stop - start) / fs) * 1000 >= minimum_duration_in_ms
+    onset = first_per_row(row[qualifies], start[qualifies], n_trials)
+    stop = first_per_row(row[qualifies], stop[qualifies], n_trials)
+    responded = (onset >= 0) & baseline_ok
+    # the offset [...] was the time point when the EMG rebounded [below] the
+    # mean + 1SD. If it never does, the last sample marks the offset.
+    offset = np.where(stop < n_samples, stop, n_samples - 1)
+    onset = np.where(responded, onset, 0)
+    offset = np.where(responded, offset, 0)
+    responded &= onset != offset
+    duration = np.where(responded, offset - onset, 1)
+
+    rows = np.arange(n_trials)
+    area = _rectified_area(rect)
+    iMEPArea = area(rows, onset, offset) / duration
+
+    if sham is None:
+        # mimic a sham trial by mirroring the iMEP period at tms_sampleidx
+        paired = np.full(n_trials, -1)
+        sham_on = 2 * tms - offset
+        sham_off = 2 * tms - onset
+        sham_ok = sham_on >= 0
+        sham_rows = rows
+        sham_area = area
+    else:
+        paired = np.asarray(pairing, dtype=int)
+        sham_on = onset
+        sham_off = offset
+        sham_ok = (paired >= 0) & (paired < len(sham))
+        sham_rows = np.where(sham_ok, paired, 0)
+        sham_n = sham.lengths[sham_rows] if len(sham) else 0
+        sham_ok &= offset <= sham_n
+        sham_area = _rectified_area(sham)
+
+    sham_on = np.where(sham_ok & responded, sham_on, 0)
+    sham_off = np.where(sham_ok & responded, sham_off, 0)
+    shamArea = sham_area(sham_rows, sham_on, sham_off) / duration
+    sham_ok &= np.isfinite(shamArea) & (shamArea != 0.0)
+
+    valid = baseline_ok & (~responded | sham_ok)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        estimate = np.where(responded, (iMEPArea / shamArea) * 100, 0.0)
+    estimate = np.where(valid, estimate, np.nan)
+    iMEPArea = np.where(responded, iMEPArea, 0.0)
+    shamArea = np.where(responded & sham_ok, shamArea, 0.0)
+    return LoydaBatch(
+        estimate=estimate,
+        onset=onset,
+        offset=offset,
+        iMEPArea=iMEPArea,
+        shamArea=shamArea,
+        pairing=paired,
+        valid=valid,
+    )
+
+
+def _resolve_pairing(
+    pairing: Union[ndarray, str, None],
+    n_trials: int,
+    n_sham: int,
+    stim_times: Union[ndarray, None],
+    sham_times: Union[ndarray, None],
+) -> ndarray:
+    "translate the pairing argument of loyda_batch into sham rows"
+    if pairing is None:
+        if n_sham != n_trials:
+            raise ValueError(
+                "Without a pairing, the number of sham and stimulation trials must be identical"
+            )
+        return np.arange(n_trials)
+    elif isinstance(pairing, str):
+        if pairing != "preceding":
+            raise ValueError(f"Unknown pairing rule {pairing}")
+        if stim_times is None or sham_times is None:
+            raise ValueError(
+                "Pairing with the preceding sham trial requires stim_times and sham_times"
+            )
+        return pair_preceding(stim_times, sham_times)
+    else:
+        return np.asarray(pairing, dtype=int)
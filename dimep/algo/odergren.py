@@ -4,11 +4,57 @@ To be accepted as SCM-MEP a minimal upward deflection of 0.1 mV from baseline wa
 
 import numpy as np
 from numpy import ndarray, inf
-from typing import Tuple
-from math import ceil
+from typing import Tuple, Union, overload
+from math import ceil, isfinite
+from dimep.result import Literal, Result, detailed
+from dimep.tools import bounded
 
 
-def odergren(trace: ndarray, tms_sampleidx: int, fs: float = 1000,) -> float:
+@overload
+def odergren(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    details: Literal[False] = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> float:
+    ...
+
+
+@overload
+def odergren(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    *,
+    details: Literal[True],
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> Result:
+    ...
+
+
+@overload
+def odergren(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    details: bool = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> Union[float, Result]:
+    ...
+
+
+def odergren(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = 1000,
+    details: bool = False,
+    horizon_in_ms: float = inf,
+    baseline_in_ms: float = inf,
+) -> Union[float, Result]:
     """Estimate the peak-to-peak amplitude of an iMEP based on Odergren 1996
 
     Returns the PtP-Amplitude of the unrectified EMG if above 0.1mV (100µV) 
@@ -27,6 +73,12 @@ def odergren(trace: ndarray, tms_sampleidx: int, fs: float = 1000,) -> float:
         the sample at which the TMS pulse was applied
     fs:float
         the sampling rate of the signal
+    details: bool
+        whether to return a :class:`~dimep.result.Result` with the intermediates of the estimation instead of the bare estimate. defaults to False
+    horizon_in_ms: float
+        the maximal duration after TMS which is analysed. Later samples are ignored, so the cost of a call does not grow with the length of the trace. Defaults to inf, i.e. the whole trace after TMS, so the cost is only bounded if a finite horizon is passed
+    baseline_in_ms: float
+        the maximal duration before TMS which is analysed. Earlier samples are ignored. Defaults to inf, i.e. the whole trace before TMS
 
     returns
     -------
@@ -43,5 +95,23 @@ def odergren(trace: ndarray, tms_sampleidx: int, fs: float = 1000,) -> float:
         :func:`~.bawa` also takes the PtP amplitude, but does not threshold it
 
     """
+    if isfinite(horizon_in_ms) or isfinite(baseline_in_ms):
+        return bounded(
+            odergren,
+            trace,
+            tms_sampleidx,
+            fs,
+            horizon_in_ms,
+            baseline_in_ms,
+            details=details,
+        )
     amp = np.ptp(trace[tms_sampleidx:])
-    return amp if amp >= 100 else 0.0
+    amp = amp if amp >= 100 else 0.0
+    return detailed(
+        details,
+        amp,
+        trace,
+        onset=tms_sampleidx,
+        offset=len(trace),
+        threshold=100.0,
+    )
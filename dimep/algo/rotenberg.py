@@ -3,8 +3,50 @@ To eliminate averaging of positive and negative voltages of polyphasic signals,
 """
 import numpy as np
 from numpy import ndarray
-from typing import Tuple
-from math import ceil
+from typing import Tuple, Union, overload
+from math import ceil, inf, isfinite
+from dimep.result import Literal, Result, detailed
+from dimep.tools import bounded
+
+
+@overload
+def rotenberg(
+    trace: ndarray,
+    tms_sampleidx: int,
+    mep_window_in_ms: Tuple[float, float] = ...,
+    fs: float = ...,
+    details: Literal[False] = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> float:
+    ...
+
+
+@overload
+def rotenberg(
+    trace: ndarray,
+    tms_sampleidx: int,
+    mep_window_in_ms: Tuple[float, float] = ...,
+    fs: float = ...,
+    *,
+    details: Literal[True],
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> Result:
+    ...
+
+
+@overload
+def rotenberg(
+    trace: ndarray,
+    tms_sampleidx: int,
+    mep_window_in_ms: Tuple[float, float] = ...,
+    fs: float = ...,
+    details: bool = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> Union[float, Result]:
+    ...
 
 
 def rotenberg(
@@ -12,7 +54,10 @@ def rotenberg(
     tms_sampleidx: int,
     mep_window_in_ms: Tuple[float, float] = (5, 30),
     fs: float = 1000,
-) -> float:
+    details: bool = False,
+    horizon_in_ms: float = inf,
+    baseline_in_ms: float = inf,
+) -> Union[float, Result]:
     """Estimate the area of an iMEP based on Rotenberg 2010
 
     Returns the iMEP Area of the rectified EMG integrated for the search window
@@ -32,6 +77,12 @@ def rotenberg(
 
     mep_window_in_ms: Tuple[float, float]
         the search window after TMS to look for an iMEP.
+    details: bool
+        whether to return a :class:`~dimep.result.Result` with the intermediates of the estimation instead of the bare estimate. defaults to False
+    horizon_in_ms: float
+        the maximal duration after TMS which is analysed. Later samples are ignored, so the cost of a call does not grow with the length of the trace. Defaults to inf, i.e. the whole trace after TMS, so the cost is only bounded if a finite horizon is passed
+    baseline_in_ms: float
+        the maximal duration before TMS which is analysed. Earlier samples are ignored. Defaults to inf, i.e. the whole trace before TMS
 
     returns
     -------
@@ -44,10 +95,21 @@ def rotenberg(
         Rotenberg, A.; Muller, P. A.; Vahabzadeh-Hagh, A. M.; Navarro, X.; López-Vales, R.; Pascual-Leone, A. & Jensen, F. Lateralization of forelimb motor evoked potentials by transcranial magnetic stimulation in rats Clinical Neurophysiology, Elsevier BV, 2010, 121, 104-108
 
     """
+    if isfinite(horizon_in_ms) or isfinite(baseline_in_ms):
+        return bounded(
+            rotenberg,
+            trace,
+            tms_sampleidx,
+            fs,
+            horizon_in_ms,
+            baseline_in_ms,
+            mep_window_in_ms=mep_window_in_ms,
+            details=details,
+        )
     a = tms_sampleidx + ceil(mep_window_in_ms[0] * fs / 1000)
     # b should not be higher then the len of the trace
     b = ceil(
         min((tms_sampleidx + (mep_window_in_ms[1] * fs / 1000)), len(trace))
     )
     amp = np.sum(np.abs(trace[a:b]))
-    return amp
+    return detailed(details, amp, trace, onset=a, offset=b)
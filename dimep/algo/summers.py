@@ -30,13 +30,18 @@ et al., 2010). """
 
 import numpy as np
 from numpy import ndarray, inf
-from typing import Tuple
-from math import ceil
-from dimep.tools import bw_boundaries
+from typing import Tuple, Union, overload
+from math import ceil, isfinite
+from dimep.tools import bw_boundaries, coarse_blocksize, coarse_first, bounded
+from dimep.result import Literal, Result, detailed
 
 
 def summers_onoff(
-    trace: ndarray, tms_sampleidx: int, fs: float = 1000,
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = 1000,
+    baseline: Union[Tuple[float, float], None] = None,
+    coarse_in_ms: Union[float, None] = None,
 ) -> Tuple[int, int]:
     """Estimate iMEP onset and offset based on Summers 2020
     
@@ -48,6 +53,10 @@ def summers_onoff(
         the sample at which the TMS pulse was applied
     fs:float
         the sampling rate of the signal
+    baseline: Union[Tuple[float, float], None]
+        the precomputed mean and SD of the rectified baseline period, e.g. from :meth:`~.BaselineIndex.baseline`. If None, they are calculated from the trace
+    coarse_in_ms: Union[float, None]
+        the duration of the blocks for an opt-in coarse-to-fine detection, e.g. 1ms. This gives identical results, but is faster at high sampling rates. If None, every sample is scanned
     
     returns
     -------
@@ -55,6 +64,20 @@ def summers_onoff(
         the iMEP onset and offset
 
     """
+    onset, offset, _, _, _ = _summers_onoff(
+        trace, tms_sampleidx, fs, baseline, coarse_in_ms
+    )
+    return onset, offset
+
+
+def _summers_onoff(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = 1000,
+    baseline: Union[Tuple[float, float], None] = None,
+    coarse_in_ms: Union[float, None] = None,
+) -> Tuple[int, int, float, float, float]:
+    "onset and offset, together with baseline mean, SD and threshold"
     # For each subject, the surface EMG from the right FDI muscle for each
     # stimulus intensity and coil orientation were rectified and averaged.
     rect = np.abs(trace)
@@ -62,19 +85,29 @@ def summers_onoff(
     # The average pre-stimulus SD (from -100 ms to -5ms) was used to construct
     # a threshold to determine the offset
     # NOTE: Formula for SD calculation not given in paper
-    baseline_start = tms_sampleidx - ceil(100 * fs / 1000)
-    baseline_end = tms_sampleidx - ceil(5 * fs / 1000)
-    baseline = rect[baseline_start:baseline_end]
-    bl_m = baseline.mean()
-    bl_s = baseline.std(ddof=1)
+    if baseline is None:
+        baseline_start = tms_sampleidx - ceil(100 * fs / 1000)
+        baseline_end = tms_sampleidx - ceil(5 * fs / 1000)
+        period = rect[baseline_start:baseline_end]
+        baseline = period.mean(), period.std(ddof=1)
+    bl_m, bl_s = baseline
     threshold = bl_m + 3 * bl_s
 
     # MEP onset and offset were set at each prominent EMG trace deflection
     # rising or falling outside of a three SD threshold, constructed from
     # baseline EMG activity.
     response = rect[tms_sampleidx:]
+    if coarse_in_ms is not None:
+        blocksize = coarse_blocksize(coarse_in_ms, fs)
+        first = coarse_first(response, threshold, blocksize, ">")
+        # as in bw_boundaries, a single sample forms no cluster
+        if first < 0 or len(response) < 2:
+            return 0, 0, bl_m, bl_s, threshold
+        after = coarse_first(response, threshold, blocksize, "<", start=first)
+        stop = (len(response) if after < 0 else after) + tms_sampleidx
+        return first + tms_sampleidx, stop, bl_m, bl_s, threshold
     if not np.any(response > threshold):
-        return 0, 0
+        return 0, 0, bl_m, bl_s, threshold
     L = bw_boundaries(response > threshold)
     n = max(L)
     onset = None
@@ -85,16 +118,69 @@ def summers_onoff(
         try:
             offset = np.where(response[onset:] < threshold)[0][0]
         except IndexError:
-            # occurs if response never decreases again below threshold
-            offset = len(response)
+            # occurs if response never decreases again below threshold, the
+            # offset is then the end of the trace
+            offset = len(response) - onset
         onset = onset + tms_sampleidx
         offset = onset + offset
-        return onset, offset
+        return onset, offset, bl_m, bl_s, threshold
     else:
-        return 0, 0
+        return 0, 0, bl_m, bl_s, threshold
+
+
+@overload
+def summers(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    details: Literal[False] = ...,
+    baseline: Union[Tuple[float, float], None] = ...,
+    coarse_in_ms: Union[float, None] = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> float:
+    ...
+
 
+@overload
+def summers(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    *,
+    details: Literal[True],
+    baseline: Union[Tuple[float, float], None] = ...,
+    coarse_in_ms: Union[float, None] = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> Result:
+    ...
 
-def summers(trace: ndarray, tms_sampleidx: int, fs: float = 1000,) -> float:
+
+@overload
+def summers(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    details: bool = ...,
+    baseline: Union[Tuple[float, float], None] = ...,
+    coarse_in_ms: Union[float, None] = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> Union[float, Result]:
+    ...
+
+
+def summers(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = 1000,
+    details: bool = False,
+    baseline: Union[Tuple[float, float], None] = None,
+    coarse_in_ms: Union[float, None] = None,
+    horizon_in_ms: float = inf,
+    baseline_in_ms: float = inf,
+) -> Union[float, Result]:
     """Estimate the area of an iMEP based on Summers 2020
 
     Normalizes the area by an area of identical duration during baseline, with onset and offset detected by passing a 3SD threshold compared to baseline.
@@ -110,6 +196,18 @@ def summers(trace: ndarray, tms_sampleidx: int, fs: float = 1000,) -> float:
     fs:float
         the sampling rate of the signal
 
+    details: bool
+        whether to return a :class:`~dimep.result.Result` with the intermediates of the estimation instead of the bare estimate. defaults to False
+    baseline: Union[Tuple[float, float], None]
+        the precomputed mean and SD of the rectified baseline period, e.g. from :meth:`~.BaselineIndex.baseline`. If None, they are calculated from the trace
+
+    coarse_in_ms: Union[float, None]
+        the duration of the blocks for an opt-in coarse-to-fine detection, e.g. 1ms. This gives identical results, but is faster at high sampling rates. If None, every sample is scanned
+    horizon_in_ms: float
+        the maximal duration after TMS which is analysed. Later samples are ignored, so the cost of a call does not grow with the length of the trace. Defaults to inf, i.e. the whole trace after TMS, so the cost is only bounded if a finite horizon is passed
+    baseline_in_ms: float
+        the maximal duration before TMS which is analysed. Earlier samples are ignored, but never those of the baseline from -100 to -5ms, or of the baseline area, which can last as long as the horizon. Defaults to inf, i.e. the whole trace before TMS
+
     returns
     -------
     amplitude:float
@@ -126,12 +224,31 @@ def summers(trace: ndarray, tms_sampleidx: int, fs: float = 1000,) -> float:
         refers to :func:`~.chen` for using a SD-based threshold amd :func:`~.bradnam` for using a normalization with prestimulus activity. Different to these, a different window for calculation of the baseline mean and SD and a higher threshold is being used. Also, units of the output are differents.
 
     """
+    if isfinite(horizon_in_ms) or isfinite(baseline_in_ms):
+        # the baseline area lasts as long as the response, which can last up
+        # to the horizon, and ends 5ms before the TMS
+        return bounded(
+            summers,
+            trace,
+            tms_sampleidx,
+            fs,
+            horizon_in_ms,
+            max(baseline_in_ms, horizon_in_ms + 5),
+            details=details,
+            baseline=baseline,
+            coarse_in_ms=coarse_in_ms,
+        )
 
-    onset, offset = summers_onoff(
-        trace=trace, tms_sampleidx=tms_sampleidx, fs=fs,
+    onset, offset, bl_m, bl_s, threshold = _summers_onoff(
+        trace=trace,
+        tms_sampleidx=tms_sampleidx,
+        fs=fs,
+        baseline=baseline,
+        coarse_in_ms=coarse_in_ms,
     )
+    intermediates = dict(bl_m=bl_m, bl_s=bl_s, threshold=threshold)
     if onset == offset:
-        return 0.0
+        return detailed(details, 0.0, trace, **intermediates)
     response = np.abs(trace)
     iMEPArea = np.sum(response[onset:offset])
 
@@ -146,5 +263,7 @@ def summers(trace: ndarray, tms_sampleidx: int, fs: float = 1000,) -> float:
 
     # calculation as mere difference, not transformed into (µ)V x s but (µ)V x sample
     MEPsize = iMEPArea - EMGArea
-    return MEPsize
+    return detailed(
+        details, MEPsize, trace, onset=onset, offset=offset, **intermediates
+    )
 
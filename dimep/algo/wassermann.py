@@ -6,10 +6,60 @@ Wassermann, Eric M., Alvaro Pascual-Leone, and Mark Hallett. “Cortical Motor R
 
 import numpy as np
 from numpy import ndarray
-from typing import Tuple
-from math import ceil
-from scipy.stats import ttest_1samp
-from dimep.tools import down_bin, bw_boundaries
+from typing import Tuple, Union, overload
+from math import ceil, inf, isfinite
+from scipy.stats import ttest_1samp, t
+from dimep.tools import down_bin, bw_boundaries, bounded
+from dimep.result import Literal, Result, detailed
+
+
+@overload
+def wassermann(
+    trace: ndarray,
+    tms_sampleidx: int,
+    mep_window_in_ms: Tuple[float, float] = ...,
+    fs: float = ...,
+    minimum_duration_in_ms: float = ...,
+    threshold: float = ...,
+    details: Literal[False] = ...,
+    baseline: Union[Tuple[float, float], None] = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> float:
+    ...
+
+
+@overload
+def wassermann(
+    trace: ndarray,
+    tms_sampleidx: int,
+    mep_window_in_ms: Tuple[float, float] = ...,
+    fs: float = ...,
+    minimum_duration_in_ms: float = ...,
+    threshold: float = ...,
+    *,
+    details: Literal[True],
+    baseline: Union[Tuple[float, float], None] = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> Result:
+    ...
+
+
+@overload
+def wassermann(
+    trace: ndarray,
+    tms_sampleidx: int,
+    mep_window_in_ms: Tuple[float, float] = ...,
+    fs: float = ...,
+    minimum_duration_in_ms: float = ...,
+    threshold: float = ...,
+    details: bool = ...,
+    baseline: Union[Tuple[float, float], None] = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> Union[float, Result]:
+    ...
 
 
 def wassermann(
@@ -19,7 +69,11 @@ def wassermann(
     fs: float = 1000,
     minimum_duration_in_ms: float = 2,
     threshold: float = 0.01,
-) -> float:
+    details: bool = False,
+    baseline: Union[Tuple[float, float], None] = None,
+    horizon_in_ms: float = inf,
+    baseline_in_ms: float = inf,
+) -> Union[float, Result]:
     """Estimate the normalized density of an iMEP based on Wassermann 1994
 
     Uses a statistical test to compare the iMEP versus baseline activity. Only if a block of at least 2ms is significant in a one-sided t-test with p<0.01, the iMEP area average is calculated and normalized to an area of identical duration from the baseline.
@@ -42,6 +96,15 @@ def wassermann(
     threshold: float = 0.01
         the paper describes to have thresholded for `values above baseline (P < 0.01, 1-tailed t-test)`. The one-tailed test is hardcoded, but you can be flexible with your p-value threshold.
 
+    details: bool
+        whether to return a :class:`~dimep.result.Result` with the intermediates of the estimation instead of the bare estimate. defaults to False
+
+    baseline: Union[Tuple[float, float], None]
+        the precomputed mean and SD of the 1ms bins of the rectified baseline period, e.g. from :meth:`~.BaselineIndex.baseline`. If None, they are calculated from the trace
+    horizon_in_ms: float
+        the maximal duration after TMS which is analysed. Later samples are ignored, so the cost of a call does not grow with the length of the trace. Defaults to inf, i.e. the whole trace after TMS, so the cost is only bounded if a finite horizon is passed
+    baseline_in_ms: float
+        the maximal duration before TMS which is analysed. Earlier samples are ignored, but never those of the baseline from -150 to 0ms. Defaults to inf, i.e. the whole trace before TMS
 
     returns
     -------
@@ -55,6 +118,20 @@ def wassermann(
         Wassermann, Eric M., Alvaro Pascual-Leone, and Mark Hallett. “Cortical Motor Representation of the Ipsilateral Hand and Arm.” Experimental Brain Research 100, no. 1 (July 1994). https://doi.org/10.1007/BF00227284.
 
     """
+    if isfinite(horizon_in_ms) or isfinite(baseline_in_ms):
+        return bounded(
+            wassermann,
+            trace,
+            tms_sampleidx,
+            fs,
+            horizon_in_ms,
+            baseline_in_ms,
+            mep_window_in_ms=mep_window_in_ms,
+            minimum_duration_in_ms=minimum_duration_in_ms,
+            threshold=threshold,
+            details=details,
+            baseline=baseline,
+        )
     # the original implementation uses 'the 20 ms following the onset of the contralateral MEP evoked at the optimal cMEP position'.
     # the latency of the contralateral MEP is usually around 15-50 ms in
     # but might sometimes not be known in  general (e.g. after stroke), we let it set as argument and sh default
@@ -68,17 +145,27 @@ def wassermann(
     # there was no information about the baseline period
     #  duration, therefore we
     # used the same period as mentioned in wassermann_sd
-    baseline_start = tms_sampleidx - ceil(150 * fs / 1000)
+    baseline_len = ceil(150 * fs / 1000)
+    binsize = int(fs / 1000)
     # select baseline and response
-    baseline = np.abs(trace)[baseline_start:tms_sampleidx]
     response = np.abs(trace)[
         tms_sampleidx + minlatency : tms_sampleidx + maxlatency
     ]
-    bl_bins = down_bin(baseline, int(fs / 1000))
-    response_bins = down_bin(response, int(fs / 1000))
-    out = ttest_1samp(bl_bins, response_bins)
+    response_bins = down_bin(response, binsize)
+    if baseline is None:
+        period = np.abs(trace)[tms_sampleidx - baseline_len : tms_sampleidx]
+        bl_bins = down_bin(period, binsize)
+        baseline = bl_bins.mean(), bl_bins.std(ddof=1)
+        out = ttest_1samp(bl_bins, response_bins)
+        pvalue, statistic = out.pvalue, out.statistic  # type: ignore
+    else:
+        # the same one-sample t-test, based on the precomputed statistics
+        n = baseline_len if binsize <= 1 else baseline_len // binsize
+        statistic = (baseline[0] - response_bins) / (baseline[1] / np.sqrt(n))
+        pvalue = 2 * t.sf(np.abs(statistic), n - 1)
+    bl_m, bl_s = baseline
     # because one-sided
-    significant = (out.pvalue < (threshold * 2)) & (out.statistic < 0)  # type: ignore
+    significant = (pvalue < (threshold * 2)) & (statistic < 0)
 
     L = bw_boundaries(significant)
     n = max(L)
@@ -92,9 +179,22 @@ def wassermann(
             onset = np.where(L == nix)  # onset = find(L==nix,1);
         nix += 1
     imep = 0
+    start = stop = None
     if onset is not None:
         duration_in_ms = duration * 1000 / fs
         if duration_in_ms >= minimum_duration_in_ms:
-            imep = response_bins[onset].mean() - bl_bins.mean()
-    return imep
+            imep = response_bins[onset].mean() - bl_m
+            # the extent of the significant cluster in samples
+            binsize = max(int(fs / 1000), 1)
+            start = tms_sampleidx + minlatency + onset[0][0] * binsize
+            stop = tms_sampleidx + minlatency + (onset[0][-1] + 1) * binsize
+    return detailed(
+        details,
+        imep,
+        trace,
+        onset=start,
+        offset=stop,
+        bl_m=bl_m,
+        bl_s=bl_s,
+    )
 
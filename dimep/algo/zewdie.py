@@ -9,8 +9,53 @@ a time window of 15 to 80 ms from the TMS pulse.
 """
 import numpy as np
 from numpy import ndarray
-from typing import Tuple
-from math import ceil
+from typing import Tuple, Union, overload
+from math import ceil, inf, isfinite
+from dimep.result import Literal, Result, detailed
+from dimep.tools import bounded
+
+
+@overload
+def zewdie(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    discernible_only: bool = ...,
+    details: Literal[False] = ...,
+    baseline: Union[Tuple[float, float], None] = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> float:
+    ...
+
+
+@overload
+def zewdie(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    discernible_only: bool = ...,
+    *,
+    details: Literal[True],
+    baseline: Union[Tuple[float, float], None] = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> Result:
+    ...
+
+
+@overload
+def zewdie(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    discernible_only: bool = ...,
+    details: bool = ...,
+    baseline: Union[Tuple[float, float], None] = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> Union[float, Result]:
+    ...
 
 
 def zewdie(
@@ -18,7 +63,11 @@ def zewdie(
     tms_sampleidx: int,
     fs: float = 1000,
     discernible_only: bool = False,
-) -> float:
+    details: bool = False,
+    baseline: Union[Tuple[float, float], None] = None,
+    horizon_in_ms: float = inf,
+    baseline_in_ms: float = inf,
+) -> Union[float, Result]:
     """Estimate the peak-to-peak amplitude of an iMEP based on Zewdie 2017
 
 
@@ -34,6 +83,14 @@ def zewdie(
         the sampling rate of the signal
     discernible_only: bool
         whether to report only discernible MEPS (i.e. amplitude >= 50 µV). defaults to False
+    details: bool
+        whether to return a :class:`~dimep.result.Result` with the intermediates of the estimation instead of the bare estimate. defaults to False
+    baseline: Union[Tuple[float, float], None]
+        the precomputed mean and SD of the baseline period, e.g. from :meth:`~.BaselineIndex.baseline`. If None, they are calculated from the trace
+    horizon_in_ms: float
+        the maximal duration after TMS which is analysed. Later samples are ignored, so the cost of a call does not grow with the length of the trace. Defaults to inf, i.e. the whole trace after TMS, so the cost is only bounded if a finite horizon is passed
+    baseline_in_ms: float
+        the maximal duration before TMS which is analysed. Earlier samples are ignored, which shortens the baseline, as it covers the whole trace before TMS. Defaults to inf, i.e. the whole trace before TMS
 
     returns
     -------
@@ -50,13 +107,26 @@ def zewdie(
         :func:`~.odergren` also uses a threshold with absolute units, but 100µV instead of 50µV. :func:`.lewis` is very similar, but uses stricter criterio for discernibility.
 
     """
+    if isfinite(horizon_in_ms) or isfinite(baseline_in_ms):
+        return bounded(
+            zewdie,
+            trace,
+            tms_sampleidx,
+            fs,
+            horizon_in_ms,
+            baseline_in_ms,
+            discernible_only=discernible_only,
+            details=details,
+            baseline=baseline,
+        )
 
     # different to :func:`~.lewis`, the duration of the baseline period is not
     # specified, therefore we include the whole trace until the TMS pulse
     # NOTE: Paper does not specify formula for SD
-    baseline = trace[:tms_sampleidx]
-    bl_m = baseline.mean()
-    bl_s = baseline.std(ddof=1)
+    if baseline is None:
+        period = trace[:tms_sampleidx]
+        baseline = period.mean(), period.std(ddof=1)
+    bl_m, bl_s = baseline
     # identified  MEP  onset as the time point when the EMG exceeded 3
     # standard deviations from mean background EMG
     # The paper does not clarify whether this was an additional threshold
@@ -78,6 +148,14 @@ def zewdie(
         amp = 0.0
 
     if discernible_only:
-        return amp if amp >= 50.0 else 0.0
-    else:
-        return amp
+        amp = amp if amp >= 50.0 else 0.0
+    return detailed(
+        details,
+        amp,
+        trace,
+        onset=tms_sampleidx + minlatency,
+        offset=tms_sampleidx + maxlatency,
+        bl_m=bl_m,
+        bl_s=bl_s,
+        threshold=threshold,
+    )
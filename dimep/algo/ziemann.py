@@ -10,9 +10,56 @@ where duration is the length of the period during which the poststimulus EMG exc
 
 import numpy as np
 from numpy import ndarray
-from typing import Tuple
-from math import ceil
-from dimep.tools import bw_boundaries
+from typing import Tuple, Union, overload
+from math import ceil, inf, isfinite
+from dimep.tools import bw_boundaries, coarse_blocksize, coarse_runs, bounded
+from dimep.result import Literal, Result, detailed
+
+
+@overload
+def ziemann(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    minimum_duration_in_ms: float = ...,
+    details: Literal[False] = ...,
+    baseline: Union[Tuple[float, float], None] = ...,
+    coarse_in_ms: Union[float, None] = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> float:
+    ...
+
+
+@overload
+def ziemann(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    minimum_duration_in_ms: float = ...,
+    *,
+    details: Literal[True],
+    baseline: Union[Tuple[float, float], None] = ...,
+    coarse_in_ms: Union[float, None] = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> Result:
+    ...
+
+
+@overload
+def ziemann(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = ...,
+    minimum_duration_in_ms: float = ...,
+    details: bool = ...,
+    baseline: Union[Tuple[float, float], None] = ...,
+    coarse_in_ms: Union[float, None] = ...,
+    horizon_in_ms: float = ...,
+    baseline_in_ms: float = ...,
+) -> Union[float, Result]:
+    ...
 
 
 def ziemann(
@@ -20,7 +67,12 @@ def ziemann(
     tms_sampleidx: int,
     fs: float = 1000,
     minimum_duration_in_ms: float = 5,
-) -> float:
+    details: bool = False,
+    baseline: Union[Tuple[float, float], None] = None,
+    coarse_in_ms: Union[float, None] = None,
+    horizon_in_ms: float = inf,
+    baseline_in_ms: float = inf,
+) -> Union[float, Result]:
     """Estimate the normalized area of of an iMEP based on Ziemann 1999
     
     Returns the normalized area, if it is 1 SD above baseline activity for at least 5ms.
@@ -39,6 +91,19 @@ def ziemann(
     minimum_duration_in_ms: float = 5
         the number of milliseconds the iMEP needs to be above threshold 
 
+    details: bool
+        whether to return a :class:`~dimep.result.Result` with the intermediates of the estimation instead of the bare estimate. defaults to False
+
+    baseline: Union[Tuple[float, float], None]
+        the precomputed mean and SD of the rectified baseline period, e.g. from :meth:`~.BaselineIndex.baseline`. If None, they are calculated from the trace
+
+    coarse_in_ms: Union[float, None]
+        the duration of the blocks for an opt-in coarse-to-fine detection, e.g. 1ms. This gives identical results, but is faster at high sampling rates. If None, every sample is scanned
+    horizon_in_ms: float
+        the maximal duration after TMS which is analysed. Later samples are ignored, so the cost of a call does not grow with the length of the trace. Defaults to inf, i.e. the whole trace after TMS, so the cost is only bounded if a finite horizon is passed
+    baseline_in_ms: float
+        the maximal duration before TMS which is analysed. Earlier samples are ignored, but never those of the baseline from -50 to 0ms. Defaults to inf, i.e. the whole trace before TMS
+
     returns
     -------
     area: float
@@ -55,38 +120,68 @@ def ziemann(
 
 
     """
-    baseline_start = tms_sampleidx - ceil(50 * fs / 1000)
+    if isfinite(horizon_in_ms) or isfinite(baseline_in_ms):
+        return bounded(
+            ziemann,
+            trace,
+            tms_sampleidx,
+            fs,
+            horizon_in_ms,
+            baseline_in_ms,
+            minimum_duration_in_ms=minimum_duration_in_ms,
+            details=details,
+            baseline=baseline,
+            coarse_in_ms=coarse_in_ms,
+        )
     # select baseline and response
-    baseline = np.abs(trace)[baseline_start:tms_sampleidx]
+    if baseline is None:
+        baseline_start = tms_sampleidx - ceil(50 * fs / 1000)
+        period = np.abs(trace)[baseline_start:tms_sampleidx]
+        # to be consistent with Matlab defaults
+        baseline = period.mean(), period.std(ddof=1)
     response = np.abs(trace)[tms_sampleidx:]
     # calculate threshold
-    bl_m = baseline.mean()
-    bl_s = baseline.std(ddof=1)  # to be consistent with Matlab defaults
+    bl_m, bl_s = baseline
     threshold = bl_m + 1 * bl_s
 
     # select a period of at least 5ms duration
-
-    L = bw_boundaries(response > threshold)
-    n = max(L)
     active_idx = None
     duration_in_ms: float = 0.0
-    nix = 1
-    while nix <= n:
-        # translate number of samples into duration in ms
-        duration_in_ms = sum(L == nix) * 1000 / fs
-        if duration_in_ms >= minimum_duration_in_ms:
-            active_idx = np.where(L == nix)
-            break
-        nix += 1
-
+    if coarse_in_ms is None:
+        L = bw_boundaries(response > threshold)
+        n = max(L)
+        nix = 1
+        while nix <= n:
+            # translate number of samples into duration in ms
+            duration_in_ms = sum(L == nix) * 1000 / fs
+            if duration_in_ms >= minimum_duration_in_ms:
+                active_idx = np.where(L == nix)
+                break
+            nix += 1
+    else:
+        blocksize = coarse_blocksize(coarse_in_ms, fs)
+        for first, after in coarse_runs(response, threshold, blocksize):
+            duration_in_ms = (after - first) * 1000 / fs
+            if duration_in_ms >= minimum_duration_in_ms:
+                active_idx = (np.arange(first, after),)
+                break
+
+    intermediates = dict(bl_m=bl_m, bl_s=bl_s, threshold=threshold)
     # active_idx is None if trace is never above threshold for at least 5ms
     if active_idx == None:
-        return 0.0
+        return detailed(details, 0.0, trace, **intermediates)
     else:
         # initialise dEMG
-        delta: float = float(np.mean(response[active_idx]) - np.mean(baseline))
+        delta: float = float(np.mean(response[active_idx]) - bl_m)
         # can be negative, therefore we set a boundary at zero (instead
         # of using an if-clause to return 0.0
         delta = max([delta, 0.0])
         dEMG: float = delta * duration_in_ms
-        return dEMG
+        return detailed(
+            details,
+            dEMG,
+            trace,
+            onset=tms_sampleidx + active_idx[0][0],
+            offset=tms_sampleidx + active_idx[0][-1] + 1,
+            **intermediates,
+        )
@@ -1,8 +1,22 @@
 """Main Access Point for DiMEP Algorithms"""
 from dimep.algo import *
+import dimep.algo
 from dimep.version import version
+from dimep.sinks import CHUNK_ROWS, Sink
+from dimep.ragged import Ragged
+from dimep.result import Literal, Result
 from numpy import ndarray
-from typing import Dict
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    Mapping,
+    Sequence,
+    Tuple,
+    Union,
+    overload,
+)
+import numpy as np
 
 
 def available() -> None:
@@ -13,7 +27,42 @@ def available() -> None:
         print(algo)
 
 
-def all(trace: ndarray, tms_sampleidx: int) -> Dict[str, float]:
+@overload
+def all(
+    trace: ndarray,
+    tms_sampleidx: int,
+    details: Literal[False] = ...,
+    lazy: bool = ...,
+) -> Mapping[str, float]:
+    ...
+
+
+@overload
+def all(
+    trace: ndarray,
+    tms_sampleidx: int,
+    details: Literal[True],
+    lazy: bool = ...,
+) -> Mapping[str, Result]:
+    ...
+
+
+@overload
+def all(
+    trace: ndarray,
+    tms_sampleidx: int,
+    details: bool = ...,
+    lazy: bool = ...,
+) -> Mapping[str, Union[float, Result]]:
+    ...
+
+
+def all(
+    trace: ndarray,
+    tms_sampleidx: int,
+    details: bool = False,
+    lazy: bool = False,
+) -> Mapping[str, Union[float, Result]]:
     """Estimate the iMEP amplitude in the given trace with all implemented algorithms
     
     args
@@ -22,17 +71,165 @@ def all(trace: ndarray, tms_sampleidx: int) -> Dict[str, float]:
         the one-dimensional (samples,) EMG signal
     tms_sampleidx: int
         the sample at which the TMS pulse was applied
+    details: bool
+        whether to return a :class:`~dimep.result.Result` with the intermediates of each estimation instead of the bare estimate. defaults to False
+    lazy: bool
+        whether to return a :class:`Lazy` mapping, which runs each algorithm only when its estimate is read. defaults to False
     
 
     returns
     -------
-    estimtes: Dict[str, float]
-        a dictionary of estimates, with the algorithm name as key and the estimate as value
+    estimtes: Mapping[str, Union[float, Result]]
+        a dictionary of estimates, with the algorithm name as key and the estimate, or its :class:`~dimep.result.Result` with details=True, as value
     
     """
     from dimep.algo import __all__
 
+    if lazy:
+        return Lazy(trace, tms_sampleidx, details=details)
     out = dict()
     for algo in __all__:
-        out[str(algo)] = eval(algo)(trace, tms_sampleidx=tms_sampleidx)
+        out[str(algo)] = getattr(dimep.algo, algo)(
+            trace, tms_sampleidx=tms_sampleidx, details=details
+        )
+    return out
+
+
+class Lazy(Mapping):
+    """Estimates of all implemented algorithms, calculated only when read
+
+    Each algorithm runs when its key is read for the first time, and its estimate is memoized. Intermediates shared by several algorithms, e.g. the baseline of :func:`~.chen` and :func:`~.bradnam`, are calculated only once. Iterating over the mapping, e.g. with `dict(...)`, runs all algorithms and gives the same result as :func:`all`.
+
+    args
+    ----
+    trace:ndarray
+        the one-dimensional (samples,) EMG signal
+    tms_sampleidx: int
+        the sample at which the TMS pulse was applied
+    details: bool
+        whether to return a :class:`~dimep.result.Result` with the intermediates of each estimation instead of the bare estimate. defaults to False
+    """
+
+    def __init__(
+        self, trace: ndarray, tms_sampleidx: int, details: bool = False
+    ):
+        from dimep.algo import __all__
+
+        self.trace = trace
+        self.tms_sampleidx = tms_sampleidx
+        self.details = details
+        self._algorithms = list(__all__)
+        self._estimates: Dict[str, Union[float, Result]] = dict()
+        self._baseline: Union[Tuple[float, float], None] = None
+
+    def _chen_baseline(self) -> Tuple[float, float]:
+        from dimep.algo.chen import chen_baseline
+
+        if self._baseline is None:
+            self._baseline = chen_baseline(self.trace, self.tms_sampleidx)
+        return self._baseline
+
+    def __getitem__(self, algo: str) -> Union[float, Result]:
+        if algo not in self._algorithms:
+            raise KeyError(algo)
+        if algo not in self._estimates:
+            kwargs: Dict[str, Any] = dict(details=self.details)
+            if algo in ("chen", "bradnam"):
+                kwargs["baseline"] = self._chen_baseline()
+            self._estimates[algo] = getattr(dimep.algo, algo)(
+                self.trace, tms_sampleidx=self.tms_sampleidx, **kwargs
+            )
+        return self._estimates[algo]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._algorithms)
+
+    def __len__(self) -> int:
+        return len(self._algorithms)
+
+    def __repr__(self) -> str:
+        return f"Lazy(evaluated={list(self._estimates.keys())})"
+
+
+def batch(
+    traces: Union[ndarray, Ragged],
+    tms_sampleidx: Union[int, ndarray],
+    fs: float = 1000,
+    algorithms: Union[Sequence[str], None] = None,
+    exclude: Union[ndarray, None] = None,
+    details: bool = False,
+    axis: int = -1,
+    sink: Union[Sink, None] = None,
+) -> Dict[str, ndarray]:
+    """Estimate the iMEP amplitude in many traces with all implemented algorithms
+
+    args
+    ----
+    traces: Union[ndarray, Ragged]
+        the two-dimensional (trials, samples) EMG signals, or a :class:`~.Ragged` batch of trials of different length. Each trial is passed to the algorithms as a view limited to its own samples
+    tms_sampleidx: Union[int, ndarray]
+        the sample at which the TMS pulse was applied, either for all or for each trial
+    fs:float
+        the sampling rate of the signal
+    algorithms: Union[Sequence[str], None]
+        the names of the algorithms to run, defaults to all implemented algorithms. Unknown names raise a ValueError
+    exclude: Union[ndarray, None]
+        trials to skip entirely, e.g. the reason codes returned by :func:`dimep.screen.screen`. All trials with a nonzero value are skipped. Trials without samples after the TMS, e.g. empty trials of a :class:`~.Ragged` batch, are skipped, too.
+    details: bool
+        whether to return structured arrays with the intermediates of each estimation (see :func:`dimep.result.records`) instead of the bare estimates. defaults to False
+    axis: int
+        the axis of the samples in traces, e.g. 0 for a (samples, trials) matrix. Each trial is passed to the algorithms as a view, for either layout, see :func:`~.as_trials`
+    sink: Union[Sink, None]
+        a sink to which the estimates are written, with the row of each trace as trial id, see :mod:`dimep.sinks`. The estimates are written in chunks of :data:`~.CHUNK_ROWS` trials as soon as each chunk is completed
+
+    returns
+    -------
+    estimates: Dict[str, ndarray]
+        a dictionary of estimates, with the algorithm name as key and the estimates for each trial as value. Skipped trials are nan.
+
+    """
+    from dimep.algo import __all__
+    from dimep.result import Result
+    from dimep.tools import as_trials
+
+    traces = as_trials(traces, axis)
+    algorithms = __all__ if algorithms is None else algorithms
+    unknown = set(algorithms) - set(__all__)
+    if unknown:
+        raise ValueError(f"Unknown algorithms {sorted(unknown)}")
+    n_trials = len(traces)
+    tms = np.broadcast_to(np.asarray(tms_sampleidx, dtype=int), (n_trials,))
+    skip = (
+        np.zeros(n_trials, dtype=bool)
+        if exclude is None
+        else np.asarray(exclude) != 0
+    )
+    # as in screen, a trial without samples after the TMS has no response
+    if isinstance(traces, Ragged):
+        lengths = traces.lengths
+    else:
+        lengths = np.array([len(trace) for trace in traces], dtype=int)
+    skip = skip | (tms >= lengths)
+    dtype = Result.dtype if details else np.dtype(float)
+    empty = np.array(Result(np.nan).as_record() if details else np.nan, dtype)
+    out = {str(algo): np.full(n_trials, empty) for algo in algorithms}
+    written = 0
+    for ix, trace in enumerate(traces):
+        if not skip[ix]:
+            for algo in algorithms:
+                estimate = getattr(dimep.algo, algo)(
+                    trace, tms_sampleidx=int(tms[ix]), fs=fs, details=details
+                )
+                record = estimate.as_record() if details else estimate
+                out[str(algo)][ix] = record
+        # write each chunk as soon as its last trial is estimated
+        if sink is not None and (
+            ix + 1 - written == CHUNK_ROWS or ix + 1 == n_trials
+        ):
+            chunk = slice(written, ix + 1)
+            sink.write(
+                np.arange(chunk.start, chunk.stop),
+                {algo: values[chunk] for algo, values in out.items()},
+            )
+            written = ix + 1
     return out
@@ -0,0 +1,197 @@
+"""Constant-time baseline statistics for many pulses of a continuous recording
+
+Each algorithm calculates the mean and SD of its own baseline period before the TMS, e.g. 30ms for :func:`~.lewis` or 100ms for :func:`~.chen`. For a continuous recording with many pulses, :class:`BaselineIndex` precomputes prefix sums of the raw and rectified signal and of their squares once, at the boundaries of blocks of samples. Afterwards, the mean and SD of any window are available from at most two partial blocks, and can be passed as `baseline` to the algorithms instead of slicing each trace.
+
+Example::
+
+    from dimep.baseline import BaselineIndex
+    from dimep.epoch import epoch
+    from dimep.api import lewis
+    index = BaselineIndex(recording, fs=5000)
+    epochs = epoch(recording, pulses, fs=5000)
+    for trace, pulse in zip(epochs, epochs.pulses):
+        bl = index.baseline("lewis", pulse)
+        lewis(trace, epochs.tms_sampleidx, fs=5000, baseline=bl)
+"""
+from numpy import ndarray
+import numpy as np
+from math import ceil
+from typing import Dict, Tuple, Union
+
+#: the baseline window of each algorithm in ms relative to the TMS, and whether the signal is rectified. The baseline of zewdie covers the whole trace before the TMS and depends on the epoch.
+WINDOWS: Dict[str, Tuple[Tuple[float, float], bool]] = {
+    "bradnam": ((-100, 0), True),
+    "chen": ((-100, 0), True),
+    "lewis": ((-30, 0), False),
+    "loyda": ((-200, 0), True),
+    "summers": ((-100, -5), True),
+    "wassermann": ((-150, 0), True),
+    "ziemann": ((-50, 0), True),
+}
+
+Pulses = Union[int, ndarray]
+
+
+class BaselineIndex:
+    """prefix sums of a continuous recording for baseline statistics
+
+    The signal is shifted by its mean before summation, which keeps the squared sums small and the variance accurate for long recordings. The sums are only kept at the boundaries of blocks of blocksize samples, so the index takes 4 floats per block, e.g. 56kB for one hour at 5kHz instead of 576MB for prefix sums over every sample. The recording is read in chunks, so a memory-mapped recording is never loaded as a whole. The statistics of a window add the samples of the partial blocks at both of its ends, which are read from the recording at each query.
+
+    args
+    ----
+    recording:ndarray
+        the one-dimensional (samples,) continuous EMG recording, e.g. a memory-mapped channel
+    fs:float
+        the sampling rate of the signal
+    blocksize: int
+        the number of samples between two stored prefix sums. Larger blocks save memory, smaller blocks make each query faster. defaults to 1024
+    """
+
+    def __init__(
+        self, recording: ndarray, fs: float = 1000, blocksize: int = 1024
+    ):
+        if np.ndim(recording) != 1:
+            raise ValueError("The index requires a one-dimensional recording")
+        self.fs = fs
+        self.recording = recording
+        self.blocksize = blocksize
+        self.n_samples = len(recording)
+        # read at most this many samples at once while building the index
+        chunk = blocksize * max(2 ** 16 // blocksize, 1)
+        parts = [
+            slice(start, min(start + chunk, self.n_samples))
+            for start in range(0, self.n_samples, chunk)
+        ]
+        self._sums: Dict[bool, Tuple[float, ndarray, ndarray]] = {}
+        for rectified in (False, True):
+            total = sum(np.sum(self._signal(p, rectified)) for p in parts)
+            shift = float(total) / self.n_samples if self.n_samples else 0.0
+            s1 = np.zeros(-(-self.n_samples // blocksize) + 1)
+            s2 = np.zeros(len(s1))
+            for part in parts:
+                signal = self._signal(part, rectified) - shift
+                blocks = np.arange(0, len(signal), blocksize)
+                first = part.start // blocksize + 1
+                filled = slice(first, first + len(blocks))
+                s1[filled] = np.add.reduceat(signal, blocks)
+                s2[filled] = np.add.reduceat(signal * signal, blocks)
+            np.cumsum(s1, out=s1)
+            np.cumsum(s2, out=s2)
+            self._sums[rectified] = (shift, s1, s2)
+
+    def _signal(self, part: slice, rectified: bool) -> ndarray:
+        "a part of the raw or rectified recording"
+        signal = np.asarray(self.recording[part], dtype=float)
+        return np.abs(signal) if rectified else signal
+
+    def _prefix(
+        self, ends: ndarray, rectified: bool
+    ) -> Tuple[ndarray, ndarray]:
+        "the shifted sums of the samples before each end and of their squares"
+        shift, s1, s2 = self._sums[rectified]
+        block = ends // self.blocksize
+        p1 = np.array(s1[block])
+        p2 = np.array(s2[block])
+        for ix in np.flatnonzero(ends % self.blocksize):
+            first = int(block.flat[ix]) * self.blocksize
+            part = slice(first, int(ends.flat[ix]))
+            signal = self._signal(part, rectified) - shift
+            p1.flat[ix] += np.sum(signal)
+            p2.flat[ix] += np.sum(signal * signal)
+        return p1, p2
+
+    def stats(
+        self, start: Pulses, stop: Pulses, rectified: bool = True
+    ) -> Tuple[Union[float, ndarray], Union[float, ndarray]]:
+        """the mean and SD (with ddof=1) of the samples from start to stop
+
+        args
+        ----
+        start: Union[int, ndarray]
+            the first sample of one or many windows
+        stop: Union[int, ndarray]
+            the sample after the last sample of one or many windows
+        rectified: bool
+            whether to use the rectified signal
+
+        returns
+        -------
+        baseline:Tuple[float, float]
+            the mean and SD of each window, nan if the window is empty or not within the recording
+        """
+        start = np.asarray(start, dtype=int)
+        stop = np.asarray(stop, dtype=int)
+        shift = self._sums[rectified][0]
+        ok = (start >= 0) & (stop <= self.n_samples) & (stop > start)
+        lo = np.where(ok, start, 0)
+        hi = np.where(ok, stop, 0)
+        n = hi - lo
+        lo1, lo2 = self._prefix(lo, rectified)
+        hi1, hi2 = self._prefix(hi, rectified)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            total = hi1 - lo1
+            mean = total / n
+            var = (hi2 - lo2 - total * mean) / (n - 1)
+            std = np.sqrt(np.clip(var, 0, None))
+        mean = np.where(ok, mean + shift, np.nan)
+        std = np.where(ok & (n > 1), std, np.nan)
+        if mean.ndim == 0:
+            return float(mean), float(std)
+        return mean, std
+
+    def window(
+        self,
+        pulses: Pulses,
+        window_in_ms: Tuple[float, float],
+        rectified: bool = True,
+    ) -> Tuple[Union[float, ndarray], Union[float, ndarray]]:
+        """the mean and SD of a window relative to one or many pulses
+
+        args
+        ----
+        pulses: Union[int, ndarray]
+            the sample of each TMS pulse in the recording
+        window_in_ms: Tuple[float, float]
+            the start and end of the baseline relative to the pulse, e.g. (-100, -5). Durations are converted to samples as in the algorithms.
+        rectified: bool
+            whether to use the rectified signal
+        """
+        pulses = np.asarray(pulses, dtype=int)
+        start = pulses - ceil(-window_in_ms[0] * self.fs / 1000)
+        stop = pulses - ceil(-window_in_ms[1] * self.fs / 1000)
+        return self.stats(start, stop, rectified)
+
+    def baseline(
+        self,
+        algorithm: str,
+        pulses: Pulses,
+        pre_in_ms: Union[float, None] = None,
+    ) -> Tuple[Union[float, ndarray], Union[float, ndarray]]:
+        """the baseline statistics of an algorithm for one or many pulses
+
+        args
+        ----
+        algorithm: str
+            the name of the algorithm, e.g. "lewis"
+        pulses: Union[int, ndarray]
+            the sample of each TMS pulse in the recording
+        pre_in_ms: Union[float, None]
+            the duration of the epochs before the TMS, only required for :func:`~.zewdie`, whose baseline covers the whole trace before the TMS
+
+        returns
+        -------
+        baseline:Tuple[float, float]
+            the mean and SD for the `baseline` argument of the algorithm
+        """
+        if algorithm == "zewdie":
+            if pre_in_ms is None:
+                raise ValueError("The baseline of zewdie requires pre_in_ms")
+            return self.window(pulses, (-pre_in_ms, 0), rectified=False)
+        if algorithm == "wassermann" and int(self.fs / 1000) != 1:
+            raise ValueError(
+                "The baseline of wassermann is calculated over 1ms bins, which are single samples only for sampling rates from 1000 to 1999Hz"
+            )
+        if algorithm not in WINDOWS:
+            raise ValueError(f"{algorithm} does not use a baseline")
+        window_in_ms, rectified = WINDOWS[algorithm]
+        return self.window(pulses, window_in_ms, rectified)
@@ -0,0 +1,203 @@
+"""The first principal component of large (samples, trials) matrices
+
+The simulation in :doc:`simsource` only needs the first component of the decomposition. Instead of a full PCA, :func:`first_component` estimates it by power iteration or by a randomized SVD, using only products of the matrix with a few vectors. The trials are centered implicitly, so a float32 memory-mapped matrix is read block by block and never copied or cast as a whole. With `inplace=True`, the matrix is centered in place instead.
+
+Example::
+
+    from dimep.decomposition import first_component, orient_principal
+    data = np.load("trials.npy", mmap_mode="r")  # (samples, trials)
+    component = first_component(data, method="randomized")
+    flipper = orient_principal(data, component)
+"""
+from numpy import ndarray
+import numpy as np
+from typing import Callable, NamedTuple, Union
+
+
+class Component(NamedTuple):
+    #: the (samples,) score of the first component, with the singular value as norm
+    score: ndarray
+    #: the (trials,) coefficients of the first component, with unit norm
+    coefficients: ndarray
+    #: the singular value of the first component
+    value: float
+
+
+def orient(score: ndarray) -> ndarray:
+    """orient the sign of one or a batch of scores
+
+    The sign of a score/coefficient pair is arbitrary. As in :doc:`simsource`, a score is inverted if its positive peak occurs later than its negative peak.
+
+    args
+    ----
+    score:ndarray
+        the (samples,) score or the (batch, samples) scores
+
+    returns
+    -------
+    sign:ndarray
+        1 or -1 for each score, to be multiplied with the score and its coefficients
+    """
+    late = np.argmax(score, axis=-1) > np.argmin(score, axis=-1)
+    return np.where(late, -1.0, 1.0)
+
+
+def orient_principal(
+    data: ndarray, component: Union[Component, None] = None
+) -> ndarray:
+    """the sign for each trial to align all trials with the first component
+
+    args
+    ----
+    data:ndarray
+        the (samples, trials) matrix
+    component: Union[Component, None]
+        the first component of the matrix, estimated if not given
+
+    returns
+    -------
+    flipper:ndarray
+        1 or -1 for each trial, so that `flipper * data` has only non-negative coefficients on the first component
+    """
+    if component is None:
+        component = first_component(data)
+    return np.where(component.coefficients < 0, -1.0, 1.0)
+
+
+def _blocks(n_samples: int, blocksize: Union[int, None]):
+    step = n_samples if blocksize is None else max(int(blocksize), 1)
+    return [
+        slice(i, min(i + step, n_samples)) for i in range(0, n_samples, step)
+    ]
+
+
+def _dot(data: ndarray, mean: ndarray, v: ndarray, blocksize) -> ndarray:
+    "the product of the centered matrix with (trials, k) vectors"
+    out = np.empty((data.shape[0], v.shape[1]))
+    w = v.astype(data.dtype, copy=False)
+    shift = mean @ v
+    for block in _blocks(data.shape[0], blocksize):
+        out[block] = data[block] @ w - shift
+    return out
+
+
+def _tdot(data: ndarray, mean: ndarray, u: ndarray, blocksize) -> ndarray:
+    "the product of the transposed centered matrix with (samples, k) vectors"
+    out = np.zeros((data.shape[1], u.shape[1]))
+    w = u.astype(data.dtype, copy=False)
+    for block in _blocks(data.shape[0], blocksize):
+        out += data[block].T @ w[block]
+    return out - np.outer(mean, u.sum(axis=0))
+
+
+def _center(data: ndarray, blocksize) -> ndarray:
+    "the mean of each trial, or zeros after centering the matrix in place"
+    mean = np.zeros(data.shape[1])
+    for block in _blocks(data.shape[0], blocksize):
+        mean += data[block].sum(axis=0, dtype=float)
+    return mean / data.shape[0]
+
+
+def first_component(
+    data: ndarray,
+    method: str = "power",
+    iterations: int = 100,
+    tol: float = 1e-8,
+    oversample: int = 10,
+    rng: Union[np.random.Generator, None] = None,
+    inplace: bool = False,
+    blocksize: Union[int, None] = None,
+    orientation: Union[Callable[[ndarray], ndarray], None] = orient,
+) -> Component:
+    """the first principal component of a (samples, trials) matrix
+
+    args
+    ----
+    data:ndarray
+        the (samples, trials) matrix, e.g. a float32 memory-mapped array
+    method: str
+        "power" for a power iteration, or "randomized" for a randomized SVD with `iterations` power iterations on the range, in which case a few iterations suffice
+    iterations: int
+        the maximal number of power iterations
+    tol: float
+        the power iteration stops once the coefficients change by less than tol
+    oversample: int
+        the number of additional random vectors of the randomized SVD
+    rng: Union[np.random.Generator, None]
+        the generator for the random start vectors
+    inplace: bool
+        whether to center the trials of the matrix in place, which requires a writeable array
+    blocksize: Union[int, None]
+        the number of samples read at once, defaults to all
+    orientation: Union[Callable[[ndarray], ndarray], None]
+        the rule returning the sign of the score, defaults to :func:`orient`. If None, the sign is arbitrary.
+
+    returns
+    -------
+    component: Component
+        the score, coefficients and singular value of the first component
+    """
+    if method not in ("power", "randomized"):
+        raise ValueError(f"Unknown method {method}")
+    rng = np.random.default_rng() if rng is None else rng
+    mean = _center(data, blocksize)
+    if inplace:
+        for block in _blocks(data.shape[0], blocksize):
+            data[block] -= mean.astype(data.dtype)
+        mean = np.zeros_like(mean)
+    n_trials = data.shape[1]
+    if method == "power":
+        v = rng.standard_normal((n_trials, 1))
+        v /= np.linalg.norm(v)
+        for _ in range(iterations):
+            w = _tdot(data, mean, _dot(data, mean, v, blocksize), blocksize)
+            w /= max(np.linalg.norm(w), 1e-300)
+            done = min(np.abs(w - v).max(), np.abs(w + v).max()) < tol
+            v = w
+            if done:
+                break
+        u = _dot(data, mean, v, blocksize)[:, 0]
+        coefficients = v[:, 0]
+    else:
+        k = min(1 + oversample, *data.shape)
+        q, _ = np.linalg.qr(
+            _dot(data, mean, rng.standard_normal((n_trials, k)), blocksize)
+        )
+        for _ in range(iterations):
+            z, _ = np.linalg.qr(_tdot(data, mean, q, blocksize))
+            q, _ = np.linalg.qr(_dot(data, mean, z, blocksize))
+        b = _tdot(data, mean, q, blocksize).T
+        ub, s, vt = np.linalg.svd(b, full_matrices=False)
+        u = q @ ub[:, 0] * s[0]
+        coefficients = vt[0]
+    sign = 1.0 if orientation is None else float(orientation(u))
+    return Component(sign * u, sign * coefficients, float(np.linalg.norm(u)))
+
+
+def first_components(stack: ndarray) -> ndarray:
+    """the oriented scores of the first component of a batch of small matrices
+
+    The leading eigenvector of the smaller of the two gram matrices of each matrix is calculated exactly by a batched :func:`numpy.linalg.eigh`, i.e. the first component of an SVD truncated to one component. In contrast to an iteration, this converges for every matrix, also for noisy resamples of very few trials with close singular values.
+
+    args
+    ----
+    stack:ndarray
+        the (batch, samples, trials) matrices
+
+    returns
+    -------
+    scores:ndarray
+        the (batch, samples) scores with unit norm, oriented by :func:`orient`
+    """
+    data = stack - stack.mean(axis=1, keepdims=True)
+    n_samples, n_trials = data.shape[1:]
+    if n_trials <= n_samples:
+        gram = np.matmul(data.transpose(0, 2, 1), data)
+    else:
+        gram = np.matmul(data, data.transpose(0, 2, 1))
+    # eigenvalues are in ascending order
+    v = np.linalg.eigh(gram)[1][..., -1]
+    if n_trials <= n_samples:
+        v = np.matmul(data, v[..., None])[..., 0]
+        v /= np.maximum(np.linalg.norm(v, axis=1, keepdims=True), 1e-300)
+    return v * orient(v)[:, None]
@@ -0,0 +1,307 @@
+"""A memory-mapped reader for EDF and EDF+ files
+
+The data records of the file are memory-mapped and only decoded on request. Digital values are scaled to physical units only for the requested samples, e.g. the epochs around each TMS pulse. For EDF+ files, TMS pulses stored as annotations can be converted into sample indices. In discontinuous EDF+D files, the data records are not contiguous in time, so annotations are mapped through the time-keeping annotation of each data record, and epochs never span a gap between records.
+
+Example::
+
+    from dimep.edf import EDF
+    from dimep.api import batch
+    edf = EDF("session.edf")
+    pulses = edf.triggers("EMG", description="TMS")
+    epochs = edf.epochs("EMG", pulses, pre_in_ms=250, post_in_ms=250)
+    estimates = batch(epochs, tms_sampleidx=edf.samples_in_ms("EMG", 250), fs=edf.fs("EMG"))
+
+.. seealso::
+
+    Kemp, B. & Olivan, J. European data format 'plus' (EDF+), an EDF alike standard format for the exchange of physiological data. Clinical Neurophysiology, 2003, 114, 1755-1761
+"""
+from numpy import ndarray
+import numpy as np
+from math import ceil
+from pathlib import Path
+from typing import List, NamedTuple, Union
+import re
+
+ANNOTATIONS = "EDF Annotations"
+Channel = Union[int, str]
+
+
+class Annotation(NamedTuple):
+    #: the onset in seconds relative to the start of the recording
+    onset: float
+    #: the duration in seconds, 0.0 if not given
+    duration: float
+    #: the text of the annotation
+    description: str
+
+
+def _fields(raw: bytes, widths: List[int], n: int) -> List[List[str]]:
+    "split the signal header, where each field is stored for all signals"
+    out, pos = [], 0
+    for width in widths:
+        out.append(
+            [
+                raw[pos + i * width : pos + (i + 1) * width]
+                .decode("latin-1")
+                .strip()
+                for i in range(n)
+            ]
+        )
+        pos += width * n
+    return out
+
+
+_TAL = re.compile(
+    r"([+-]\d+(?:\.\d*)?)(?:\x15(\d+(?:\.\d*)?))?\x14((?:[^\x00]*?\x14)*)\x00"
+)
+
+
+def _timekeeping(raw: bytes) -> Union[float, None]:
+    "the onset of a data record, i.e. of the first TAL of its annotations"
+    match = _TAL.search(raw.decode("utf-8", "replace"))
+    return None if match is None else float(match.group(1))
+
+
+def parse_tal(raw: bytes) -> List[Annotation]:
+    "parse the time-stamped annotation lists of an EDF+ annotation record"
+    out = []
+    for onset, duration, texts in _TAL.findall(raw.decode("utf-8", "replace")):
+        for text in texts.split("\x14")[:-1]:
+            if text:
+                out.append(
+                    Annotation(float(onset), float(duration or 0.0), text)
+                )
+    return out
+
+
+class EDF:
+    """a memory-mapped EDF or EDF+ file
+
+    args
+    ----
+    path: Union[str, Path]
+        the path to the EDF file
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        with self.path.open("rb") as f:
+            header = f.read(256)
+            n_signals = int(header[252:256])
+            signals = f.read(256 * n_signals)
+        self.patient = header[8:88].decode("latin-1").strip()
+        self.recording = header[88:168].decode("latin-1").strip()
+        self.startdate = header[168:176].decode("latin-1").strip()
+        self.starttime = header[176:184].decode("latin-1").strip()
+        self.header_bytes = int(header[184:192])
+        self.reserved = header[192:236].decode("latin-1").strip()
+        self.record_duration = float(header[244:252])
+        (
+            self.labels,
+            self.transducers,
+            self.units,
+            pmin,
+            pmax,
+            dmin,
+            dmax,
+            self.prefilters,
+            n_samples,
+            _,
+        ) = _fields(signals, [16, 80, 8, 8, 8, 8, 8, 80, 8, 32], n_signals)
+        self.n_samples = np.asarray(n_samples, dtype=int)
+        self.offsets = np.concatenate(([0], np.cumsum(self.n_samples)))
+        physical = np.asarray(pmax, float) - np.asarray(pmin, float)
+        digital = np.asarray(dmax, float) - np.asarray(dmin, float)
+        self.gain = physical / digital
+        self.offset = np.asarray(pmin, float) - self.gain * np.asarray(
+            dmin, float
+        )
+        record_bytes = 2 * int(self.offsets[-1])
+        n_records = int(header[236:244])
+        if n_records < 0:
+            size = self.path.stat().st_size - self.header_bytes
+            n_records = size // record_bytes
+        self.n_records = n_records
+        #: the digital values of all data records, as a memory-mapped (records, samples) array
+        self.records = np.memmap(
+            self.path,
+            dtype="<i2",
+            mode="r",
+            offset=self.header_bytes,
+            shape=(self.n_records, int(self.offsets[-1])),
+        )
+
+    @property
+    def is_edfplus(self) -> bool:
+        return self.reserved.startswith("EDF+")
+
+    @property
+    def is_discontinuous(self) -> bool:
+        "whether the data records of an EDF+D file can have gaps in time"
+        return self.reserved.startswith("EDF+D")
+
+    def record_onsets(self) -> ndarray:
+        """the onset of each data record in seconds
+
+        For EDF+ files, the onsets are read from the time-keeping annotation of each data record, otherwise the data records are contiguous.
+        """
+        contiguous = np.arange(self.n_records) * self.record_duration
+        if ANNOTATIONS not in self.labels:
+            return contiguous
+        ix = self.labels.index(ANNOTATIONS)
+        block = self.records[:, self.offsets[ix] : self.offsets[ix + 1]]
+        onsets = [_timekeeping(record.tobytes()) for record in block]
+        return np.asarray(
+            [c if o is None else o for o, c in zip(onsets, contiguous)],
+            dtype=float,
+        )
+
+    def _segments(self) -> ndarray:
+        "the contiguous segment each data record belongs to"
+        if not self.is_discontinuous:
+            return np.zeros(self.n_records, dtype=int)
+        step = np.diff(self.record_onsets())
+        gaps = ~np.isclose(step, self.record_duration)
+        return np.concatenate(([0], np.cumsum(gaps)))
+
+    def index(self, channel: Channel) -> int:
+        "the index of a channel, given by its label or index"
+        if isinstance(channel, str):
+            return self.labels.index(channel)
+        return int(channel)
+
+    def fs(self, channel: Channel) -> float:
+        "the sampling rate of a channel"
+        return self.n_samples[self.index(channel)] / self.record_duration
+
+    def samples_in_ms(self, channel: Channel, duration_in_ms: float) -> int:
+        "the number of samples of a channel covering a duration"
+        return ceil(duration_in_ms * self.fs(channel) / 1000)
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def length(self, channel: Channel) -> int:
+        "the total number of samples of a channel"
+        return int(self.n_records * self.n_samples[self.index(channel)])
+
+    def read(
+        self,
+        channel: Channel,
+        start: int = 0,
+        stop: Union[int, None] = None,
+        physical: bool = True,
+    ) -> ndarray:
+        """read a range of samples of a channel
+
+        Only the data records covering the range are touched and decoded.
+
+        args
+        ----
+        channel: Channel
+            the label or index of the channel
+        start: int
+            the first sample to read
+        stop: Union[int, None]
+            the sample after the last sample to read, defaults to the end of the recording
+        physical: bool
+            whether to scale the digital values to physical units
+
+        returns
+        -------
+        samples:ndarray
+            the one-dimensional (samples,) signal
+        """
+        ix = self.index(channel)
+        n = int(self.n_samples[ix])
+        length = self.length(ix)
+        stop = length if stop is None else min(stop, length)
+        start = max(start, 0)
+        if stop <= start:
+            return np.zeros(0, dtype=float if physical else "<i2")
+        first, last = start // n, ceil(stop / n)
+        block = self.records[
+            first:last, self.offsets[ix] : self.offsets[ix] + n
+        ].reshape(-1)[start - first * n : stop - first * n]
+        if not physical:
+            return np.array(block)
+        return block * self.gain[ix] + self.offset[ix]
+
+    def epochs(
+        self,
+        channel: Channel,
+        pulses: ndarray,
+        pre_in_ms: float = 250,
+        post_in_ms: float = 250,
+    ) -> ndarray:
+        """read and scale the epochs around each pulse
+
+        Pulses too close to the edges of the recording to cut a full epoch are skipped, see :func:`dimep.epoch.epoch`, and so are pulses whose epoch would span a gap between the data records of an EDF+D file.
+
+        returns
+        -------
+        epochs:ndarray
+            the (trials, samples) epochs in physical units, with the pulse at sample `samples_in_ms(channel, pre_in_ms)`
+        """
+        pre = self.samples_in_ms(channel, pre_in_ms)
+        post = self.samples_in_ms(channel, post_in_ms)
+        length = self.length(channel)
+        pulses = np.asarray(pulses, dtype=int)
+        pulses = pulses[(pulses - pre >= 0) & (pulses + post <= length)]
+        if self.is_discontinuous:
+            n = int(self.n_samples[self.index(channel)])
+            segments = self._segments()
+            first = segments[(pulses - pre) // n]
+            last = segments[(pulses + post - 1) // n]
+            pulses = pulses[first == last]
+        out = np.empty((len(pulses), pre + post))
+        for row, pulse in zip(out, pulses):
+            row[:] = self.read(channel, pulse - pre, pulse + post)
+        return out
+
+    def annotations(self) -> List[Annotation]:
+        "all annotations of an EDF+ file, without the time-keeping entries"
+        out: List[Annotation] = []
+        for ix, label in enumerate(self.labels):
+            if label != ANNOTATIONS:
+                continue
+            block = self.records[:, self.offsets[ix] : self.offsets[ix + 1]]
+            for record in block:
+                out.extend(parse_tal(record.tobytes()))
+        return out
+
+    def triggers(
+        self, channel: Channel, description: Union[str, None] = None
+    ) -> ndarray:
+        """the sample indices of annotated events, e.g. TMS pulses
+
+        Each onset is mapped into the data record covering it, using :meth:`record_onsets`, so the sample indices are correct for EDF+D files with gaps between their data records. Events within a gap have no sample and are skipped.
+
+        args
+        ----
+        channel: Channel
+            the label or index of the channel whose sampling rate is used
+        description: Union[str, None]
+            only annotations with this text are considered, defaults to all
+
+        returns
+        -------
+        pulses:ndarray
+            the sample index of each annotated event
+        """
+        fs = self.fs(channel)
+        n = int(self.n_samples[self.index(channel)])
+        onsets = np.asarray(
+            [
+                a.onset
+                for a in self.annotations()
+                if description is None or a.description == description
+            ],
+            dtype=float,
+        )
+        starts = self.record_onsets()
+        record = np.searchsorted(starts, onsets, side="right") - 1
+        delay = onsets - starts[np.clip(record, 0, None)]
+        inside = (record >= 0) & (delay < self.record_duration)
+        samples = record * n + np.round(delay * fs).astype(int)
+        return samples[inside]
@@ -0,0 +1,151 @@
+"""Zero-copy epoching of continuous recordings into trials
+
+Epochs are views into the continuous recording (or into a memory-mapped file) and no samples are copied. Each epoch can be handed directly to the algorithms, with :attr:`Epochs.tms_sampleidx` as the sample of the TMS pulse.
+
+Example::
+
+    from dimep.trigger import detect
+    from dimep.epoch import epoch
+    from dimep.api import batch
+    recording = np.load("session.npy", mmap_mode="r")
+    pulses = detect(recording, fs=5000)
+    epochs = epoch(recording, pulses, fs=5000, pre_in_ms=250, post_in_ms=250)
+    estimates = batch(epochs, epochs.tms_sampleidx, fs=5000)
+"""
+from numpy import ndarray
+import numpy as np
+from math import ceil
+from numpy.lib.stride_tricks import as_strided, sliding_window_view
+from typing import Iterator, Union
+
+
+class Epochs:
+    """trials cut from a continuous recording, as views without copies
+
+    Indexing with an integer returns the one-dimensional (samples,) trial as a view into the recording, indexing with a slice or an array of indices returns a subset of the epochs. Iterating returns all trials in order.
+
+    .. note::
+
+        Converting the epochs into a two-dimensional array with `np.asarray` copies the samples. If the pulses are equally spaced, :meth:`view` returns the (trials, samples) matrix as a strided view instead.
+    """
+
+    def __init__(
+        self,
+        recording: ndarray,
+        starts: ndarray,
+        n_samples: int,
+        tms_sampleidx: int,
+        dropped: ndarray,
+    ):
+        self.recording = recording
+        #: a (samples - n_samples + 1, n_samples) view of all possible windows
+        self.windows = sliding_window_view(recording, n_samples)
+        #: the first sample of each epoch in the recording
+        self.starts = starts
+        #: the number of samples of each epoch
+        self.n_samples = n_samples
+        #: the sample of the TMS pulse in each epoch
+        self.tms_sampleidx = tms_sampleidx
+        #: the pulses which could not be cut, because they were too close to the edges of the recording
+        self.dropped = dropped
+
+    @property
+    def pulses(self) -> ndarray:
+        "the sample of the TMS pulse of each epoch in the recording"
+        return self.starts + self.tms_sampleidx
+
+    @property
+    def shape(self):
+        return (len(self.starts), self.n_samples)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, key) -> Union[ndarray, "Epochs"]:
+        if isinstance(key, (int, np.integer)):
+            return self.windows[self.starts[key]]
+        return Epochs(
+            self.recording,
+            self.starts[key],
+            self.n_samples,
+            self.tms_sampleidx,
+            self.dropped,
+        )
+
+    def __iter__(self) -> Iterator[ndarray]:
+        for start in self.starts:
+            yield self.windows[start]
+
+    def __array__(self, dtype=None) -> ndarray:
+        out = self.windows[self.starts]
+        return out if dtype is None else out.astype(dtype)
+
+    def view(self) -> ndarray:
+        """the (trials, samples) matrix as a strided view into the recording
+
+        Only possible if the pulses are equally spaced, raises a ValueError otherwise.
+        """
+        if len(self.starts) == 0:
+            return self.windows[:0]
+        spacing = np.unique(np.diff(self.starts))
+        if len(spacing) > 1 or (len(spacing) == 1 and spacing[0] <= 0):
+            raise ValueError(
+                "A strided view requires equally spaced, increasing pulses"
+            )
+        step = int(spacing[0]) if len(spacing) == 1 else 1
+        first = self.windows[self.starts[0]]
+        stride = self.recording.strides[0]
+        return as_strided(
+            first,
+            shape=self.shape,
+            strides=(step * stride, stride),
+            writeable=False,
+        )
+
+
+def epoch(
+    recording: ndarray,
+    pulses: ndarray,
+    fs: float = 1000,
+    pre_in_ms: float = 250,
+    post_in_ms: float = 250,
+    edges: str = "drop",
+) -> Epochs:
+    """Cut a continuous recording into epochs around each TMS pulse
+
+    args
+    ----
+    recording:ndarray
+        the one-dimensional (samples,) continuous EMG recording, e.g. a single channel of a memory-mapped file
+    pulses:ndarray
+        the sample indices of the TMS pulses, e.g. from :func:`dimep.trigger.detect`
+    fs:float
+        the sampling rate of the signal
+    pre_in_ms: float
+        the duration of each epoch before the TMS pulse. Make sure this covers the baseline periods of the algorithms, which are up to 200ms long.
+    post_in_ms: float
+        the duration of each epoch after the TMS pulse
+    edges: str
+        how to handle pulses too close to the beginning or end of the recording to cut a full epoch. "drop" skips them and lists them in :attr:`Epochs.dropped`, "raise" raises a ValueError.
+
+    returns
+    -------
+    epochs: Epochs
+        the epochs as views into the recording
+    """
+    if np.ndim(recording) != 1:
+        raise ValueError(
+            "Epoching requires a one-dimensional recording, select a channel first"
+        )
+    if edges not in ("drop", "raise"):
+        raise ValueError(f"Unknown edge handling {edges}")
+    pre = ceil(pre_in_ms * fs / 1000)
+    post = ceil(post_in_ms * fs / 1000)
+    pulses = np.asarray(pulses, dtype=int)
+    starts = pulses - pre
+    fits = (starts >= 0) & (pulses + post <= recording.shape[0])
+    if edges == "raise" and not np.all(fits):
+        raise ValueError(
+            f"Pulses {pulses[~fits]} are too close to the edges of the recording"
+        )
+    return Epochs(recording, starts[fits], pre + post, pre, pulses[~fits])
@@ -0,0 +1,231 @@
+"""Parallel execution of the algorithms over chunks of trials
+
+An :class:`Executor` splits the trials into chunks and runs :func:`dimep.api.batch` on each chunk in a pool of workers. The results are identical to :func:`dimep.api.batch`. Threads share the traces without copying them, but the per-trial loops of the algorithms are Python code which holds the GIL, so threads only overlap where numpy and scipy release it, e.g. in the FFTs of :func:`~.guggenberger`. For a speedup with all algorithms, use processes, which pay for copying each chunk to its worker. See `test/test_executor.py` for a benchmark against :func:`dimep.api.batch`.
+
+Example::
+
+    from dimep.executor import Executor
+    executor = Executor(n_workers=4, processes=True)
+    estimates = executor.run(traces, tms_sampleidx=1000, fs=1000)
+"""
+from numpy import ndarray
+import numpy as np
+from concurrent.futures import Executor as Pool
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from os import cpu_count
+from time import perf_counter
+from typing import Any, Dict, List, Sequence, Tuple, Union
+from dimep.tools import as_trials
+from dimep.sinks import Sink
+from dimep.ragged import Ragged
+
+#: the number of bytes a chunk of trials should occupy to stay in the cache
+CACHE_BYTES = 2 ** 20
+
+Estimates = Dict[str, ndarray]
+
+
+def chunks(n_trials: int, chunksize: int, start: int = 0) -> List[slice]:
+    "split the trials into consecutive chunks of at most chunksize trials"
+    return [
+        slice(first, min(first + chunksize, n_trials))
+        for first in range(start, n_trials, chunksize)
+    ]
+
+
+def _compact(traces):
+    "a ragged chunk which only references its own samples, for pickling"
+    if isinstance(traces, Ragged):
+        return Ragged(traces.values(), traces.offsets - traces.offsets[0])
+    return traces
+
+
+def _run_chunk(traces, tms: ndarray, kwargs: Dict[str, Any]) -> Estimates:
+    from dimep.api import batch
+
+    return batch(traces, tms, **kwargs)
+
+
+def _concatenate(results: List[Estimates]) -> Estimates:
+    return {
+        algo: np.concatenate([result[algo] for result in results])
+        for algo in results[0].keys()
+    }
+
+
+class Executor:
+    """Run the algorithms in a pool of workers over chunks of trials
+
+    args
+    ----
+    n_workers: Union[int, None]
+        the number of workers, defaults to the number of CPUs
+    chunksize: Union[int, None]
+        the number of trials per chunk. If None, it is tuned with :meth:`calibrate` at the first call of :meth:`run` and reused afterwards.
+    processes: bool
+        whether the workers are processes instead of threads. Each chunk is then copied to its worker, but the per-trial loops run in parallel. defaults to False
+    """
+
+    def __init__(
+        self,
+        n_workers: Union[int, None] = None,
+        chunksize: Union[int, None] = None,
+        processes: bool = False,
+    ):
+        self.n_workers = n_workers or cpu_count() or 1
+        self.chunksize = chunksize
+        self.processes = processes
+
+    def _pool(self) -> Pool:
+        if self.processes:
+            return ProcessPoolExecutor(max_workers=self.n_workers)
+        return ThreadPoolExecutor(max_workers=self.n_workers)
+
+    def _candidates(self, traces) -> List[int]:
+        "candidates centered on the number of trials fitting into the cache"
+        trial_bytes = max(np.asarray(traces[0]).nbytes, 1)
+        center = max(CACHE_BYTES // trial_bytes, 1)
+        return sorted(
+            {max(center // 4, 1), max(center // 2, 1), center, center * 2}
+        )
+
+    def _calibrate(
+        self,
+        pool: Pool,
+        traces,
+        tms: ndarray,
+        kwargs: Dict[str, Any],
+        candidates: Sequence[int],
+        max_trials: int,
+        sink: Union[Sink, None] = None,
+    ) -> Tuple[List[Estimates], int]:
+        "time each candidate on its own block of trials, keeping the estimates"
+        results: List[Estimates] = []
+        best: Tuple[float, int] = (np.inf, 1)
+        start = 0
+        for candidate in candidates:
+            stop = min(start + max_trials, len(traces))
+            if stop == start:
+                break
+            candidate = int(min(candidate, stop - start))
+            t0 = perf_counter()
+            results += self._map(
+                pool, traces, tms, candidate, kwargs, sink, start, stop
+            )
+            per_trial = (perf_counter() - t0) / (stop - start)
+            best = min(best, (per_trial, candidate))
+            start = stop
+        self.chunksize = best[1]
+        return results, start
+
+    def calibrate(
+        self,
+        traces: Union[ndarray, Sequence[ndarray], Ragged],
+        tms_sampleidx: Union[int, ndarray],
+        fs: float = 1000,
+        algorithms: Union[Sequence[str], None] = None,
+        candidates: Union[Sequence[int], None] = None,
+        max_trials: int = 256,
+    ) -> int:
+        """tune the chunksize with short calibration runs
+
+        By default, the candidates are centered on the number of trials fitting into :data:`CACHE_BYTES`. Each candidate is timed on its own block of up to max_trials consecutive trials, and the one with the shortest time per trial is kept as chunksize. When :meth:`run` calibrates, the estimates of these blocks are kept, so no trial is estimated twice.
+
+        returns
+        -------
+        chunksize: int
+            the number of trials per chunk with the highest throughput
+        """
+        tms = np.broadcast_to(
+            np.asarray(tms_sampleidx, dtype=int), (len(traces),)
+        )
+        with self._pool() as pool:
+            self._calibrate(
+                pool,
+                traces,
+                tms,
+                dict(fs=fs, algorithms=algorithms),
+                candidates or self._candidates(traces),
+                max_trials,
+            )
+        return int(self.chunksize or 1)
+
+    def _map(
+        self,
+        pool: Pool,
+        traces,
+        tms: ndarray,
+        chunksize: int,
+        kwargs: Dict[str, Any],
+        sink: Union[Sink, None] = None,
+        start: int = 0,
+        stop: Union[int, None] = None,
+    ) -> List[Estimates]:
+        parts = chunks(len(traces) if stop is None else stop, chunksize, start)
+        exclude = kwargs.get("exclude", None)
+        futures = [
+            pool.submit(
+                _run_chunk,
+                _compact(traces[chunk]),
+                tms[chunk],
+                dict(
+                    kwargs,
+                    exclude=None if exclude is None else exclude[chunk],
+                ),
+            )
+            for chunk in parts
+        ]
+        results = []
+        # chunks are written in order as soon as they are completed
+        for chunk, future in zip(parts, futures):
+            result = future.result()
+            if sink is not None:
+                sink.write(np.arange(chunk.start, chunk.stop), result)
+            results.append(result)
+        return results
+
+    def run(
+        self,
+        traces: Union[ndarray, Sequence[ndarray], Ragged],
+        tms_sampleidx: Union[int, ndarray],
+        fs: float = 1000,
+        algorithms: Union[Sequence[str], None] = None,
+        exclude: Union[ndarray, None] = None,
+        details: bool = False,
+        axis: int = -1,
+        sink: Union[Sink, None] = None,
+    ) -> Estimates:
+        """Estimate the iMEP amplitude in many traces using the pool of workers
+
+        Takes the same arguments and returns the same estimates as :func:`dimep.api.batch`. A sink receives each chunk as soon as it and all preceding chunks are completed.
+        """
+        traces = as_trials(traces, axis)
+        tms = np.broadcast_to(
+            np.asarray(tms_sampleidx, dtype=int), (len(traces),)
+        )
+        kwargs = dict(
+            fs=fs,
+            algorithms=algorithms,
+            exclude=None if exclude is None else np.asarray(exclude),
+            details=details,
+        )
+        if len(traces) == 0:
+            return _run_chunk(traces, tms, dict(kwargs, sink=sink))
+        results: List[Estimates] = []
+        start = 0
+        with self._pool() as pool:
+            if self.chunksize is None:
+                results, start = self._calibrate(
+                    pool,
+                    traces,
+                    tms,
+                    kwargs,
+                    self._candidates(traces),
+                    256,
+                    sink,
+                )
+            chunksize = int(self.chunksize or 1)
+            results += self._map(
+                pool, traces, tms, chunksize, kwargs, sink, start
+            )
+        return _concatenate(results)
@@ -0,0 +1,268 @@
+"""Persistent sidecar index of the trials of a session file
+
+Reopening a study should not require rescanning every file for trial boundaries and pulses, or recomputing the baseline quality. :func:`write_index` scans a `.npy` data file once and stores a compact binary sidecar next to it, with the boundaries, `tms_sampleidx`, baseline statistics and a content hash of each trial, and the sampling rate and a content hash of the whole file. A :class:`SessionIndex` memory-maps the sidecar on reopen, so any subset of trials is accessible in constant time without touching the others. Comparing the hashes of two indices tells the drivers which trials changed, and the others can be skipped.
+
+Example::
+
+    from dimep.index import SessionIndex, sidecar, write_index
+    from dimep.api import batch
+    # on the first run, there is no index yet and every trial has changed
+    previous = SessionIndex("s01.npy") if sidecar("s01.npy").exists() else None
+    index = write_index("s01.npy", tms_sampleidx=1000, fs=1000)
+    changed = index.changed(previous)
+    estimates = batch(index.trials(), index.tms, exclude=~changed)
+"""
+from numpy import ndarray
+import numpy as np
+import hashlib
+import os
+import struct
+from math import ceil
+from pathlib import Path
+from typing import Union
+from dimep.ragged import Ragged
+
+PathLike = Union[str, Path]
+
+MAGIC = b"DIMEPIDX"
+VERSION = 1
+#: magic, version, fs, number of trials, number of samples and file hash
+HEADER = struct.Struct("<8sIdqq32s")
+#: the size of the header, padded to keep the records aligned
+HEADER_BYTES = 128
+#: one record per trial. Start and stop are sample indices into the flattened data file, tms is relative to the start of the trial, bl_m and bl_s are the mean and SD of the rectified baseline, and digest is a hash of the samples of the trial
+RECORD = np.dtype(
+    [
+        ("start", "<i8"),
+        ("stop", "<i8"),
+        ("tms", "<i8"),
+        ("bl_m", "<f8"),
+        ("bl_s", "<f8"),
+        ("digest", "<u8"),
+    ]
+)
+
+
+def sidecar(path: PathLike) -> Path:
+    "the path of the index of a data file"
+    path = Path(path)
+    return path.with_name(path.name + ".idx")
+
+
+def file_digest(path: PathLike, blocksize: int = 2 ** 20) -> bytes:
+    "the content hash of a file, read in blocks"
+    digest = hashlib.blake2b(digest_size=32)
+    with Path(path).open("rb") as f:
+        for block in iter(lambda: f.read(blocksize), b""):
+            digest.update(block)
+    return digest.digest()
+
+
+def _trial_digest(trial: ndarray) -> int:
+    raw = hashlib.blake2b(np.ascontiguousarray(trial).data, digest_size=8)
+    return int.from_bytes(raw.digest(), "little")
+
+
+def _flat(data: ndarray) -> ndarray:
+    "the samples of a memory-mapped data file as one flat buffer, uncopied"
+    if data.ndim > 1 and not data.flags.c_contiguous:
+        raise ValueError(
+            "The trials of a Fortran-ordered file are not contiguous, save it in C order"
+        )
+    return data.reshape(-1)
+
+
+def write_index(
+    path: PathLike,
+    tms_sampleidx: Union[int, ndarray],
+    fs: float = 1000,
+    offsets: Union[ndarray, None] = None,
+    baseline_duration_in_ms: float = 100,
+) -> "SessionIndex":
+    """scan a data file once and write its index next to it
+
+    The sidecar is replaced atomically, so an index opened before remains valid and can be compared with the new one, see :meth:`SessionIndex.changed`.
+
+    args
+    ----
+    path: PathLike
+        the `.npy` data file, either with (trials, samples) traces or with a one-dimensional recording cut into trials by offsets
+    tms_sampleidx: Union[int, ndarray]
+        the sample at which the TMS pulse was applied relative to the start of each trial, either for all or for each trial
+    fs:float
+        the sampling rate of the signal
+    offsets: Union[ndarray, None]
+        for a one-dimensional recording, the boundaries of the trials as for a :class:`~.Ragged` batch
+    baseline_duration_in_ms: float
+        the duration of the baseline period immediatly before TMS. Its statistics are calculated from the rectified EMG as in :func:`~.chen_baseline`, and are nan if the period is not within the trial
+
+    returns
+    -------
+    index: SessionIndex
+        the memory-mapped index
+    """
+    path = Path(path)
+    data = np.load(path, mmap_mode="r")
+    if offsets is None:
+        if data.ndim != 2:
+            raise ValueError("A recording requires the offsets of the trials")
+        n_trials, n_samples = data.shape
+        offsets = np.arange(n_trials + 1) * n_samples
+    elif data.ndim != 1:
+        raise ValueError("Offsets are only valid for a one-dimensional file")
+    trials = Ragged(_flat(data), offsets)
+    records = np.zeros(len(trials), dtype=RECORD)
+    records["start"] = trials.starts
+    records["stop"] = trials.offsets[1:]
+    records["tms"] = np.broadcast_to(
+        np.asarray(tms_sampleidx, dtype=int), (len(trials),)
+    )
+    baseline_len = ceil(baseline_duration_in_ms * fs / 1000)
+    for record, trial in zip(records, trials):
+        record["digest"] = _trial_digest(trial)
+        start = int(record["tms"]) - baseline_len
+        if start < 0 or record["tms"] > len(trial) or baseline_len < 2:
+            record["bl_m"] = record["bl_s"] = np.nan
+            continue
+        baseline = np.abs(trial[start : record["tms"]])
+        record["bl_m"] = baseline.mean()
+        record["bl_s"] = baseline.std(ddof=1)
+
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        float(fs),
+        len(trials),
+        len(trials.samples),
+        file_digest(path),
+    )
+    target = sidecar(path)
+    temporary = target.with_name(target.name + ".tmp")
+    with temporary.open("wb") as f:
+        f.write(header.ljust(HEADER_BYTES, b"\0"))
+        f.write(records.tobytes())
+    os.replace(temporary, target)
+    return SessionIndex(path)
+
+
+class SessionIndex:
+    """the memory-mapped index of a data file, see :func:`write_index`
+
+    The data file is memory-mapped once, on the first access to its samples, which fails if its number of samples differs from the index. An index of a file which has grown or shrunk since opens nonetheless, see :attr:`stale`, so its records can still be compared with a new index by :meth:`changed`. The content hash of the file is only checked by :meth:`verify`, which reads the whole file.
+
+    args
+    ----
+    path: PathLike
+        the data file, whose sidecar is opened
+    """
+
+    def __init__(self, path: PathLike):
+        self.path = Path(path)
+        with sidecar(self.path).open("rb") as f:
+            raw = f.read(HEADER.size)
+        if len(raw) < HEADER.size:
+            raise ValueError(f"{sidecar(self.path)} is not an index")
+        magic, version, fs, n_trials, n_samples, digest = HEADER.unpack(raw)
+        if magic != MAGIC:
+            raise ValueError(f"{sidecar(self.path)} is not an index")
+        if version != VERSION:
+            raise ValueError(f"Unsupported index version {version}")
+        #: the sampling rate of the signal
+        self.fs: float = fs
+        #: the number of samples of the flattened data file
+        self.n_samples: int = n_samples
+        #: the content hash of the data file when the index was written
+        self.digest: bytes = digest
+        self._samples: Union[ndarray, None] = None
+        #: the record of each trial, see :data:`RECORD`
+        self.records: ndarray = np.zeros(0, dtype=RECORD)
+        if n_trials > 0:
+            self.records = np.memmap(
+                sidecar(self.path),
+                dtype=RECORD,
+                mode="r",
+                offset=HEADER_BYTES,
+                shape=(n_trials,),
+            )
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def samples(self) -> ndarray:
+        "the samples of the data file as one flat, memory-mapped buffer"
+        if self._samples is None:
+            samples = _flat(np.load(self.path, mmap_mode="r"))
+            if len(samples) != self.n_samples:
+                raise ValueError(
+                    f"{self.path} has {len(samples)} samples, but its index {self.n_samples}, write the index anew"
+                )
+            self._samples = samples
+        return self._samples
+
+    @property
+    def stale(self) -> bool:
+        "whether the number of samples of the data file differs from the index, without reading the samples"
+        return np.load(self.path, mmap_mode="r").size != self.n_samples
+
+    @property
+    def offsets(self) -> ndarray:
+        "the boundaries of the trials in the flattened data file"
+        return np.append(self.records["start"][:1], self.records["stop"])
+
+    @property
+    def tms(self) -> ndarray:
+        "the sample of the TMS pulse relative to the start of each trial"
+        return np.asarray(self.records["tms"])
+
+    @property
+    def baseline(self) -> ndarray:
+        "the (trials, 2) mean and SD of the rectified baseline of each trial"
+        return np.stack((self.records["bl_m"], self.records["bl_s"]), axis=1)
+
+    def trial(self, ix: int) -> ndarray:
+        "the samples of a single trial, memory-mapped from the data file"
+        record = self.records[ix]
+        return self.samples[record["start"] : record["stop"]]
+
+    def trials(self, rows: Union[slice, ndarray, None] = None) -> Ragged:
+        """a batch of some or all trials, memory-mapped from the data file
+
+        args
+        ----
+        rows: Union[slice, ndarray, None]
+            the trials to select, defaults to all. A slice shares the memory map, other selections are copied, see :class:`~.Ragged`
+        """
+        offsets = self.offsets if len(self) else np.zeros(1, dtype=int)
+        batch = Ragged(self.samples, offsets)
+        if rows is None:
+            return batch
+        selected = batch[rows]
+        if not isinstance(selected, Ragged):
+            raise TypeError("Use trial to access a single trial")
+        return selected
+
+    def verify(self) -> bool:
+        "whether the data file still has the content hash of the index"
+        return file_digest(self.path) == self.digest
+
+    def changed(self, previous: Union["SessionIndex", None]) -> ndarray:
+        """which trials differ from those of a previous index of the file
+
+        A trial differs if its samples, boundaries or TMS differ, or if it was not part of the previous index.
+
+        returns
+        -------
+        changed: ndarray
+            whether each trial has changed, e.g. `~changed` as `exclude` for :func:`dimep.api.batch`
+        """
+        changed = np.ones(len(self), dtype=bool)
+        if previous is None:
+            return changed
+        n = min(len(self), len(previous))
+        fields = ["digest", "start", "stop", "tms"]
+        same = np.ones(n, dtype=bool)
+        for field in fields:
+            same &= self.records[field][:n] == previous.records[field][:n]
+        changed[:n] = ~same
+        return changed
@@ -0,0 +1,249 @@
+"""Prefetching of session files on a background thread
+
+When a study is processed file by file, the disk idles while the algorithms run, and the algorithms idle while the next file is loaded. A :class:`Prefetcher` loads the next files, or chunks of trials, on a background thread while the current one is processed, so I/O and compute overlap. The number of loaded but unprocessed chunks is limited by depth, and their memory by max_bytes.
+
+Example::
+
+    from dimep.prefetch import Prefetcher
+    from dimep.api import batch
+    with Prefetcher(["s01.npy", "s02.npy"], depth=2) as reader:
+        for chunk in reader:
+            estimates = batch(chunk.traces, tms_sampleidx=1000)
+    print(reader.stats)
+"""
+from numpy import ndarray
+import numpy as np
+from pathlib import Path
+from queue import Full, Queue
+from threading import Condition, Event, Thread
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterator, NamedTuple, Sequence, Union
+
+PathLike = Union[str, Path]
+
+
+class Chunk(NamedTuple):
+    #: the file the trials were loaded from
+    path: Path
+    #: the index of the first trial of the chunk within the file
+    start: int
+    #: the (trials, samples) traces of the chunk, loaded into memory
+    traces: ndarray
+
+
+class Stats(NamedTuple):
+    #: the number of chunks delivered
+    chunks: int
+    #: the number of bytes delivered
+    nbytes: int
+    #: the seconds spent opening and loading files on the background thread
+    loading: float
+    #: the seconds the consumer waited for the next chunk
+    waiting: float
+    #: the seconds from the first request until the last chunk was processed
+    elapsed: float
+
+
+def _open(path: Path) -> ndarray:
+    return np.load(path, mmap_mode="r")
+
+
+_DONE = object()
+
+
+class Prefetcher:
+    """Iterate over the trials of many files, loading ahead on a thread
+
+    args
+    ----
+    paths: Sequence[PathLike]
+        the session files, by default `.npy` files with (trials, samples) traces
+    depth: int
+        the maximal number of chunks loaded ahead of the chunk being processed
+    max_bytes: int
+        the maximal number of bytes held by chunks loaded ahead. A single chunk larger than max_bytes is still loaded, but only when no other chunk is held
+    chunksize: Union[int, None]
+        the number of trials per chunk. If None, each file is one chunk
+    opener: Callable[[Path], ndarray]
+        opens a file without reading it, e.g. as a memory map. The returned array is only read when its chunk is loaded. Defaults to `np.load(path, mmap_mode="r")`
+    """
+
+    def __init__(
+        self,
+        paths: Sequence[PathLike],
+        depth: int = 2,
+        max_bytes: int = 2 ** 30,
+        chunksize: Union[int, None] = None,
+        opener: Callable[[Path], ndarray] = _open,
+    ):
+        if depth < 1:
+            raise ValueError("The prefetch depth must be at least 1")
+        self.paths = [Path(p) for p in paths]
+        self.depth = depth
+        self.max_bytes = max_bytes
+        self.chunksize = chunksize
+        self.opener = opener
+        self._held = 0
+        self._condition = Condition()
+        self._stop = Event()
+        self._thread: Union[Thread, None] = None
+        self._reset()
+
+    def _reset(self):
+        self._chunks = 0
+        self._nbytes = 0
+        self._loading = 0.0
+        self._waiting = 0.0
+        self._elapsed = 0.0
+
+    def _reserve(self, nbytes: int) -> bool:
+        "wait until the chunk fits into the memory cap, False if stopped"
+        with self._condition:
+            while (
+                self._held > 0
+                and self._held + nbytes > self.max_bytes
+                and not self._stop.is_set()
+            ):
+                self._condition.wait(0.1)
+            if self._stop.is_set():
+                return False
+            self._held += nbytes
+        return True
+
+    def _release(self, nbytes: int):
+        with self._condition:
+            self._held -= nbytes
+            self._condition.notify_all()
+
+    def _put(self, queue: Queue, item: Any) -> bool:
+        "put an item into the queue unless stopped, False if stopped"
+        while not self._stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def _load(self, queue: Queue):
+        try:
+            for path in self.paths:
+                t0 = perf_counter()
+                data = self.opener(path)
+                self._loading += perf_counter() - t0
+                n_trials = len(data)
+                size = self.chunksize or max(n_trials, 1)
+                for start in range(0, n_trials, size):
+                    view = data[start : start + size]
+                    if not self._reserve(view.nbytes):
+                        return
+                    t0 = perf_counter()
+                    traces = np.array(view)
+                    self._loading += perf_counter() - t0
+                    if not self._put(queue, Chunk(path, start, traces)):
+                        return
+        except BaseException as error:
+            self._put(queue, error)
+        else:
+            self._put(queue, _DONE)
+
+    def __iter__(self) -> Iterator[Chunk]:
+        self.close()
+        self._stop.clear()
+        self._held = 0
+        self._reset()
+        queue: Queue = Queue(maxsize=self.depth)
+        self._thread = Thread(target=self._load, args=(queue,), daemon=True)
+        t0 = perf_counter()
+        self._thread.start()
+        previous = 0
+        try:
+            while True:
+                t1 = perf_counter()
+                item = queue.get()
+                self._waiting += perf_counter() - t1
+                # the previous chunk has been processed and can be freed
+                self._release(previous)
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                previous = item.traces.nbytes
+                self._chunks += 1
+                self._nbytes += previous
+                yield item
+        finally:
+            self._elapsed = perf_counter() - t0
+            self.close()
+
+    def close(self):
+        "stop the background thread, e.g. when the iteration was left early"
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def stats(self) -> Stats:
+        "the statistics of the latest iteration"
+        return Stats(
+            self._chunks,
+            self._nbytes,
+            self._loading,
+            self._waiting,
+            self._elapsed,
+        )
+
+
+def throughput(
+    paths: Sequence[PathLike],
+    process: Callable[[Chunk], Any],
+    depth: int = 2,
+    max_bytes: int = 2 ** 30,
+    chunksize: Union[int, None] = None,
+    opener: Callable[[Path], ndarray] = _open,
+) -> Dict[str, float]:
+    """compare the throughput of the sequential loop with prefetching
+
+    args
+    ----
+    paths: Sequence[PathLike]
+        the session files
+    process: Callable[[Chunk], Any]
+        the processing of each chunk, e.g. calling :func:`dimep.api.batch`
+    depth, max_bytes, chunksize, opener:
+        see :class:`Prefetcher`
+
+    returns
+    -------
+    throughput: Dict[str, float]
+        the number of trials processed per second, for the "sequential" loop and when "prefetched"
+    """
+    files = [Path(p) for p in paths]
+    n_trials = 0
+    t0 = perf_counter()
+    for path in files:
+        data = opener(path)
+        size = chunksize or max(len(data), 1)
+        for start in range(0, len(data), size):
+            traces = np.array(data[start : start + size])
+            process(Chunk(path, start, traces))
+            n_trials += len(traces)
+    sequential = perf_counter() - t0
+    t0 = perf_counter()
+    with Prefetcher(files, depth, max_bytes, chunksize, opener) as reader:
+        for chunk in reader:
+            process(chunk)
+    prefetched = perf_counter() - t0
+    return {
+        "sequential": n_trials / max(sequential, 1e-12),
+        "prefetched": n_trials / max(prefetched, 1e-12),
+    }
@@ -0,0 +1,289 @@
+"""Ragged batches of trials of different length
+
+Epochs cut at the next pulse or at segment boundaries differ in length. Instead of padding them into a (trials, samples) matrix, a :class:`Ragged` batch keeps all samples in one flat buffer and the boundaries of the trials in an offsets array, as in the CSR format of sparse matrices. The batched functions, e.g. :func:`dimep.api.batch`, :func:`dimep.screen.screen`, :func:`~.loyda_batch` and :func:`~.match_bank`, accept a ragged batch instead of a matrix, with `tms_sampleidx` relative to the start of each trial. No window ever reaches into a neighbouring trial.
+
+Example::
+
+    from dimep.ragged import Ragged
+    from dimep.api import batch
+    recording = np.load("session.npy", mmap_mode="r")
+    trials = Ragged(recording, offsets=np.r_[segment_starts, len(recording)])
+    estimates = batch(trials, tms_sampleidx=pulses - segment_starts)
+"""
+from numpy import ndarray
+import numpy as np
+from typing import Iterator, Sequence, Tuple, Union
+
+
+class Ragged:
+    """a batch of trials of different length in a flat buffer
+
+    args
+    ----
+    samples: ndarray
+        the one-dimensional buffer of the samples of all trials. It is not copied, e.g. it can be memory-mapped
+    offsets: ndarray
+        the index of the first sample of each trial in samples, followed by the index after the last sample of the last trial, i.e. trial k covers `samples[offsets[k] : offsets[k + 1]]`
+    """
+
+    def __init__(self, samples: ndarray, offsets: ndarray):
+        self.samples = np.asarray(samples)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        if self.samples.ndim != 1 or self.offsets.ndim != 1:
+            raise ValueError("samples and offsets must be one-dimensional")
+        if (
+            len(self.offsets) == 0
+            or self.offsets[0] < 0
+            or self.offsets[-1] > len(self.samples)
+            or np.any(np.diff(self.offsets) < 0)
+        ):
+            raise ValueError("offsets must be non-decreasing within samples")
+        lengths = np.diff(self.offsets)
+        #: the length of all trials if it is identical, e.g. for the rows of a matrix, else None. The reductions then run along the rows of a (trials, samples) view instead of binning each sample
+        self.width: Union[int, None] = (
+            int(lengths[0])
+            if len(lengths) and np.all(lengths == lengths[0])
+            else None
+        )
+
+    @classmethod
+    def from_traces(cls, traces: Sequence[ndarray]) -> "Ragged":
+        "concatenate one-dimensional traces of different length into a batch"
+        lengths = [len(trace) for trace in traces]
+        offsets = np.concatenate(([0], np.cumsum(lengths, dtype=np.int64)))
+        samples = np.concatenate(
+            [np.asarray(t) for t in traces] or [np.zeros(0)]
+        )
+        return cls(samples, offsets)
+
+    @property
+    def starts(self) -> ndarray:
+        "the index of the first sample of each trial in samples"
+        return self.offsets[:-1]
+
+    @property
+    def lengths(self) -> ndarray:
+        "the number of samples of each trial"
+        return np.diff(self.offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __iter__(self) -> Iterator[ndarray]:
+        for start, stop in zip(self.offsets[:-1], self.offsets[1:]):
+            yield self.samples[start:stop]
+
+    def __getitem__(
+        self, index: Union[int, slice, ndarray]
+    ) -> Union[ndarray, "Ragged"]:
+        """a view of a single trial, or a batch of some trials
+
+        A slice of consecutive trials shares the buffer, other selections are copied.
+        """
+        if isinstance(index, (int, np.integer)):
+            ix = range(len(self))[index]
+            return self.samples[self.offsets[ix] : self.offsets[ix + 1]]
+        if isinstance(index, slice):
+            first, last, step = index.indices(len(self))
+            if step == 1:
+                last = max(first, last)
+                return Ragged(self.samples, self.offsets[first : last + 1])
+            index = np.arange(first, last, step)
+        offsets = self.offsets
+        return Ragged.from_traces(
+            [self.samples[offsets[ix] : offsets[ix + 1]] for ix in index]
+        )
+
+    def _matrix(self, values: ndarray) -> ndarray:
+        "a (trials, samples) view of values for trials of identical length"
+        assert self.width is not None
+        return np.asarray(values).reshape(len(self), self.width)
+
+    def rows(self) -> ndarray:
+        "the trial of each sample between the first and last offset"
+        return np.repeat(np.arange(len(self)), self.lengths)
+
+    def local(self) -> ndarray:
+        "the index of each sample within its trial"
+        if self.width is not None:
+            return np.tile(np.arange(self.width), len(self))
+        return np.arange(self.offsets[0], self.offsets[-1]) - np.repeat(
+            self.starts, self.lengths
+        )
+
+    def values(self) -> ndarray:
+        "a view of the samples between the first and last offset"
+        return self.samples[self.offsets[0] : self.offsets[-1]]
+
+    def per_sample(self, values: ndarray) -> ndarray:
+        "repeat a value of each trial for each of its samples"
+        return np.repeat(np.asarray(values), self.lengths)
+
+    def sum(self, values: ndarray) -> ndarray:
+        "the sum of values, given for each sample, within each trial"
+        if self.width is not None:
+            return self._matrix(values).sum(axis=1, dtype=float)
+        return np.bincount(
+            self.rows(), weights=values, minlength=len(self)
+        ).astype(float)
+
+    def max(self, values: ndarray, initial: float = 0.0) -> ndarray:
+        "the maximum of values, given for each sample, within each trial"
+        if self.width is not None:
+            matrix = self._matrix(values)
+            return np.max(matrix, axis=1, initial=initial).astype(float)
+        out = np.full(len(self), initial, dtype=float)
+        np.maximum.at(out, self.rows(), values)
+        return out
+
+    def cumsum(self, values: ndarray) -> ndarray:
+        "the cumulative sum of values, given for each sample, with a leading zero, see :meth:`between`"
+        csum = np.zeros(len(values) + 1)
+        np.cumsum(values, out=csum[1:])
+        return csum
+
+    def between(
+        self,
+        csum: ndarray,
+        start: ndarray,
+        stop: ndarray,
+        rows: Union[ndarray, None] = None,
+    ) -> ndarray:
+        """the sum between start and stop within each trial
+
+        args
+        ----
+        csum: ndarray
+            the cumulative sum from :meth:`cumsum`
+        start: ndarray
+            the first sample of the window relative to the start of its trial
+        stop: ndarray
+            the sample after the window relative to the start of its trial
+        rows: Union[ndarray, None]
+            the trial of each window, defaults to one window per trial
+
+        returns
+        -------
+        sums: ndarray
+            the sum of each window, clipped to the bounds of its trial
+        """
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows)
+        lengths = self.lengths[rows]
+        base = self.offsets[rows] - self.offsets[0]
+        start = np.clip(start, 0, lengths)
+        stop = np.clip(stop, 0, lengths)
+        return csum[base + stop] - csum[base + start]
+
+    def window_sum(
+        self, values: ndarray, start: ndarray, stop: ndarray
+    ) -> ndarray:
+        """the sum of values between start and stop within each trial
+
+        Without reusing the cumulative sum as :meth:`between` does, e.g. for a single window per trial. For trials of identical length, the window is masked instead, which saves the cumulative sum over all samples. A window with stop before start is empty.
+        """
+        if self.width is None:
+            stop = np.maximum(stop, start)
+            return self.between(self.cumsum(values), start, stop)
+        cols = np.arange(self.width)
+        inside = (cols >= np.asarray(start)[:, None]) & (
+            cols < np.asarray(stop)[:, None]
+        )
+        return np.sum(self._matrix(values), axis=1, where=inside, dtype=float)
+
+    def runs(self, bools: ndarray) -> Tuple[ndarray, ndarray, ndarray]:
+        """find all continuous blocks of True within each trial
+
+        The ragged equivalent of :func:`~.runs`, i.e. blocks never continue into the next trial.
+
+        args
+        ----
+        bools: ndarray
+            a boolean for each sample
+
+        returns
+        -------
+        row:ndarray
+            the trial each block belongs to
+        start:ndarray
+            the first sample of each block, relative to the start of its trial
+        stop:ndarray
+            the sample after each block, relative to the start of its trial
+        """
+        bools = np.asarray(bools, dtype=bool)
+        first = self.offsets[:-1] - self.offsets[0]
+        after = self.offsets[1:] - self.offsets[0]
+        filled = self.lengths > 0
+        previous = np.zeros_like(bools)
+        previous[1:] = bools[:-1]
+        previous[first[filled]] = False
+        following = np.zeros_like(bools)
+        following[:-1] = bools[1:]
+        following[after[filled] - 1] = False
+        start = np.flatnonzero(bools & ~previous)
+        stop = np.flatnonzero(bools & ~following) + 1
+        row = np.searchsorted(after, start, side="right")
+        return row, start - first[row], stop - first[row]
+
+    def gather(self, start: ndarray, length: int) -> Tuple[ndarray, ndarray]:
+        """a (trials, length) matrix of a window of each trial
+
+        args
+        ----
+        start: ndarray
+            the first sample of the window of each trial, relative to its start
+        length: int
+            the number of samples of each window
+
+        returns
+        -------
+        windows: ndarray
+            the samples of each window, zero outside of its trial
+        inside: ndarray
+            whether each sample of the windows lies within its trial
+        """
+        ix = np.asarray(start)[:, None] + np.arange(length)
+        inside = (ix >= 0) & (ix < self.lengths[:, None])
+        windows = np.zeros(ix.shape)
+        rows, cols = np.nonzero(inside)
+        windows[rows, cols] = self.samples[self.starts[rows] + ix[rows, cols]]
+        return windows, inside
+
+
+def rectified(
+    traces: Union[ndarray, Ragged], trials: Union[ndarray, None] = None
+) -> Ragged:
+    """the rectified samples of some or all trials as a ragged batch
+
+    A (trials, samples) matrix becomes a batch of fixed-length trials, i.e. its offsets are multiples of the number of samples, so the vectorized kernels, e.g. of :func:`dimep.screen.screen` and :func:`~.loyda_batch`, have a single implementation for both kinds of batches. The rectified samples are written into one new buffer in trial-major order. This buffer is the only copy, whatever the layout of the matrix, and also when only some trials are selected.
+
+    args
+    ----
+    traces: Union[ndarray, Ragged]
+        the two-dimensional (trials, samples) EMG signals, or a :class:`Ragged` batch
+    trials: Union[ndarray, None]
+        the index of the trials to keep, defaults to all trials
+
+    returns
+    -------
+    rectified: Ragged
+        the absolute values of the samples of each trial
+    """
+    if isinstance(traces, Ragged):
+        if trials is None:
+            samples = np.abs(traces.values())
+            return Ragged(samples, traces.offsets - traces.offsets[0])
+        starts, stops = traces.offsets[:-1], traces.offsets[1:]
+        batch = Ragged.from_traces(
+            [traces.samples[starts[ix] : stops[ix]] for ix in trials]
+        )
+        # the selection is already a new buffer, which is rectified in place
+        np.abs(batch.samples, out=batch.samples)
+        return batch
+    if trials is None:
+        matrix = np.abs(traces, order="C")
+    else:
+        matrix = np.empty((len(trials), traces.shape[1]), traces.dtype)
+        np.take(traces, trials, axis=0, out=matrix)
+        np.abs(matrix, out=matrix)
+    n_trials, n_samples = matrix.shape
+    return Ragged(matrix.reshape(-1), np.arange(n_trials + 1) * n_samples)
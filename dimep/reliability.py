@@ -0,0 +1,143 @@
+"""Bootstrap reliability of the waveform of the first principal component
+
+This is the simulation of :doc:`simsource` as a module. For each number of trials, two subsets are drawn with replacement from all trials, the first principal component is estimated on each, and the two waveforms are correlated. The correlations of all repetitions are averaged under the Fisher z-transformation.
+
+In contrast to the annotated source, the resamples are drawn and decomposed in batches, and chunks of repetitions run in a thread pool. Only the first component is calculated, from the leading eigenvector of the small gram matrix of each resample (see :func:`~.first_components`), which is exactly the first component of the full decomposition. A randomized or iterative SVD would approximate it, and the approximation can fail for resamples of few trials, biasing the curve. Each chunk has its own generator spawned from a single seed, so the curve is reproducible independent of the number of workers.
+
+Example::
+
+    from dimep.reliability import reliability
+    # data is the (samples, trials) matrix of all trials
+    ratio, reproducibility = reliability(data, seed=0)
+"""
+from numpy import ndarray
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from os import cpu_count
+from typing import List, Sequence, Tuple, Union
+from dimep.decomposition import first_components
+
+#: the numbers of trials explored by default, as in the annotated source
+RATIO = np.hstack(
+    (
+        np.arange(2, 10, 1, dtype=int),
+        np.arange(10, 100, 10, dtype=int),
+        np.arange(100, 1000, 100, dtype=int),
+    )
+)
+
+
+def get_score(data: ndarray) -> ndarray:
+    """the oriented score of the first principal component
+
+    Flipping the sign of single trials, as :func:`~.orient_principal` does, does not change the score of the first component, so it is not required here.
+
+    args
+    ----
+    data:ndarray
+        the (samples, trials) matrix
+
+    returns
+    -------
+    score:ndarray
+        the (samples,) score with unit norm
+    """
+    return first_components(np.asarray(data, dtype=float)[None])[0]
+
+
+def _correlate(a: ndarray, b: ndarray) -> ndarray:
+    "the row-wise Pearson correlation of two (batch, samples) arrays"
+    a = a - a.mean(axis=1, keepdims=True)
+    b = b - b.mean(axis=1, keepdims=True)
+    return np.sum(a * b, axis=1) / np.sqrt(
+        np.sum(a * a, axis=1) * np.sum(b * b, axis=1)
+    )
+
+
+def _repeat(
+    data: ndarray, pratio: int, reps: int, seed: np.random.SeedSequence
+) -> ndarray:
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, data.shape[1], (2, reps, pratio))
+    # (2, reps, samples, pratio) resamples
+    stack = np.moveaxis(data[:, picks], 0, 2)
+    s1 = first_components(stack[0])
+    s2 = first_components(stack[1])
+    return _correlate(s1, s2)
+
+
+def fisher_mean(correlations: ndarray) -> float:
+    "average correlation coefficients under the Fisher z-transformation"
+    r = np.clip(correlations, -1 + 1e-15, 1 - 1e-15)
+    return float(np.tanh(np.arctanh(r).mean()))
+
+
+def reliability(
+    data: ndarray,
+    ratio: Union[Sequence[int], None] = None,
+    repetitions: Union[Sequence[int], None] = None,
+    seed: Union[int, None] = None,
+    n_workers: Union[int, None] = None,
+    max_bytes: int = 2 ** 26,
+) -> Tuple[ndarray, ndarray]:
+    """the bootstrapped reproducibility of the first component's waveform
+
+    args
+    ----
+    data:ndarray
+        the (samples, trials) matrix of all trials across all subjects
+    ratio: Union[Sequence[int], None]
+        the numbers of trials to explore. Defaults to :data:`RATIO`, up to the number of available trials
+    repetitions: Union[Sequence[int], None]
+        the number of repetitions for each number of trials. Defaults to the number of available trials divided by the number of trials, i.e. more repetitions for small subsets
+    seed: Union[int, None]
+        the seed from which the generators of all chunks are spawned
+    n_workers: Union[int, None]
+        the number of threads, defaults to the number of CPUs
+    max_bytes: int
+        the maximal size of the resamples decomposed in one batch
+
+    returns
+    -------
+    ratio:ndarray
+        the explored numbers of trials
+    reproducibility:ndarray
+        the Fisher z-averaged correlation between the waveforms of two independent subsets for each number of trials
+    """
+    data = np.asarray(data, dtype=float)
+    n_samples, n_trials = data.shape
+    trials = (
+        RATIO[RATIO <= n_trials]
+        if ratio is None
+        else np.asarray(ratio, dtype=int)
+    )
+    reps = np.broadcast_to(
+        np.asarray(
+            n_trials // trials if repetitions is None else repetitions,
+            dtype=int,
+        ),
+        trials.shape,
+    )
+    tasks: List[Tuple[int, int, int]] = []
+    for ix, (pratio, n) in enumerate(zip(trials.tolist(), reps.tolist())):
+        chunksize = max(1, max_bytes // (2 * 8 * n_samples * pratio))
+        for start in range(0, n, chunksize):
+            tasks.append((ix, pratio, min(chunksize, n - start)))
+    seeds = np.random.SeedSequence(seed).spawn(len(tasks))
+    with ThreadPoolExecutor(max_workers=n_workers or cpu_count() or 1) as pool:
+        results = list(
+            pool.map(
+                lambda task: _repeat(data, task[1], task[2], task[3]),
+                [task + (s,) for task, s in zip(tasks, seeds)],
+            )
+        )
+    correlations: List[List[ndarray]] = [[] for _ in trials]
+    for (ix, _, _), result in zip(tasks, results):
+        correlations[ix].append(result)
+    reproducibility = np.array(
+        [
+            fisher_mean(np.concatenate(c)) if c else np.nan
+            for c in correlations
+        ]
+    )
+    return trials, reproducibility
@@ -0,0 +1,163 @@
+"""Result records exposing the intermediates of an estimation
+
+All algorithms accept `details=True` and then return a :class:`Result` instead of the bare estimate. The record holds the intermediates which were computed anyway, e.g. the onset and offset of the iMEP or the baseline statistics, so there is no need to call helpers like :func:`~.chen_onoff` a second time.
+
+Example::
+
+    from dimep.api import chen
+    result = chen(trace, tms_sampleidx=1000, details=True)
+    result.onset, result.offset, float(result)
+"""
+from numpy import ndarray
+import numpy as np
+import sys
+from typing import Dict, Iterable, Union
+
+if sys.version_info >= (3, 8):
+    from typing import Literal
+else:  # pragma: no cover
+    from typing_extensions import Literal
+
+Number = Union[int, float, None]
+
+
+class Result:
+    """the estimate of an algorithm together with its intermediates
+
+    Fields which are not applicable for an algorithm are None. Sample indices are relative to the start of the trace.
+
+    args
+    ----
+    estimate: float
+        the estimate as returned by the algorithm with details=False
+    onset: int
+        the first sample of the iMEP or of the analysis window
+    offset: int
+        the sample after the last sample of the iMEP or of the analysis window
+    peak_max: int
+        the sample of the maximum of the unrectified EMG between onset and offset
+    peak_min: int
+        the sample of the minimum of the unrectified EMG between onset and offset
+    bl_m: float
+        the mean of the baseline period
+    bl_s: float
+        the standard deviation of the baseline period
+    threshold: float
+        the amplitude threshold the iMEP had to exceed
+    lag: int
+        the lag of the best match relative to the TMS, in samples
+    """
+
+    __slots__ = (
+        "estimate",
+        "onset",
+        "offset",
+        "peak_max",
+        "peak_min",
+        "bl_m",
+        "bl_s",
+        "threshold",
+        "lag",
+    )
+
+    #: the dtype of a structured array of results, see :func:`records`
+    dtype = np.dtype(
+        [
+            ("estimate", float),
+            ("onset", int),
+            ("offset", int),
+            ("peak_max", int),
+            ("peak_min", int),
+            ("bl_m", float),
+            ("bl_s", float),
+            ("threshold", float),
+            ("lag", int),
+        ]
+    )
+
+    def __init__(
+        self,
+        estimate: float,
+        onset: Number = None,
+        offset: Number = None,
+        peak_max: Number = None,
+        peak_min: Number = None,
+        bl_m: Number = None,
+        bl_s: Number = None,
+        threshold: Number = None,
+        lag: Number = None,
+    ):
+        self.estimate = estimate
+        self.onset = onset
+        self.offset = offset
+        self.peak_max = peak_max
+        self.peak_min = peak_min
+        self.bl_m = bl_m
+        self.bl_s = bl_s
+        self.threshold = threshold
+        self.lag = lag
+
+    def __float__(self) -> float:
+        return float(self.estimate)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(
+            f"{key}={getattr(self, key)!r}"
+            for key in self.__slots__
+            if getattr(self, key) is not None
+        )
+        return f"Result({fields})"
+
+    def _asdict(self) -> Dict[str, Number]:
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def as_record(self) -> tuple:
+        "the fields as a tuple for :attr:`dtype`, with -1 or nan for None"
+        return tuple(
+            (-1 if self.dtype[key].kind == "i" else np.nan)
+            if getattr(self, key) is None
+            else getattr(self, key)
+            for key in self.__slots__
+        )
+
+
+def records(results: Iterable[Result]) -> ndarray:
+    """convert results into a structured array with :attr:`Result.dtype`
+
+    Integer fields which are not applicable are -1, float fields are nan.
+    """
+    return np.array([r.as_record() for r in results], dtype=Result.dtype)
+
+
+def peaks(trace: ndarray, onset: int, offset: int):
+    "the samples of the maximum and minimum of the trace between onset and offset"
+    if offset <= onset:
+        return None, None
+    window = trace[onset:offset]
+    return onset + int(np.argmax(window)), onset + int(np.argmin(window))
+
+
+def detailed(
+    details: bool,
+    estimate: float,
+    trace: ndarray,
+    onset: Number = None,
+    offset: Number = None,
+    **kwargs: Number,
+) -> Union[float, Result]:
+    "return the bare estimate, or a Result including the peaks if details"
+    if not details:
+        return estimate
+    peak_max, peak_min = (
+        (None, None)
+        if onset is None or offset is None
+        else peaks(trace, int(onset), int(offset))
+    )
+    return Result(
+        estimate,
+        onset=onset,
+        offset=offset,
+        peak_max=peak_max,
+        peak_min=peak_min,
+        **kwargs,
+    )
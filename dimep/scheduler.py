@@ -0,0 +1,177 @@
+"""Time-budgeted estimation for closed-loop setups
+
+After each response window closes, a closed-loop setup has only a few milliseconds to decide on the next pulse. A :class:`Scheduler` runs the algorithms in the order of a priority list, cheap ones first, and starts an algorithm only if its expected cost fits into the time left. The costs are learned at runtime as exponential moving averages of the measured durations. Whatever finished within the budget is returned, and skipped algorithms are flagged. An algorithm which is skipped for its cost is never run within the budget to check the estimate. Instead, :meth:`Scheduler.calibrate` measures it anew after the response window, so an overestimate, e.g. from a cold first call, recovers without exceeding the budget.
+
+Example::
+
+    from dimep.scheduler import Scheduler
+    scheduler = Scheduler()
+    scheduler.warmup(trace, tms_sampleidx=1000)
+    outcome = scheduler.run(trace, tms_sampleidx=1000, budget_in_ms=2)
+    outcome.estimates, outcome.skipped
+    # e.g. while waiting for the next pulse
+    scheduler.calibrate(trace, tms_sampleidx=1000)
+"""
+import dimep.algo
+from numpy import ndarray
+from time import perf_counter
+from typing import Any, Dict, List, NamedTuple, Sequence, Tuple, Union
+
+#: the default priority. The cheapest algorithms run first, the algorithms based on bw_boundaries later, and the statistical and template-based algorithms only if time is left
+PRIORITY: Tuple[str, ...] = (
+    "bawa",
+    "odergren",
+    "rotenberg",
+    "zewdie",
+    "lewis",
+    "bradnam",
+    "summers",
+    "loyda",
+    "ziemann",
+    "chen",
+    "wassermann",
+    "guggenberger",
+)
+
+
+class Outcome(NamedTuple):
+    #: the estimates of the algorithms which finished, in order of priority
+    estimates: Dict[str, Any]
+    #: the algorithms which were skipped, because they did not fit into the budget
+    skipped: List[str]
+    #: the duration of the whole run in ms
+    elapsed_in_ms: float
+
+
+class Scheduler:
+    """Run the algorithms by priority within a time budget
+
+    args
+    ----
+    priority: Sequence[str]
+        the names of the algorithms in the order in which they are run. Defaults to :data:`PRIORITY`
+    smoothing: float
+        the weight of the latest duration in the moving average of the cost of an algorithm, between 0 and 1
+    costs_in_ms: Union[Dict[str, float], None]
+        initial estimates of the cost of each algorithm. An algorithm without an estimate is run whenever any time is left, and its first duration becomes its estimate, see :meth:`warmup`
+    """
+
+    def __init__(
+        self,
+        priority: Sequence[str] = PRIORITY,
+        smoothing: float = 0.2,
+        costs_in_ms: Union[Dict[str, float], None] = None,
+    ):
+        unknown = set(priority) - set(dimep.algo.__all__)
+        if unknown:
+            raise ValueError(f"Unknown algorithms {sorted(unknown)}")
+        self.priority = list(priority)
+        self.smoothing = smoothing
+        #: the current estimate of the cost of each algorithm in ms
+        self.costs_in_ms: Dict[str, float] = dict(costs_in_ms or {})
+        #: the algorithms skipped for their cost since the last :meth:`calibrate`
+        self.stale: List[str] = []
+
+    def _measure(
+        self,
+        algo: str,
+        trace: ndarray,
+        tms_sampleidx: int,
+        replace: bool = False,
+        **kwargs,
+    ):
+        t0 = perf_counter()
+        estimate = getattr(dimep.algo, algo)(trace, tms_sampleidx, **kwargs)
+        duration = (perf_counter() - t0) * 1000
+        if algo in self.costs_in_ms and not replace:
+            self.costs_in_ms[algo] += self.smoothing * (
+                duration - self.costs_in_ms[algo]
+            )
+        else:
+            self.costs_in_ms[algo] = duration
+        return estimate
+
+    def warmup(
+        self,
+        trace: ndarray,
+        tms_sampleidx: int,
+        fs: float = 1000,
+        repetitions: int = 3,
+    ) -> Dict[str, float]:
+        """learn the costs by running every algorithm on a typical trace
+
+        returns
+        -------
+        costs_in_ms: Dict[str, float]
+            the estimated cost of each algorithm in ms
+        """
+        for _ in range(repetitions):
+            for algo in self.priority:
+                self._measure(algo, trace, tms_sampleidx, fs=fs)
+        return dict(self.costs_in_ms)
+
+    def calibrate(
+        self, trace: ndarray, tms_sampleidx: int, fs: float = 1000
+    ) -> Dict[str, float]:
+        """measure the algorithms anew which were skipped for their cost
+
+        Call this outside of the response window, e.g. while waiting for the next pulse. The measured duration replaces the estimated cost of each :attr:`stale` algorithm, so an overestimate recovers, while a correct estimate keeps the algorithm out of the budget.
+
+        returns
+        -------
+        costs_in_ms: Dict[str, float]
+            the estimated cost of each algorithm in ms
+        """
+        for algo in self.stale:
+            self._measure(algo, trace, tms_sampleidx, replace=True, fs=fs)
+        self.stale = []
+        return dict(self.costs_in_ms)
+
+    def run(
+        self,
+        trace: ndarray,
+        tms_sampleidx: int,
+        budget_in_ms: float,
+        fs: float = 1000,
+        details: bool = False,
+    ) -> Outcome:
+        """Estimate the iMEP amplitude with as many algorithms as the budget allows
+
+        An algorithm is started only if its estimated cost fits into the time left, otherwise it is skipped, marked as :attr:`stale` until the next :meth:`calibrate`, and the next algorithm in the priority list is considered. A running algorithm is not interrupted, so the budget can be exceeded if an algorithm takes longer than expected.
+
+        args
+        ----
+        trace:ndarray
+            the one-dimensional (samples,) EMG signal
+        tms_sampleidx: int
+            the sample at which the TMS pulse was applied
+        budget_in_ms: float
+            the time available for all algorithms
+        fs:float
+            the sampling rate of the signal
+        details: bool
+            whether to return a :class:`~dimep.result.Result` with the intermediates of each estimation instead of the bare estimate. defaults to False
+
+        returns
+        -------
+        outcome: Outcome
+            the estimates of the algorithms which finished, the skipped algorithms and the elapsed time
+        """
+        t0 = perf_counter()
+        estimates: Dict[str, Any] = dict()
+        skipped: List[str] = []
+        for algo in self.priority:
+            left = budget_in_ms - (perf_counter() - t0) * 1000
+            if left <= 0:
+                skipped.append(algo)
+                continue
+            if self.costs_in_ms.get(algo, 0.0) > left:
+                # measured by calibrate, never at the cost of the budget
+                if algo not in self.stale:
+                    self.stale.append(algo)
+                skipped.append(algo)
+                continue
+            estimates[algo] = self._measure(
+                algo, trace, tms_sampleidx, fs=fs, details=details
+            )
+        return Outcome(estimates, skipped, (perf_counter() - t0) * 1000)
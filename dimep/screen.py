@@ -0,0 +1,103 @@
+"""Cheap pre-screening of trials before running the algorithms
+
+Screening checks all trials of a (trials, samples) matrix in one vectorized pass and returns a reason code for each trial. Reason codes are bit flags, i.e. a trial can be excluded for several reasons, and 0 (:data:`OK`) marks trials which passed all checks. The codes can be handed to the batch drivers (e.g. :func:`dimep.api.batch` or :func:`dimep.algo.loyda.loyda_batch`) as `exclude` to skip hopeless trials entirely.
+
+Example::
+
+    from dimep.screen import screen, explain
+    reasons = screen(traces, tms_sampleidx=1000, fs=1000, saturation=5000)
+    estimates = batch(traces, tms_sampleidx=1000, fs=1000, exclude=reasons)
+    explain(reasons[0])
+    # >>> ['saturated']
+"""
+from numpy import ndarray
+import numpy as np
+from math import ceil
+from typing import List, Union
+from dimep.tools import as_trials
+from dimep.ragged import Ragged, rectified
+
+#: the trial passed all checks
+OK = 0
+#: the EMG reached the saturation limit of the amplifier
+SATURATED = 1
+#: the TMS pulse occured too early for the baseline period. Without this check, negative indices silently wrap around to the end of the trace
+NO_BASELINE = 2
+#: the rectified EMG during the baseline period exceeded the pre-activation limit
+PREACTIVATION = 4
+#: the TMS pulse occured at or after the end of the trace, i.e. there is no post-stimulus period
+NO_POSTSTIM = 8
+
+REASONS = {
+    SATURATED: "saturated",
+    NO_BASELINE: "no baseline",
+    PREACTIVATION: "pre-activation",
+    NO_POSTSTIM: "no post-stimulus period",
+}
+
+
+def explain(reason: int) -> List[str]:
+    "translate a reason code into a list of human-readable reasons"
+    return [text for flag, text in REASONS.items() if int(reason) & flag]
+
+
+def screen(
+    traces: Union[ndarray, Ragged],
+    tms_sampleidx: Union[int, ndarray],
+    fs: float = 1000,
+    baseline_duration_in_ms: float = 200,
+    saturation: Union[float, None] = None,
+    saturated_samples: int = 3,
+    preactivation: Union[float, None] = None,
+    axis: int = -1,
+) -> ndarray:
+    """Screen trials for conditions which make an estimation hopeless
+
+    args
+    ----
+    traces: Union[ndarray, Ragged]
+        the two-dimensional (trials, samples) EMG signals, or a :class:`~.Ragged` batch of trials of different length
+    tms_sampleidx: Union[int, ndarray]
+        the sample at which the TMS pulse was applied, either for all or for each trial
+    fs:float
+        the sampling rate of the signal
+    baseline_duration_in_ms: float
+        the longest baseline period required before the TMS. Defaults to 200ms as used by :func:`~.loyda`, the algorithm with the longest baseline period.
+    saturation: Union[float, None]
+        the absolute limit of the amplifier in units of the trace. If None, saturation is not checked. The limit has to be given explicitly, because quantized or integer data, e.g. from :class:`~.EDF`, regularly repeats its own maximum without being clipped.
+    saturated_samples: int
+        how many samples have to be at the saturation limit to flag a trial as saturated
+    preactivation: Union[float, None]
+        the maximal mean rectified EMG during the baseline period, e.g. in µV. If None, pre-activation is not checked.
+    axis: int
+        the axis of the samples in traces, e.g. 0 for a (samples, trials) matrix. No copy is made for either layout, see :func:`~.as_trials`
+
+    returns
+    -------
+    reasons: ndarray
+        the reason code for each trial, with 0 marking trials which passed all checks
+
+    """
+    # the checks are limited to each trial, also for a ragged batch
+    rect = rectified(as_trials(traces, axis))
+    n_trials = len(rect)
+    n_samples = rect.lengths
+    tms = np.broadcast_to(np.asarray(tms_sampleidx, dtype=int), (n_trials,))
+    reasons = np.zeros(n_trials, dtype=np.uint8)
+
+    if saturation is not None:
+        at_limit = rect.sum(rect.values() >= saturation)
+        reasons[at_limit >= saturated_samples] |= SATURATED
+
+    baseline_start = tms - ceil(baseline_duration_in_ms * fs / 1000)
+    reasons[baseline_start < 0] |= NO_BASELINE
+    reasons[tms >= n_samples] |= NO_POSTSTIM
+
+    if preactivation is not None:
+        start = np.clip(baseline_start, 0, n_samples)
+        stop = np.clip(tms, start, n_samples)
+        total = rect.window_sum(rect.values(), start, stop)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            level = total / (stop - start)
+        reasons[level > preactivation] |= PREACTIVATION
+    return reasons
@@ -0,0 +1,178 @@
+"""Synthetic iMEPs with ground truth for load and accuracy testing
+
+Each trial consists of coloured background EMG, i.e. first-order autoregressive noise, and the template of :func:`~.guggenberger`, scaled to a random peak-to-peak amplitude, stretched to a random width and placed at a random latency after TMS. Trials are generated in chunks, fully vectorized, and reproducibly from a seed, so millions of trials can be streamed into :func:`dimep.api.batch` or written to a memory-mapped `.npy` file.
+
+Example::
+
+    from dimep.simulate import generate
+    from dimep.api import batch
+    for chunk in generate(1_000_000, fs=5000, seed=42):
+        estimates = batch(chunk.traces, chunk.tms, fs=5000)
+        error = estimates["lewis"] - chunk.truth["amplitude"]
+"""
+from numpy import ndarray
+from numpy.typing import DTypeLike
+import numpy as np
+from math import ceil
+from pathlib import Path
+from scipy.signal import lfilter
+from typing import Iterator, NamedTuple, Tuple, Union
+from dimep.algo.guggenberger import template
+
+#: the ground truth of each trial. Onset and offset are sample indices, the latency and width are in ms, and the amplitude is the peak-to-peak amplitude in µV
+TRUTH = np.dtype(
+    [
+        ("onset", np.int64),
+        ("offset", np.int64),
+        ("latency", np.float64),
+        ("width", np.float64),
+        ("amplitude", np.float64),
+    ]
+)
+
+
+class Trials(NamedTuple):
+    #: the (trials, samples) traces in µV
+    traces: ndarray
+    #: the sample at which the TMS pulse was applied for each trial
+    tms: ndarray
+    #: the ground truth of each trial, see :data:`TRUTH`
+    truth: ndarray
+
+
+def _shapes(
+    fs: float, widths: ndarray, shape: ndarray
+) -> Tuple[ndarray, ndarray]:
+    "the template stretched to each width, with unit peak-to-peak amplitude"
+    # the template is sampled at 1kHz, i.e. its sample index is the time in ms
+    duration = len(template) - 1
+    n = np.ceil(duration * widths * fs / 1000).astype(int)
+    t = np.arange(n.max() + 1)[None, :] * (1000 / fs) / widths[:, None]
+    waves = np.interp(t, np.arange(len(template)), shape, right=0.0)
+    return waves, n
+
+
+def generate(
+    n_trials: int,
+    fs: float = 1000,
+    seed: Union[int, None] = None,
+    chunksize: int = 1024,
+    pre_in_ms: float = 250,
+    post_in_ms: float = 250,
+    latency_in_ms: Tuple[float, float] = (15, 30),
+    width: Tuple[float, float] = (0.8, 1.25),
+    amplitude_in_uv: Tuple[float, float] = (0, 500),
+    noise_in_uv: float = 10,
+    color: float = 0.9,
+    dtype: DTypeLike = np.float64,
+) -> Iterator[Trials]:
+    """generate synthetic iMEPs chunk by chunk
+
+    Latency, width and amplitude are drawn uniformly from their ranges for each trial. Each chunk is generated from its own child of the seed, so the same seed and chunksize always generate the same trials.
+
+    args
+    ----
+    n_trials: int
+        the total number of trials
+    fs:float
+        the sampling rate of the signal
+    seed: Union[int, None]
+        the seed of the random number generator
+    chunksize: int
+        the number of trials per chunk
+    pre_in_ms: float
+        the duration of the trace before TMS
+    post_in_ms: float
+        the duration of the trace after TMS
+    latency_in_ms: Tuple[float, float]
+        the range of the latency of the iMEP onset after TMS
+    width: Tuple[float, float]
+        the range of the factor by which the duration of the template is stretched
+    amplitude_in_uv: Tuple[float, float]
+        the range of the peak-to-peak amplitude of the iMEP
+    noise_in_uv: float
+        the SD of the background EMG
+    color: float
+        the autoregressive coefficient of the background EMG, between 0 for white noise and 1 for a random walk
+    dtype: DTypeLike
+        the dtype of the traces
+
+    returns
+    -------
+    chunks: Iterator[Trials]
+        the traces, TMS sample indices and ground truth of each chunk
+    """
+    pre = ceil(pre_in_ms * fs / 1000)
+    n_samples = pre + ceil(post_in_ms * fs / 1000)
+    shape = template / np.ptp(template)
+    children = np.random.SeedSequence(seed).spawn(ceil(n_trials / chunksize))
+    for ix, child in enumerate(children):
+        rng = np.random.default_rng(child)
+        n = min(chunksize, n_trials - ix * chunksize)
+        # stationary AR(1) noise with SD noise_in_uv
+        scale = noise_in_uv * np.sqrt(1 - color ** 2)
+        white = rng.normal(0, scale, (n, n_samples))
+        initial = color * rng.normal(0, noise_in_uv, (n, 1))
+        traces, _ = lfilter([1.0], [1.0, -color], white, axis=1, zi=initial)
+        latencies = rng.uniform(*latency_in_ms, n)
+        widths = rng.uniform(*width, n)
+        amplitudes = rng.uniform(*amplitude_in_uv, n)
+        waves, durations = _shapes(fs, widths, shape)
+        onsets = pre + np.ceil(latencies * fs / 1000).astype(int)
+        cols = onsets[:, None] + np.arange(waves.shape[1])
+        inside = cols < n_samples
+        rows = np.broadcast_to(np.arange(n)[:, None], cols.shape)
+        traces[rows[inside], cols[inside]] += (amplitudes[:, None] * waves)[
+            inside
+        ]
+        truth = np.empty(n, dtype=TRUTH)
+        truth["onset"] = onsets
+        truth["offset"] = np.minimum(onsets + durations, n_samples - 1)
+        truth["latency"] = latencies
+        truth["width"] = widths
+        truth["amplitude"] = amplitudes
+        yield Trials(traces.astype(dtype, copy=False), np.full(n, pre), truth)
+
+
+def to_memmap(
+    path: Union[str, Path], n_trials: int, **kwargs
+) -> Tuple[ndarray, ndarray]:
+    """write synthetic iMEPs chunk by chunk into a memory-mapped `.npy` file
+
+    Only one chunk is held in memory at a time. All trials share the same TMS sample index, i.e. `ceil(pre_in_ms * fs / 1000)`.
+
+    args
+    ----
+    path: Union[str, Path]
+        the `.npy` file for the (trials, samples) traces
+    n_trials: int
+        the total number of trials
+    kwargs:
+        passed on to :func:`generate`
+
+    returns
+    -------
+    traces: ndarray
+        the memory-mapped traces
+    truth: ndarray
+        the ground truth of each trial, see :data:`TRUTH`
+    """
+    fs = kwargs.get("fs", 1000)
+    n_samples = ceil(kwargs.get("pre_in_ms", 250) * fs / 1000) + ceil(
+        kwargs.get("post_in_ms", 250) * fs / 1000
+    )
+    traces = np.lib.format.open_memmap(
+        Path(path),
+        mode="w+",
+        dtype=kwargs.get("dtype", np.float64),
+        shape=(n_trials, n_samples),
+    )
+    truth = np.empty(n_trials, dtype=TRUTH)
+    start = 0
+    for chunk in generate(n_trials, **kwargs):
+        stop = start + len(chunk.traces)
+        traces[start:stop] = chunk.traces
+        truth[start:stop] = chunk.truth
+        start = stop
+    traces.flush()
+    return traces, truth
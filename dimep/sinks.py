@@ -0,0 +1,288 @@
+"""Streaming sinks for the estimates of many trials
+
+A sink receives the estimates chunk by chunk, e.g. from :func:`dimep.api.batch` or :meth:`dimep.executor.Executor.run`, and writes each chunk at once instead of row by row. Each row holds the trial id, the estimate of each algorithm, and with `details=True` also the intermediates, e.g. `chen_onset` and `chen_offset` (see :func:`columns`). See `test/test_sinks.py` for a benchmark of their write throughput.
+
+Example::
+
+    from dimep.sinks import SQLiteSink
+    from dimep.executor import Executor
+    with SQLiteSink("session.db") as sink:
+        Executor().run(traces, tms_sampleidx=1000, details=True, sink=sink)
+"""
+from numpy import ndarray
+import numpy as np
+import csv
+from abc import ABC, abstractmethod
+import sqlite3
+import zipfile
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, List, Union
+
+PathLike = Union[str, Path]
+
+#: the number of trials :func:`dimep.api.batch` passes to its sink at once
+CHUNK_ROWS = 1024
+
+
+def columns(
+    trials: ndarray, estimates: Dict[str, ndarray]
+) -> Dict[str, ndarray]:
+    """flatten the estimates of a chunk into named columns
+
+    Bare estimates are stored under the name of the algorithm. For structured estimates, the estimate keeps the name of the algorithm and each other field is stored as `<algorithm>_<field>`.
+
+    args
+    ----
+    trials:ndarray
+        the id of each trial in the chunk
+    estimates: Dict[str, ndarray]
+        the estimates of each algorithm, as returned by :func:`dimep.api.batch`
+
+    returns
+    -------
+    columns: Dict[str, ndarray]
+        the columns, starting with "trial"
+    """
+    out = {"trial": np.asarray(trials, dtype=np.int64)}
+    for algo, values in estimates.items():
+        if values.dtype.names is None:
+            out[algo] = values
+            continue
+        for field in values.dtype.names:
+            name = algo if field == "estimate" else f"{algo}_{field}"
+            out[name] = values[field]
+    return out
+
+
+class Sink(ABC):
+    """the interface of all sinks
+
+    Subclasses implement :meth:`append`, which receives the columns of a chunk, and optionally :meth:`close`. Sinks are context managers which close on exit.
+    """
+
+    def write(self, trials: ndarray, estimates: Dict[str, ndarray]):
+        "write the estimates of a chunk of trials"
+        self.append(columns(trials, estimates))
+
+    @abstractmethod
+    def append(self, chunk: Dict[str, ndarray]):
+        "write the columns of a chunk, see :func:`columns`"
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _dtype(chunk: Dict[str, ndarray]) -> np.dtype:
+    return np.dtype([(name, values.dtype) for name, values in chunk.items()])
+
+
+class MemmapSink(Sink):
+    """append rows to a memory-mapped .npy file of records
+
+    The file is grown by doubling its capacity, and truncated to the written rows on :meth:`close`. Afterwards, it can be opened with `np.load(path, mmap_mode="r")`.
+
+    args
+    ----
+    path: Union[str, Path]
+        the path of the .npy file
+    capacity: int
+        the initial number of rows
+    overwrite: bool
+        whether to replace an existing file. If False, an existing file raises a FileExistsError. defaults to False
+    """
+
+    def __init__(
+        self, path: PathLike, capacity: int = 1024, overwrite: bool = False
+    ):
+        self.path = Path(path)
+        self.overwrite = overwrite
+        self._check()
+        self.capacity = max(int(capacity), 1)
+        self.n_rows = 0
+        self.dtype: Union[np.dtype, None] = None
+        self._map: Union[np.memmap, None] = None
+
+    def _check(self):
+        "refuse to replace an existing file unless overwrite is set"
+        if self.path.exists() and not self.overwrite:
+            raise FileExistsError(
+                f"{self.path} exists, pass overwrite=True to replace it"
+            )
+
+    def _header(self, n_rows: int) -> bytes:
+        assert self.dtype is not None
+        descr = np.lib.format.dtype_to_descr(self.dtype)
+        text = "{'descr': %r, 'fortran_order': False, 'shape': (%d,), }"
+        # reserve enough room to rewrite the header for any number of rows
+        size = len(text % (descr, 10 ** 18)) + 11
+        size = -(-size // 64) * 64
+        header = (text % (descr, n_rows)).ljust(size - 11) + "\n"
+        return (
+            b"\x93NUMPY\x01\x00"
+            + np.uint16(len(header)).astype("<u2").tobytes()
+            + header.encode("latin1")
+        )
+
+    def _open(self, capacity: int):
+        assert self.dtype is not None
+        if self._map is not None:
+            self._map.flush()
+            self._map = None
+        offset = len(self._header(0))
+        if not self.path.exists():
+            self.path.write_bytes(self._header(0))
+        with self.path.open("r+b") as f:
+            f.truncate(offset + capacity * self.dtype.itemsize)
+        self._map = np.memmap(
+            self.path, self.dtype, "r+", offset=offset, shape=(capacity,)
+        )
+        self.capacity = capacity
+
+    def append(self, chunk: Dict[str, ndarray]):
+        if self.dtype is None:
+            self._check()
+            if self.path.exists():
+                self.path.unlink()
+            self.dtype = _dtype(chunk)
+            self._open(self.capacity)
+        n = len(chunk["trial"])
+        if self.n_rows + n > self.capacity:
+            capacity = self.capacity
+            while self.n_rows + n > capacity:
+                capacity *= 2
+            self._open(capacity)
+        assert self._map is not None
+        rows = self._map[self.n_rows : self.n_rows + n]
+        for name, values in chunk.items():
+            rows[name] = values
+        self.n_rows += n
+
+    def close(self):
+        if self.dtype is None:
+            return
+        if self._map is not None:
+            self._map.flush()
+            self._map = None
+        header = self._header(self.n_rows)
+        with self.path.open("r+b") as f:
+            f.write(header)
+            f.truncate(len(header) + self.n_rows * self.dtype.itemsize)
+
+
+class CSVSink(Sink):
+    """append rows to a CSV file with a header line
+
+    args
+    ----
+    path: Union[str, Path]
+        the path of the CSV file
+    """
+
+    def __init__(self, path: PathLike):
+        self.path = Path(path)
+        self._file = self.path.open("w", newline="")
+        self._writer = csv.writer(self._file)
+        self._names: Union[List[str], None] = None
+
+    def append(self, chunk: Dict[str, ndarray]):
+        if self._names is None:
+            self._names = list(chunk.keys())
+            self._writer.writerow(self._names)
+        self._writer.writerows(
+            zip(*(chunk[name].tolist() for name in self._names))
+        )
+
+    def close(self):
+        self._file.close()
+
+
+class NPZSink(Sink):
+    """store each chunk as separate arrays in an uncompressed .npz archive
+
+    Every chunk adds one array per column, named `<column>/<chunk>`, so nothing is rewritten when appending. Use :func:`load_npz` to concatenate the chunks again.
+
+    args
+    ----
+    path: Union[str, Path]
+        the path of the .npz file
+    compress: bool
+        whether to deflate the arrays, which saves space at the cost of write throughput
+    """
+
+    def __init__(self, path: PathLike, compress: bool = False):
+        self.path = Path(path)
+        self._zip = zipfile.ZipFile(
+            self.path,
+            "w",
+            zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED,
+        )
+        self.n_chunks = 0
+
+    def append(self, chunk: Dict[str, ndarray]):
+        for name, values in chunk.items():
+            buffer = BytesIO()
+            np.lib.format.write_array(buffer, np.ascontiguousarray(values))
+            self._zip.writestr(
+                f"{name}/{self.n_chunks:08d}.npy", buffer.getvalue()
+            )
+        self.n_chunks += 1
+
+    def close(self):
+        self._zip.close()
+
+
+def load_npz(path: PathLike) -> Dict[str, ndarray]:
+    "load the columns written by :class:`NPZSink`, concatenating all chunks"
+    parts: Dict[str, List[ndarray]] = {}
+    with np.load(path) as archive:
+        for key in sorted(archive.files):
+            name = key.rsplit("/", 1)[0]
+            parts.setdefault(name, []).append(archive[key])
+    return {name: np.concatenate(arrays) for name, arrays in parts.items()}
+
+
+class SQLiteSink(Sink):
+    """insert rows into a SQLite table, with one transaction per chunk
+
+    args
+    ----
+    path: Union[str, Path]
+        the path of the database, or ":memory:"
+    table: str
+        the name of the table, which is created if it does not exist
+    """
+
+    def __init__(self, path: PathLike, table: str = "estimates"):
+        self.connection = sqlite3.connect(str(path))
+        self.table = table
+        self._insert: Union[str, None] = None
+
+    def append(self, chunk: Dict[str, ndarray]):
+        if self._insert is None:
+            types = {
+                name: "INTEGER" if values.dtype.kind in "iub" else "REAL"
+                for name, values in chunk.items()
+            }
+            fields = ", ".join(f'"{name}" {t}' for name, t in types.items())
+            names = ", ".join(f'"{name}"' for name in chunk)
+            marks = ", ".join("?" for _ in chunk)
+            with self.connection:
+                self.connection.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{self.table}" ({fields})'
+                )
+            self._insert = (
+                f'INSERT INTO "{self.table}" ({names}) VALUES ({marks})'
+            )
+        rows = zip(*(values.tolist() for values in chunk.values()))
+        with self.connection:
+            self.connection.executemany(self._insert, rows)
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,125 @@
+"""Incremental learning of a subject-specific template for guggenberger
+
+The template of :func:`~.guggenberger` is the first principal component of a (samples, trials) matrix of iMEPs (see :doc:`simsource`). For the first component, it suffices to keep the (samples, samples) scatter matrix of the trials, which can be updated trial by trial. The leading eigenvector is then refined with a few warm-started power iterations after each update. Memory depends only on the duration of the template, not on the number of trials, and no trial has to be kept.
+
+Example::
+
+    from dimep.template import OnlineTemplate
+    from dimep.algo.guggenberger import match_template
+    learner = OnlineTemplate(fs=1000)
+    for traces in session:
+        learner.update(traces, tms_sampleidx=1000)
+    score = match_template(learner.template, trace, tms_sampleidx=1000)
+"""
+from numpy import ndarray
+import numpy as np
+from math import ceil
+from typing import Tuple, Union
+from dimep.decomposition import orient
+
+
+class OnlineTemplate:
+    """Learn a subject-specific template from streaming trials
+
+    args
+    ----
+    fs:float
+        the sampling rate of the signal
+    window_in_ms: Tuple[float, float]
+        the window after TMS covered by the template. Defaults to the 103ms of the template of :func:`~.guggenberger`
+    forget: float
+        a factor between 0 and 1 by which the previous trials are down-weighted at each update, to follow slow changes of the waveform. Defaults to 1, i.e. all trials are weighted equally
+    iterations: int
+        the number of power iterations after each update
+    """
+
+    def __init__(
+        self,
+        fs: float = 1000,
+        window_in_ms: Tuple[float, float] = (0, 103),
+        forget: float = 1.0,
+        iterations: int = 10,
+    ):
+        self.fs = fs
+        self.start = ceil(window_in_ms[0] * fs / 1000)
+        self.n_samples = ceil(window_in_ms[1] * fs / 1000) - self.start
+        self.forget = forget
+        self.iterations = iterations
+        self.count = 0.0
+        #: the (samples, samples) scatter matrix of all trials so far
+        self.scatter = np.zeros((self.n_samples, self.n_samples))
+        self._component = np.ones(self.n_samples) / np.sqrt(self.n_samples)
+
+    def segments(
+        self, traces: ndarray, tms_sampleidx: Union[int, ndarray]
+    ) -> ndarray:
+        "cut the window covered by the template from each trace"
+        traces = np.atleast_2d(traces)
+        tms = np.broadcast_to(
+            np.asarray(tms_sampleidx, dtype=int), (traces.shape[0],)
+        )
+        ix = tms[:, None] + self.start + np.arange(self.n_samples)
+        if ix.min() < 0 or ix.max() >= traces.shape[1]:
+            raise ValueError("The traces do not cover the template window")
+        return np.take_along_axis(traces, ix, axis=1)
+
+    def update(
+        self, traces: ndarray, tms_sampleidx: Union[int, ndarray]
+    ) -> "OnlineTemplate":
+        """add one or more trials to the template
+
+        args
+        ----
+        traces:ndarray
+            the one-dimensional (samples,) or two-dimensional (trials, samples) EMG signals
+        tms_sampleidx: Union[int, ndarray]
+            the sample at which the TMS pulse was applied, either for all or for each trial
+        """
+        segments = self.segments(traces, tms_sampleidx)
+        # as in a PCA over the (samples, trials) matrix, each trial is centered
+        segments = segments - segments.mean(axis=1, keepdims=True)
+        self.scatter *= self.forget ** segments.shape[0]
+        self.scatter += segments.T @ segments
+        self.count = self.count * self.forget ** segments.shape[0] + float(
+            segments.shape[0]
+        )
+        self._refine()
+        return self
+
+    def merge(self, other: "OnlineTemplate") -> "OnlineTemplate":
+        "add the trials learned by another instance, e.g. from another session"
+        if other.n_samples != self.n_samples:
+            raise ValueError("Can only merge templates of identical duration")
+        self.scatter += other.scatter
+        self.count += other.count
+        self._refine()
+        return self
+
+    def _refine(self):
+        v = self._component
+        for _ in range(self.iterations):
+            w = self.scatter @ v
+            length = np.linalg.norm(w)
+            if length == 0:
+                return
+            v = w / length
+        self._component = v
+
+    @property
+    def component(self) -> ndarray:
+        "the current estimate of the first principal component, with unit norm"
+        return self._component.copy()
+
+    @property
+    def template(self) -> ndarray:
+        "the oriented, normalized template, e.g. for :func:`~.match_template`"
+        return orient(self._component) * self._component
+
+    @property
+    def explained(self) -> float:
+        "the fraction of the scatter explained by the current template"
+        total = np.trace(self.scatter)
+        if total == 0:
+            return np.nan
+        v = self._component
+        return float(v @ self.scatter @ v / total)
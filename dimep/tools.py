@@ -1,7 +1,20 @@
 from numpy import ndarray
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    Tuple,
+    TypeVar,
+    Union,
+    overload,
+)
+from math import ceil, inf, isfinite
 import numpy as np
 from pathlib import Path
 from pkg_resources import get_distribution
+from dimep.result import Result
+from dimep.baseline import WINDOWS
 
 root = Path(get_distribution("dimep").location)
 
@@ -70,3 +83,281 @@ def bw_boundaries(bools: ndarray) -> ndarray:
             L[i + 1] = counter
         i += 1
     return L
+
+
+#: the comparisons supported by :func:`coarse_first`, with the block reduction which preserves whether any sample of a block can satisfy them
+_COMPARISONS: Dict[str, Tuple[np.ufunc, Callable[[Any, float], Any]]] = {
+    ">": (np.fmax, np.greater),
+    ">=": (np.fmax, np.greater_equal),
+    "<": (np.fmin, np.less),
+    "not >": (np.minimum, lambda x, t: ~np.greater(x, t)),
+}
+
+
+def coarse_first(
+    x: ndarray,
+    threshold: float,
+    blocksize: int,
+    op: str = ">",
+    start: int = 0,
+    stop: Union[int, None] = None,
+    last: bool = False,
+    blocks_per_step: int = 64,
+) -> int:
+    """find the first sample satisfying a comparison, coarse to fine
+
+    The signal is reduced to the maximum (or minimum) of each block, and only the first block which can contain a matching sample is scanned at full resolution. Blocks are reduced a few at a time, so the search stops as soon as a match is found. The result is identical to a full-resolution scan.
+
+    args
+    ----
+    x:ndarray
+        the one-dimensional signal, e.g. the rectified trace
+    threshold: float
+        the threshold to compare with
+    blocksize: int
+        the number of samples per block
+    op: str
+        one of ">", ">=", "<" or "not >"
+    start: int
+        the first sample to consider
+    stop: Union[int, None]
+        the sample after the last sample to consider, defaults to the end
+    last: bool
+        whether to find the last instead of the first matching sample
+
+    returns
+    -------
+    index: int
+        the index of the matching sample, -1 if there is none
+    """
+    reduce, compare = _COMPARISONS[op]
+    stop = len(x) if stop is None else min(stop, len(x))
+    blocksize = max(int(blocksize), 1)
+    step = blocksize * blocks_per_step
+    lows = range(start, stop, step)
+    for low in reversed(lows) if last else lows:
+        segment = x[low : min(low + step, stop)]
+        reduced = reduce.reduceat(
+            segment, np.arange(0, len(segment), blocksize)
+        )
+        candidates = np.flatnonzero(compare(reduced, threshold))
+        if len(candidates) == 0:
+            continue
+        block = int(candidates[-1] if last else candidates[0]) * blocksize
+        hits = np.flatnonzero(
+            compare(segment[block : block + blocksize], threshold)
+        )
+        return low + block + int(hits[-1] if last else hits[0])
+    return -1
+
+
+def coarse_runs(
+    x: ndarray, threshold: float, blocksize: int
+) -> Iterator[Tuple[int, int]]:
+    """yield the continous blocks above threshold in order, coarse to fine
+
+    A lazy alternative to :func:`bw_boundaries` on `x > threshold`, which only scans the signal as far as the runs are consumed, using :func:`coarse_first`.
+
+    args
+    ----
+    x:ndarray
+        the one-dimensional signal, e.g. the rectified trace
+    threshold: float
+        the threshold which has to be exceeded
+    blocksize: int
+        the number of samples per block
+
+    returns
+    -------
+    runs: Iterator[Tuple[int, int]]
+        the first sample and the sample after the last sample of each run
+    """
+    # as in bw_boundaries, a signal of a single sample has no clusters
+    if len(x) < 2:
+        return
+    position = 0
+    while position < len(x):
+        first = coarse_first(x, threshold, blocksize, ">", start=position)
+        if first < 0:
+            return
+        after = coarse_first(x, threshold, blocksize, "not >", start=first)
+        after = len(x) if after < 0 else after
+        yield first, after
+        position = after
+
+
+def coarse_blocksize(coarse_in_ms: float, fs: float) -> int:
+    "the number of samples per block for a coarse-to-fine detection"
+    return max(ceil(coarse_in_ms * fs / 1000), 1)
+
+
+def crop(
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = 1000,
+    horizon_in_ms: float = inf,
+    baseline_in_ms: float = inf,
+) -> Tuple[int, int]:
+    """the first and the sample after the last sample within the bounds around TMS
+
+    args
+    ----
+    trace:ndarray
+        the one-dimensional (samples,) EMG signal
+    tms_sampleidx: int
+        the sample at which the TMS pulse was applied
+    fs:float
+        the sampling rate of the signal
+    horizon_in_ms: float
+        the maximal duration after TMS. Defaults to inf, i.e. up to the end of the trace
+    baseline_in_ms: float
+        the maximal duration before TMS. Defaults to inf, i.e. from the start of the trace
+
+    returns
+    -------
+    bounds: Tuple[int, int]
+        the start and stop of the bounded part of the trace
+    """
+    start, stop = 0, len(trace)
+    if isfinite(baseline_in_ms):
+        start = max(tms_sampleidx - ceil(baseline_in_ms * fs / 1000), 0)
+    if isfinite(horizon_in_ms):
+        stop = min(tms_sampleidx + ceil(horizon_in_ms * fs / 1000), stop)
+    return start, stop
+
+
+def bounded(
+    algorithm: Callable,
+    trace: ndarray,
+    tms_sampleidx: int,
+    fs: float = 1000,
+    horizon_in_ms: float = inf,
+    baseline_in_ms: float = inf,
+    aligned: Union[Dict[str, Union[ndarray, None]], None] = None,
+    **kwargs,
+) -> Union[float, Result]:
+    """run an algorithm only on the part of the trace within the bounds around TMS
+
+    The trace is sliced without copying, so the cost of the call depends only on the bounds, not on the length of the trace. Both bounds default to inf, though, so the cost is only bounded if the caller passes them. The baseline is never cropped to less than the baseline window of the algorithm in :data:`~dimep.baseline.WINDOWS`, e.g. 100ms for :func:`~.chen`, because the estimate would otherwise silently fall to 0. Sample indices of a :class:`~dimep.result.Result` are translated back to the full trace.
+
+    args
+    ----
+    algorithm: Callable
+        the algorithm, e.g. :func:`~.lewis`
+    aligned: Dict[str, Union[ndarray, None]]
+        further traces passed to the algorithm which are aligned to the trace and bounded identically, e.g. the `sham_trace` of :func:`~.loyda`
+    kwargs
+        all other arguments of the algorithm
+
+    returns
+    -------
+    estimate: Union[float, Result]
+        the output of the algorithm, with the sample indices of a :class:`~dimep.result.Result` relative to the full trace
+    """
+    if algorithm.__name__ in WINDOWS:
+        (first, _), _ = WINDOWS[algorithm.__name__]
+        baseline_in_ms = max(baseline_in_ms, -first)
+    start, stop = crop(trace, tms_sampleidx, fs, horizon_in_ms, baseline_in_ms)
+    for key, other in (aligned or {}).items():
+        kwargs[key] = None if other is None else other[start:stop]
+    out = algorithm(trace[start:stop], tms_sampleidx - start, fs=fs, **kwargs)
+    if isinstance(out, Result):
+        for key in ("onset", "offset", "peak_max", "peak_min"):
+            if getattr(out, key) is not None:
+                setattr(out, key, getattr(out, key) + start)
+    return out
+
+
+Batch = TypeVar("Batch")
+
+
+@overload
+def as_trials(traces: ndarray, axis: int = ...) -> ndarray:
+    ...
+
+
+@overload
+def as_trials(traces: Batch, axis: int = ...) -> Batch:
+    ...
+
+
+def as_trials(traces, axis: int = -1):
+    """a (trials, samples) view of traces with the samples along axis
+
+    Swapping the axes only changes the strides, so a (samples, trials) matrix is never copied, whatever its memory order. The vectorized kernels, e.g. of :func:`~.screen`, :func:`~.loyda_batch` and :func:`~.match_bank`, allocate the same temporaries for either layout. Their strided access into a C-ordered (samples, trials) matrix is slower, though, by up to a quarter in the benchmark in `test/test_layout.py`, so transpose the matrix once if it is processed repeatedly.
+
+    args
+    ----
+    traces:ndarray
+        the one-dimensional (samples,) or two-dimensional EMG signals. Other batches, e.g. a :class:`~.Ragged` batch or a list of traces, are returned unchanged, and must have their samples on the last axis
+    axis: int
+        the axis of the samples, e.g. 0 for a (samples, trials) matrix
+
+    returns
+    -------
+    view:ndarray
+        the two-dimensional (trials, samples) view
+    """
+    if not isinstance(traces, np.ndarray):
+        if axis not in (-1, 1):
+            raise ValueError("Only arrays can have the samples on axis 0")
+        return traces
+    if traces.ndim == 1:
+        return traces[None, :]
+    return np.moveaxis(traces, axis, -1)
+
+
+def runs(bools: ndarray) -> Tuple[ndarray, ndarray, ndarray]:
+    """find all continous blocks of True in each row of a boolean matrix
+
+    A vectorized alternative to :func:`bw_boundaries` for a (trials, samples) matrix. Blocks are returned sorted by row and then by start.
+
+    args
+    ----
+    bools:ndarray
+        a two-dimensional (trials, samples) array of boolians
+
+    returns
+    -------
+    row:ndarray
+        the row each block belongs to
+    start:ndarray
+        the first sample of each block
+    stop:ndarray
+        the sample after the last sample of each block
+
+    """
+    bools = np.atleast_2d(np.asarray(bools, dtype=bool))
+    padded = np.zeros((bools.shape[0], bools.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = bools
+    edges = np.diff(padded, axis=1)
+    row, start = np.nonzero(edges == 1)
+    _, stop = np.nonzero(edges == -1)
+    return row, start, stop
+
+
+def first_per_row(
+    row: ndarray, values: ndarray, n_rows: int, fill: int = -1
+) -> ndarray:
+    """pick the first value for each row, e.g. from the output of :func:`runs`
+
+    args
+    ----
+    row:ndarray
+        the row index of each value, sorted in ascending order
+    values:ndarray
+        the values to pick from
+    n_rows:int
+        the total number of rows
+    fill:int
+        the value for rows without any entry
+
+    returns
+    -------
+    first:ndarray
+        the first value of each row
+    """
+    first = np.full(n_rows, fill, dtype=np.asarray(values).dtype)
+    rows, ix = np.unique(row, return_index=True)
+    first[rows] = np.asarray(values)[ix]
+    return first
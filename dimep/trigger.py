@@ -0,0 +1,125 @@
+"""Detection of TMS pulses in continuous EMG recordings
+
+The TMS pulse causes a large artifact in the EMG. Its onsets can be used as `tms_sampleidx` for the algorithms, e.g. after cutting the recording into trials.
+
+Example::
+
+    from dimep.trigger import detect
+    recording = np.load("session.npy", mmap_mode="r")
+    pulses = detect(recording, fs=5000, refractory_in_ms=1000)
+"""
+from numpy import ndarray
+import numpy as np
+from math import ceil
+from typing import Union
+
+
+def _envelope(chunk: ndarray, previous: Union[ndarray, None], slope: bool):
+    "the maximal absolute amplitude (or slope) across all channels"
+    if slope:
+        if previous is None:
+            previous = chunk[:, :1]
+        chunk = np.diff(np.concatenate((previous, chunk), axis=1), axis=1)
+    return np.max(np.abs(chunk), axis=0)
+
+
+def estimate_threshold(
+    recording: ndarray,
+    relative_threshold: float = 20.0,
+    slope: bool = False,
+    axis: int = -1,
+) -> float:
+    """estimate an amplitude threshold for artifact detection from the noise level
+
+    The noise level is estimated robustly as the median absolute deviation of the envelope, which is barely affected by the short TMS artifacts.
+
+    args
+    ----
+    recording:ndarray
+        a one-dimensional (samples,) or two-dimensional (channels, samples) continuous EMG recording, e.g. the first chunk of a longer recording
+    relative_threshold: float
+        how many robust standard deviations the artifact exceeds the median of the envelope
+    slope: bool
+        whether to estimate the threshold for the absolute first difference instead of the absolute amplitude
+    axis:int
+        the time axis of the recording
+
+    returns
+    -------
+    threshold: float
+        the absolute threshold in units of the recording
+    """
+    data = np.moveaxis(np.asarray(recording), axis, -1).reshape(
+        -1, np.shape(recording)[axis]
+    )
+    envelope = _envelope(data, None, slope)
+    center = np.median(envelope)
+    spread = np.median(np.abs(envelope - center)) / 0.6745
+    return float(center + relative_threshold * spread)
+
+
+def detect(
+    recording: ndarray,
+    fs: float,
+    threshold: Union[float, None] = None,
+    relative_threshold: float = 20.0,
+    refractory_in_ms: float = 500.0,
+    slope: bool = False,
+    chunksize: int = 2 ** 20,
+    axis: int = -1,
+) -> ndarray:
+    """Detect the onsets of TMS artifacts in a continuous recording
+
+    A TMS pulse is detected at the first sample where the absolute amplitude (or slope) of any channel reaches the threshold. All further crossings within the refractory period after a pulse are considered as part of its artifact and ignored. The recording is processed in chunks, so it can be a memory-mapped file of arbitrary length.
+
+    args
+    ----
+    recording:ndarray
+        a one-dimensional (samples,) or two-dimensional (channels, samples) continuous EMG recording, e.g. loaded with `np.load(..., mmap_mode="r")`
+    fs:float
+        the sampling rate of the signal
+    threshold: Union[float, None]
+        the absolute amplitude (or slope) of the artifact in units of the recording. If None, it is estimated with :func:`estimate_threshold` from the first chunk
+    relative_threshold: float
+        how many robust standard deviations an artifact exceeds the noise, if the threshold is estimated
+    refractory_in_ms: float
+        the minimal interval between two pulses
+    slope: bool
+        whether to threshold the absolute first difference instead of the absolute amplitude, which is more robust against slow drifts and large EMG bursts
+    chunksize: int
+        how many samples to process at once
+    axis:int
+        the time axis of the recording
+
+    returns
+    -------
+    pulses: ndarray
+        the sample indices of all detected TMS pulses
+    """
+    data = np.moveaxis(np.asarray(recording), axis, -1)
+    if data.ndim == 1:
+        data = data[None, :]
+    n_samples = data.shape[-1]
+    if threshold is None:
+        threshold = estimate_threshold(
+            data[:, :chunksize], relative_threshold, slope
+        )
+    refractory = ceil(refractory_in_ms * fs / 1000)
+
+    pulses = []
+    last = -refractory
+    above_before = False
+    previous = None
+    for start in range(0, n_samples, chunksize):
+        chunk = np.asarray(data[:, start : start + chunksize], dtype=float)
+        above = _envelope(chunk, previous, slope) >= threshold
+        previous = chunk[:, -1:]
+        rising = above.copy()
+        rising[0] &= not above_before
+        rising[1:] &= ~above[:-1]
+        above_before = bool(above[-1])
+        for ix in np.flatnonzero(rising) + start:
+            if ix - last >= refractory:
+                pulses.append(ix)
+                last = ix
+    return np.asarray(pulses, dtype=int)
@@ -31,3 +31,119 @@ def test_guggenberger_trace_duration():
     # needs to be at least 103ms, e.g. start at 97 to end
     assert guggenberger(np.random.random(200), tms_sampleidx=97, fs=1000)
 
+
+def test_guggenberger_bank(traces):
+    from dimep.algo.guggenberger import get_bank, match_bank, match_template
+
+    bank = get_bank(fs=1000, widths=(0.5, 1.0, 2.0))
+    assert bank.shape == (3, get_template(fs=2000).shape[0])
+    trace = np.zeros(1000)
+    trace[520 : 520 + 103] = get_template(fs=1000)
+    score, index, lag = match_bank(bank, trace, 500, 1000)
+    assert np.isclose(score[0], 1) and index[0] == 1 and lag[0] == 20
+    assert np.isclose(match_template(get_template(1000), trace, 500), 1)
+    with pytest.raises(ValueError):
+        match_template(bank, trace, 500, 1000)
+    # a bank with a single template gives the same score as the template
+    scores, index, lags = match_bank(get_template(1000), traces, 1000, 1000)
+    for trace, score in zip(traces, scores):
+        assert np.isclose(guggenberger(trace, 1000, 1000), score)
+    scores, index, lags = match_bank(bank, traces, 1000, 1000)
+    for trace, score, lag in zip(traces, scores, lags):
+        result = guggenberger(trace, 1000, 1000, details=True, template=bank)
+        assert np.isclose(float(result), score)
+        assert result.lag == lag
+    # chunking the trials gives identical results
+    chunked = match_bank(bank, traces, 1000, 1000, chunksize=2)
+    for a, b in zip(chunked, match_bank(bank, traces, 1000, 1000)):
+        assert np.array_equal(a, b)
+
+
+def test_guggenberger_latency(traces):
+    from dimep.algo.guggenberger import get_bank, match_bank
+
+    template = get_template(fs=1000)
+    for trace in traces:
+        sig = trace[1000:] / np.linalg.norm(trace[1000:])
+        xcorr = np.abs(np.correlate(sig, template, mode="full"))
+        lags = np.arange(len(xcorr)) - (len(template) - 1)
+        for latency in [(10, 50), (-20, 5), (0, 2000)]:
+            inside = (lags >= latency[0]) & (lags <= latency[1])
+            result = guggenberger(
+                trace, 1000, details=True, latency_in_ms=latency
+            )
+            assert np.isclose(float(result), xcorr[inside].max())
+            assert result.lag == lags[inside][np.argmax(xcorr[inside])]
+    # the bank gives the same scores and lags
+    bank = get_bank(fs=1000)
+    scores, _, lags = match_bank(bank, traces, 1000, latency_in_ms=(10, 50))
+    for trace, score, lag in zip(traces, scores, lags):
+        result = guggenberger(
+            trace, 1000, details=True, template=bank, latency_in_ms=(10, 50)
+        )
+        assert np.isclose(float(result), score) and result.lag == lag
+        assert 10 <= lag <= 50
+    with pytest.raises(ValueError):
+        guggenberger(traces[0], 1000, latency_in_ms=(2000, 3000))
+
+
+def test_guggenberger_local_normalization(traces):
+    from dimep.algo.guggenberger import match_bank
+
+    template = get_template(fs=1000)
+    m = len(template)
+    # a clean iMEP followed by a large late artifact
+    trace = np.zeros(2000)
+    trace[1020 : 1020 + m] = template
+    trace[1500:1600] = 100 * np.random.default_rng(0).normal(size=100)
+    assert guggenberger(trace, 1000) < 0.5
+    result = guggenberger(trace, 1000, details=True, normalization="local")
+    assert np.isclose(float(result), 1) and result.lag == 20
+    # the brute-force cosine similarity of the template with each window
+    for trace in traces:
+        sig = np.concatenate((np.zeros(m - 1), trace[1000:], np.zeros(m - 1)))
+        scores = []
+        for k in range(len(sig) - m + 1):
+            window = sig[k : k + m]
+            energy = np.linalg.norm(window)
+            scores.append(abs(window @ template) / energy if energy else 0)
+        for latency in (None, (10, 50)):
+            lags = np.arange(len(scores)) - (m - 1)
+            inside = np.ones(len(lags), bool)
+            if latency is not None:
+                inside = (lags >= latency[0]) & (lags <= latency[1])
+            result = guggenberger(
+                trace,
+                1000,
+                details=True,
+                latency_in_ms=latency,
+                normalization="local",
+            )
+            expected = np.asarray(scores)[inside]
+            assert np.isclose(float(result), expected.max())
+            assert result.lag == lags[inside][np.argmax(expected)]
+    # the batched form gives the same scores and lags
+    scores, _, lags = match_bank(template, traces, 1000, normalization="local")
+    for trace, score, lag in zip(traces, scores, lags):
+        result = guggenberger(trace, 1000, details=True, normalization="local")
+        assert np.isclose(float(result), score) and result.lag == lag
+    # zero-padded templates of a bank are normalized by their own support
+    from dimep.algo.guggenberger import get_bank
+
+    widths = (0.8, 1.0, 1.25)
+    scores, index, _ = match_bank(
+        get_bank(1000, widths), traces, 1000, normalization="local"
+    )
+    for trace, score, ix in zip(traces, scores, index):
+        single = [
+            guggenberger(
+                trace,
+                1000,
+                template=get_template(1000 * w),
+                normalization="local",
+            )
+            for w in widths
+        ]
+        assert np.isclose(score, max(single)) and ix == np.argmax(single)
+    with pytest.raises(ValueError):
+        guggenberger(traces[0], 1000, normalization="unknown")
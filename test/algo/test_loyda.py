@@ -18,3 +18,67 @@ def test_loyda():
 
     sham_trace = np.ones(2000) * 0.5
     assert loyda(trace, tms_sampleidx=1000, fs=1000, sham_trace=sham_trace) == 200.0
+
+
+def test_loyda_batch(traces):
+    from dimep.algo.loyda import loyda_onoff, loyda_batch
+
+    results = loyda_batch(traces, tms_sampleidx=1000, fs=1000)
+    for trace, onset, offset, estimate in zip(
+        traces, results.onset, results.offset, results.estimate
+    ):
+        assert loyda_onoff(trace, 1000, 1000) == (onset, offset)
+        assert np.isclose(loyda(trace, 1000, 1000), estimate)
+    sham_traces = np.ones_like(traces) * 0.5
+    results = loyda_batch(traces, 1000, 1000, sham_traces=sham_traces)
+    for trace, sham_trace, estimate in zip(traces, sham_traces, results.estimate):
+        assert np.isclose(loyda(trace, 1000, 1000, sham_trace=sham_trace), estimate)
+
+
+def test_loyda_batch_mask():
+    from dimep.algo.loyda import loyda_batch
+
+    traces = np.zeros((3, 2000))
+    traces[:, 1010:1020] = 1
+    traces[1, 980:990] = 0.5
+    results = loyda_batch(traces, tms_sampleidx=[1000, 1000, 100], fs=1000)
+    # shamArea of zero, a valid trial and a baseline outside the trace
+    assert list(results.valid) == [False, True, False]
+    assert np.isnan(results.estimate[0])
+    assert results.estimate[1] == 200.0
+    assert np.isnan(results.estimate[2])
+
+
+def test_loyda_batch_pairing():
+    from dimep.algo.loyda import loyda_batch, pair_preceding
+
+    assert list(pair_preceding([0, 5, 9], [4, 1, 8])) == [-1, 0, 2]
+    traces = np.zeros((3, 2000))
+    traces[:, 1010:1020] = 1
+    sham_traces = np.stack((np.ones(2000) * 0.5, np.ones(2000), np.ones(2000)))
+    results = loyda_batch(
+        traces,
+        1000,
+        1000,
+        sham_traces=sham_traces,
+        pairing="preceding",
+        stim_times=[0, 5, 9],
+        sham_times=[4, 1, 8],
+    )
+    assert list(results.pairing) == [-1, 0, 2]
+    assert list(results.valid) == [False, True, True]
+    assert list(results.estimate[1:]) == [200.0, 100.0]
+    results = loyda_batch(traces, 1000, 1000, sham_traces, pairing=[0, 0, 1])
+    assert list(results.estimate) == [200.0, 200.0, 100.0]
+
+
+def test_loyda_batch_exclude(traces):
+    from dimep.algo.loyda import loyda_batch
+
+    exclude = np.zeros(len(traces), dtype=int)
+    exclude[0] = 1
+    results = loyda_batch(traces, 1000, 1000, exclude=exclude)
+    reference = loyda_batch(traces, 1000, 1000)
+    assert not results.valid[0]
+    assert np.isnan(results.estimate[0])
+    assert np.allclose(results.estimate[1:], reference.estimate[1:])
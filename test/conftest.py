@@ -1,8 +1,49 @@
-from pytest import fixture
+from pytest import fixture, mark
 import numpy as np
 from pathlib import Path
 
 
+def pytest_addoption(parser):
+    parser.addoption(
+        "--benchmark",
+        action="store_true",
+        help="run the timing benchmarks, which are skipped by default",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "benchmark: a timing benchmark, run with --benchmark"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--benchmark"):
+        return
+    skip = mark.skip(reason="benchmarks only run with --benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+@fixture(scope="session")
+def simulate():
+    """a factory of (samples, trials) matrices of noisy iMEPs
+
+    Each trial is the template of guggenberger with a random sign, plus white noise.
+    """
+    from dimep.algo.guggenberger import get_template
+
+    def simulate(n_trials, noise=0.1, seed=0):
+        rng = np.random.default_rng(seed)
+        waveform = get_template(fs=1000)
+        data = rng.normal(0, noise, (len(waveform), n_trials))
+        data += rng.choice([-1, 1], n_trials) * waveform[:, None]
+        return data
+
+    yield simulate
+
+
 @fixture(scope="session")
 def traces():
     traces = np.load(Path(__file__).parent / "examples.npy")
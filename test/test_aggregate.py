@@ -0,0 +1,75 @@
+from dimep.aggregate import Aggregate, QuantileSketch, Session
+import numpy as np
+
+
+def test_aggregate():
+    values = np.random.randn(1000) + 1
+    aggregate = Aggregate()
+    for batch in np.split(values, 10):
+        aggregate.update(batch)
+    assert aggregate.count == 1000
+    assert np.isclose(aggregate.mean, values.mean())
+    assert np.isclose(aggregate.var, values.var(ddof=1))
+    assert aggregate.response_rate == np.mean(values > 0)
+    aggregate.update([np.nan])
+    assert aggregate.missing == 1
+    assert aggregate.count == 1000
+
+
+def test_aggregate_merge():
+    values = np.random.randn(1000)
+    whole, left, right = Aggregate(), Aggregate(), Aggregate()
+    whole.update(values)
+    left.update(values[:300])
+    right.update(values[300:])
+    left.merge(right)
+    assert left.count == whole.count
+    assert np.isclose(left.mean, whole.mean)
+    assert np.isclose(left.var, whole.var)
+    assert left.sketch.positive == whole.sketch.positive
+    assert left.sketch.negative == whole.sketch.negative
+    assert left.quantile(0.5) == whole.quantile(0.5)
+
+
+def test_quantile_sketch():
+    values = np.random.lognormal(size=10000) * np.sign(np.random.randn(10000))
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    sketch.update(values)
+    for q in (0.01, 0.25, 0.5, 0.75, 0.99):
+        expected = np.quantile(values, q, method="lower")
+        assert np.isclose(sketch.quantile(q), expected, rtol=0.011)
+
+
+def test_quantile_sketch_bounded():
+    sketch = QuantileSketch(max_buckets=16)
+    sketch.update(np.logspace(-5, 5, 10000))
+    assert len(sketch.positive) == 16
+    assert sketch.count == 10000
+    assert np.isclose(sketch.quantile(1.0), 1e5, rtol=0.011)
+
+
+def test_quantile_sketch_collapse_order():
+    parts = [np.random.lognormal(mu, 3, 200) for mu in (-5, 0, 5, 2)]
+    whole = QuantileSketch(max_buckets=50)
+    whole.update(np.concatenate(parts))
+    for order in ([0, 1, 2, 3], [3, 2, 1, 0], [2, 0, 3, 1]):
+        merged = QuantileSketch(max_buckets=50)
+        for ix in order:
+            partial = QuantileSketch(max_buckets=50)
+            partial.update(parts[ix])
+            merged.merge(partial)
+        assert merged.positive == whole.positive
+        assert merged.quantile(0.1) == whole.quantile(0.1)
+
+
+def test_session():
+    session = Session()
+    session.update({"chen": [1.0, 0.0], "bawa": [2.0, 3.0]}, "s1", "c1")
+    session.update({"chen": [3.0]}, "s1", "c1")
+    partial = Session()
+    partial.update({"chen": [5.0]}, "s2", "c1")
+    session.merge(partial)
+    assert set(session.keys()) == {("s1", "c1"), ("s2", "c1")}
+    assert session["s1", "c1"]["chen"].count == 3
+    assert np.isclose(session["s1", "c1"]["chen"].summary()["mean"], 4 / 3)
+    assert session["s2", "c1"]["chen"].response_rate == 1.0
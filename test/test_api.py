@@ -1,4 +1,6 @@
 from dimep.api import *
+import numpy as np
+import pytest
 from dimep.tools import root
 
 
@@ -9,3 +11,66 @@ def test_available(capsys):
     for algo in (root / "dimep" / "algo").glob("*.py"):
         if algo.stem[0] != "_":
             assert algo.stem in out.out
+
+
+def test_batch(traces):
+    from dimep.algo import __all__
+
+    estimates = batch(traces, tms_sampleidx=1000, fs=1000)
+    assert list(estimates.keys()) == __all__
+    for ix, trace in enumerate(traces):
+        for algo, estimate in all(trace, tms_sampleidx=1000).items():
+            assert np.isclose(estimates[algo][ix], estimate)
+
+
+def test_batch_exclude(traces):
+    exclude = np.zeros(len(traces), dtype=int)
+    exclude[1] = 2
+    estimates = batch(traces, 1000, 1000, ["bawa", "chen"], exclude=exclude)
+    assert list(estimates.keys()) == ["bawa", "chen"]
+    assert np.isnan(estimates["bawa"][1])
+    assert np.isfinite(np.delete(estimates["bawa"], 1)).all()
+
+
+def test_batch_empty_trials(traces):
+    ragged = Ragged.from_traces([traces[0], np.zeros(0), traces[1][:900]])
+    estimates = batch(ragged, 1000, algorithms=["bawa", "chen"])
+    for algo in ("bawa", "chen"):
+        assert np.isnan(estimates[algo][1:]).all()
+        assert np.isclose(estimates[algo][0], eval(algo)(traces[0], 1000))
+
+
+def test_batch_unknown(traces):
+    # names are looked up among the algorithms, never evaluated
+    for name in ("chn", "__import__('os')"):
+        with pytest.raises(ValueError, match="Unknown algorithms"):
+            batch(traces, 1000, algorithms=["bawa", name])
+
+
+def test_lazy(traces):
+    for trace in traces:
+        lazy = all(trace, tms_sampleidx=1000, lazy=True)
+        assert len(lazy) == len(all(trace, 1000))
+        assert lazy["lewis"] == lewis(trace, 1000)
+        assert list(lazy._estimates.keys()) == ["lewis"]
+        assert dict(lazy) == all(trace, tms_sampleidx=1000)
+        assert list(lazy.keys()) == list(all(trace, 1000).keys())
+
+
+def test_lazy_shared_baseline(traces, monkeypatch):
+    from importlib import import_module
+
+    module = import_module("dimep.algo.chen")
+    calls = []
+    chen_baseline = module.chen_baseline
+
+    def counting(*args, **kwargs):
+        calls.append(args)
+        return chen_baseline(*args, **kwargs)
+
+    monkeypatch.setattr(module, "chen_baseline", counting)
+    lazy = all(traces[2], tms_sampleidx=1000, lazy=True)
+    assert lazy["chen"] == chen(traces[2], 1000)
+    assert lazy["bradnam"] == bradnam(traces[2], 1000)
+    # one call for the lazy mapping, one each for chen and bradnam
+    assert len(calls) == 3
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+import tracemalloc
+from dimep.api import chen, lewis, loyda, summers, wassermann, zewdie, ziemann
+from dimep.baseline import BaselineIndex
+
+
+def test_stats(traces):
+    recording = traces.flatten()
+    index = BaselineIndex(recording)
+    for start, stop in [(0, 10), (123, 4567), (len(recording) - 50, None)]:
+        stop = len(recording) if stop is None else stop
+        for rectified in (False, True):
+            x = recording[start:stop]
+            x = np.abs(x) if rectified else x
+            m, s = index.stats(start, stop, rectified)
+            assert np.isclose(m, x.mean())
+            assert np.isclose(s, x.std(ddof=1))
+    m, s = index.stats(np.array([-1, 5, 7]), np.array([5, 5, 8]))
+    assert np.isnan(m[0]) and np.isnan(m[1]) and np.isnan(s[2])
+    assert np.isclose(m[2], abs(recording[7]))
+
+
+@pytest.mark.parametrize(
+    "algo", [chen, lewis, loyda, summers, wassermann, zewdie, ziemann]
+)
+def test_algorithms_accept_index(traces, algo):
+    # the examples are 2000 samples long with the TMS at sample 1000
+    recording = traces.flatten()
+    index = BaselineIndex(recording, fs=1000)
+    for ix, trace in enumerate(traces[:10]):
+        pulse = ix * traces.shape[1] + 1000
+        baseline = index.baseline(algo.__name__, pulse, pre_in_ms=1000)
+        expected = algo(trace, 1000, details=True)
+        result = algo(trace, 1000, baseline=baseline, details=True)
+        assert np.isclose(float(result), float(expected))
+        assert np.isclose(result.bl_m, expected.bl_m)
+        assert np.isclose(result.bl_s, expected.bl_s)
+
+
+def test_baseline_arguments(traces):
+    index = BaselineIndex(traces.flatten(), fs=1000)
+    with pytest.raises(ValueError):
+        index.baseline("zewdie", 1000)
+    with pytest.raises(ValueError):
+        index.baseline("guggenberger", 1000)
+    m, s = index.baseline("lewis", np.array([1000, 3000]))
+    assert m.shape == (2,)
+    with pytest.raises(ValueError):
+        BaselineIndex(traces.flatten(), fs=5000).baseline("wassermann", 5000)
+
+
+@pytest.mark.parametrize("blocksize", [1, 7, 1024, 10 ** 6])
+def test_stats_blocksize(traces, blocksize):
+    recording = traces.flatten()
+    index = BaselineIndex(recording, blocksize=blocksize)
+    reference = BaselineIndex(recording, blocksize=1)
+    # windows within one block, across blocks and on block boundaries
+    start = np.array([0, 3, 7, 1000, 1020, 5000])
+    stop = np.array([7, 5, 14, 1010, 3000, len(recording)])
+    for rectified in (False, True):
+        m, s = index.stats(start, stop, rectified)
+        expected = reference.stats(start, stop, rectified)
+        assert np.allclose(m, expected[0])
+        assert np.allclose(s, expected[1])
+        x = recording[1020:3000]
+        x = np.abs(x) if rectified else x
+        assert np.isclose(m[4], x.mean())
+        assert np.isclose(s[4], x.std(ddof=1))
+
+
+def test_index_memory(tmp_path):
+    fname = tmp_path / "recording.npy"
+    np.save(fname, np.random.default_rng(0).normal(size=2 ** 22))
+    recording = np.load(fname, mmap_mode="r")
+    tracemalloc.start()
+    index = BaselineIndex(recording, fs=5000)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # the index neither loads the recording nor sums over every sample
+    assert peak < recording.nbytes / 4
+    m, s = index.window(np.array([5000, 2 ** 21]), (-100, 0))
+    assert np.isclose(m[1], np.abs(recording[2 ** 21 - 500 : 2 ** 21]).mean())
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from importlib import import_module
+from dimep.api import *
+from dimep.algo import __all__
+from dimep.baseline import WINDOWS
+from dimep.tools import bounded, crop
+
+
+def test_crop():
+    trace = np.zeros(2000)
+    assert crop(trace, 1000) == (0, 2000)
+    assert crop(trace, 1000, 1000, 100, 50) == (950, 1100)
+    assert crop(trace, 1000, 5000, 100, 50) == (750, 1500)
+    assert crop(trace, 1000, 1000, 5000, 5000) == (0, 2000)
+
+
+@pytest.mark.parametrize("algo", __all__)
+def test_bounds_covering_the_trace(traces, algo):
+    for trace in traces:
+        full = eval(algo)(trace, 1000, details=True)
+        bounded = eval(algo)(
+            trace, 1000, details=True, horizon_in_ms=1000, baseline_in_ms=1000
+        )
+        assert full._asdict() == bounded._asdict()
+
+
+@pytest.mark.parametrize("algo", __all__)
+def test_bounds_crop_the_trace(traces, algo):
+    for trace in traces:
+        expected = eval(algo)(trace[300:1400], 700, details=True)
+        bounded = eval(algo)(
+            trace, 1000, details=True, horizon_in_ms=400, baseline_in_ms=700
+        )
+        for key, value in expected._asdict().items():
+            if key in ("onset", "offset", "peak_max", "peak_min"):
+                value = None if value is None else value + 300
+            if value is None:
+                assert getattr(bounded, key) is None
+            else:
+                assert np.isclose(getattr(bounded, key), value, equal_nan=True)
+
+
+@pytest.mark.parametrize("algo", __all__)
+def test_bounds_keep_the_baseline_window(traces, algo):
+    # a baseline shorter than the baseline window of the algorithm is
+    # extended to the window, instead of leaving it without a baseline
+    keep = 50
+    if algo in WINDOWS:
+        keep = max(keep, -WINDOWS[algo][0][0])
+    if algo == "summers":
+        keep = 305
+    for trace in traces:
+        expected = eval(algo)(trace[1000 - keep : 1300], keep)
+        short = eval(algo)(trace, 1000, horizon_in_ms=300, baseline_in_ms=50)
+        assert np.isclose(short, expected, equal_nan=True)
+    assert eval(algo)(traces[3], 1000, horizon_in_ms=300, baseline_in_ms=50)
+
+
+def test_bounded_slice(monkeypatch):
+    # the algorithm only receives the samples within the bounds, however long
+    # the trace is
+    received = []
+
+    def spy(trace, tms_sampleidx, fs, **kwargs):
+        shared = np.shares_memory(trace, full)
+        received.append((len(trace), tms_sampleidx, shared))
+        return odergren(trace, tms_sampleidx, fs, **kwargs)
+
+    full = np.random.default_rng(0).normal(size=100_000)
+    expected = odergren(full[800:1200], 200, 1000)
+    out = bounded(spy, full, 1000, 1000, horizon_in_ms=200, baseline_in_ms=200)
+    assert received == [(400, 200, True)]
+    assert out == expected
+    # the algorithms pass their bounds through bounded
+    module = import_module("dimep.algo.odergren")
+    monkeypatch.setattr(
+        module, "bounded", lambda _, *args, **kw: bounded(spy, *args, **kw)
+    )
+    odergren(full, 1000, horizon_in_ms=200, baseline_in_ms=200)
+    assert received[-1] == (400, 200, True)
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+from time import perf_counter
+from dimep.algo.chen import chen_onoff
+from dimep.algo.summers import summers_onoff
+from dimep.api import chen, lewis, summers, ziemann
+from dimep.simulate import generate
+from dimep.tools import bw_boundaries, coarse_first, coarse_runs
+
+
+def trial(fs, seed=0):
+    "a trace with the TMS after 100ms and a synthetic iMEP"
+    chunk = next(generate(1, fs, seed, pre_in_ms=100, post_in_ms=100))
+    return chunk.traces[0], int(chunk.tms[0])
+
+
+def test_coarse_first():
+    rng = np.random.default_rng(1)
+    x = rng.random(1000)
+    x[rng.integers(0, 1000, 20)] = np.nan
+    for op, threshold, compare in [
+        (">", 0.9, lambda v: v > 0.9),
+        (">=", 0.9, lambda v: v >= 0.9),
+        ("<", 0.1, lambda v: v < 0.1),
+        ("not >", 0.5, lambda v: ~(v > 0.5)),
+    ]:
+        hits = np.flatnonzero(compare(x))
+        for blocksize in (1, 3, 7, 100, 2000):
+            assert coarse_first(x, threshold, blocksize, op) == hits[0]
+            last = coarse_first(
+                x, threshold, blocksize, op, stop=500, last=True
+            )
+            assert last == hits[hits < 500][-1]
+    assert coarse_first(x, 2.0, 7) == -1
+
+
+def test_coarse_runs():
+    rng = np.random.default_rng(2)
+    x = rng.random(997)
+    L = bw_boundaries(x > 0.7)
+    expected = [
+        (np.flatnonzero(L == n)[0], np.flatnonzero(L == n)[-1] + 1)
+        for n in range(1, L.max() + 1)
+    ]
+    for blocksize in (1, 5, 64):
+        assert list(coarse_runs(x, 0.7, blocksize)) == expected
+    assert list(coarse_runs(np.ones(1), 0.5, 5)) == []
+
+
+def sustained():
+    "a response which stays above threshold until the end of the trace"
+    trace = np.zeros(1300)
+    trace[:1000:2], trace[1:1000:2] = 1.0, -1.0
+    trace[1100:] = 10.0
+    return trace
+
+
+@pytest.mark.parametrize("fs", [1000, 5000, 20000])
+@pytest.mark.parametrize("coarse_in_ms", [0.5, 1, 5])
+def test_coarse_identical(fs, coarse_in_ms):
+    cases = [trial(fs, seed) for seed in range(4)]
+    if fs == 1000:
+        cases.append((sustained(), 1000))
+    for trace, tms in cases:
+        assert chen_onoff(trace, tms, fs) == chen_onoff(
+            trace, tms, fs, coarse_in_ms=coarse_in_ms
+        )
+        for algo in (chen, lewis, summers, ziemann):
+            full = algo(trace, tms, fs, details=True)
+            coarse = algo(
+                trace, tms, fs, details=True, coarse_in_ms=coarse_in_ms
+            )
+            assert full._asdict() == coarse._asdict()
+
+
+def test_coarse_sustained():
+    trace = sustained()
+    # the offset is clamped to the end of the trace
+    assert summers_onoff(trace, 1000) == (1100, 1300)
+    assert summers(trace, 1000) == 1800.0
+
+
+@pytest.mark.benchmark
+def test_coarse_benchmark(record_property):
+    # the full-resolution scan grows with the number of samples, while the
+    # coarse-to-fine detection stops at the iMEP
+    for fs in (1000, 5000, 20000):
+        trace, tms = trial(fs)
+        timings = []
+        estimates = []
+        for coarse_in_ms in (None, 1):
+            t0 = perf_counter()
+            for _ in range(2):
+                estimate = chen(trace, tms, fs, coarse_in_ms=coarse_in_ms)
+            timings.append(perf_counter() - t0)
+            estimates.append(estimate)
+        assert estimates[0] == estimates[1]
+        record_property(f"speedup_{fs}Hz", timings[0] / timings[1])
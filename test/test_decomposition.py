@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from dimep.decomposition import (
+    first_component,
+    first_components,
+    orient,
+    orient_principal,
+)
+
+
+def exact(data):
+    c = data - data.mean(axis=0)
+    u, s, vt = np.linalg.svd(c, full_matrices=False)
+    sign = orient(u[:, 0])
+    return sign * u[:, 0] * s[0], sign * vt[0], s[0]
+
+
+@pytest.mark.parametrize("method", ["power", "randomized"])
+@pytest.mark.parametrize("n_trials", [20, 500])
+def test_first_component(method, n_trials, simulate):
+    data = simulate(n_trials)
+    score, coefficients, value = exact(data)
+    c = first_component(data, method=method, rng=np.random.default_rng(0))
+    assert np.isclose(c.value, value)
+    assert np.allclose(c.score, score, atol=1e-5 * value)
+    assert np.allclose(c.coefficients, coefficients, atol=1e-5)
+
+
+def test_first_component_memmap(tmp_path, simulate):
+    data = simulate(300).astype(np.float32)
+    score, _, value = exact(data.astype(float))
+    fname = tmp_path / "trials.npy"
+    np.save(fname, data)
+    mm = np.load(fname, mmap_mode="r")
+    c = first_component(mm, blocksize=16)
+    assert np.allclose(c.score, score, atol=1e-3 * value)
+    mm = np.load(fname, mmap_mode="r+")
+    c = first_component(mm, inplace=True, blocksize=16)
+    assert mm.dtype == np.float32
+    assert np.allclose(mm.mean(axis=0), 0, atol=1e-5)
+    assert np.allclose(c.score, score, atol=1e-3 * value)
+
+
+def test_first_components(simulate):
+    data = simulate(300)
+    for n_trials in (5, 200):
+        stack = np.stack((data[:, :n_trials], data[:, -n_trials:]))
+        scores = first_components(stack)
+        for score, pick in zip(scores, stack):
+            expected = exact(pick)[0]
+            assert np.allclose(score, expected / np.linalg.norm(expected))
+
+
+@pytest.mark.parametrize("n_trials", [2, 5, 50])
+def test_first_components_noisy(n_trials, simulate):
+    # noisy resamples of few trials, with close singular values
+    data = simulate(500, noise=1.0)
+    rng = np.random.default_rng(0)
+    stack = np.moveaxis(data[:, rng.integers(0, 500, (500, n_trials))], 0, 1)
+    scores = first_components(stack)
+    for score, pick in zip(scores, stack):
+        expected = exact(pick)[0]
+        assert np.allclose(score, expected / np.linalg.norm(expected))
+
+
+def test_orient_principal(simulate):
+    data = simulate(50)
+    flipper = orient_principal(data)
+    assert set(np.unique(flipper)) <= {-1.0, 1.0}
+    c = first_component(flipper * data)
+    assert np.all(c.coefficients >= 0)
@@ -0,0 +1,125 @@
+from dimep.edf import EDF, parse_tal
+import numpy as np
+import pytest
+
+
+def write_edf(
+    fname, signals, fs, annotations=(), record_duration=1.0, onsets=None
+):
+    "write a minimal EDF+ file with one annotation channel"
+    n = int(fs * record_duration)
+    n_records = signals.shape[1] // n
+    reserved = "EDF+C" if onsets is None else "EDF+D"
+    if onsets is None:
+        onsets = [record * record_duration for record in range(n_records)]
+    tal_bytes = 120
+    labels = [f"EMG{i}" for i in range(len(signals))] + ["EDF Annotations"]
+    ns = len(labels)
+    pmin, pmax, dmin, dmax = -5000.0, 5000.0, -32768, 32767
+
+    def field(values, width):
+        return "".join(str(v).ljust(width)[:width] for v in values)
+
+    header = (
+        "0".ljust(8)
+        + "X X X X".ljust(80)
+        + "Startdate X X X X".ljust(80)
+        + "01.01.20"
+        + "00.00.00"
+        + str(256 * (ns + 1)).ljust(8)
+        + reserved.ljust(44)
+        + str(n_records).ljust(8)
+        + f"{record_duration:g}".ljust(8)
+        + str(ns).ljust(4)
+    )
+    header += field(labels, 16)
+    header += field([""] * ns, 80)
+    header += field(["uV"] * (ns - 1) + [""], 8)
+    header += field([pmin] * (ns - 1) + [-1], 8)
+    header += field([pmax] * (ns - 1) + [1], 8)
+    header += field([dmin] * ns, 8)
+    header += field([dmax] * ns, 8)
+    header += field([""] * ns, 80)
+    header += field([n] * (ns - 1) + [tal_bytes // 2], 8)
+    header += field([""] * ns, 32)
+    gain = (pmax - pmin) / (dmax - dmin)
+    digital = np.round((signals - pmin) / gain + dmin).astype("<i2")
+    with open(fname, "wb") as f:
+        f.write(header.encode("latin-1"))
+        for record in range(n_records):
+            for channel in digital:
+                f.write(channel[record * n : (record + 1) * n].tobytes())
+            onset = onsets[record]
+            tal = f"+{onset:g}\x14\x14\x00"
+            for time, text in annotations:
+                if onset <= time < onset + record_duration:
+                    tal += f"+{time:g}\x14{text}\x14\x00"
+            f.write(tal.encode().ljust(tal_bytes, b"\x00"))
+    return digital * gain + (pmin - dmin * gain)
+
+
+@pytest.fixture
+def edf(tmp_path):
+    signals = np.random.randn(2, 5000) * 100
+    annotations = [(0.5, "TMS"), (1.25, "TMS"), (2.0, "sham"), (3.5, "TMS")]
+    fname = tmp_path / "session.edf"
+    physical = write_edf(fname, signals, 1000, annotations)
+    yield EDF(fname), physical
+
+
+def test_edf_header(edf):
+    edf, _ = edf
+    assert edf.is_edfplus
+    assert edf.labels == ["EMG0", "EMG1", "EDF Annotations"]
+    assert edf.n_records == 5
+    assert edf.fs("EMG1") == 1000.0
+    assert edf.length("EMG0") == 5000
+    assert edf.units[0] == "uV"
+
+
+def test_edf_read(edf):
+    edf, physical = edf
+    assert np.allclose(edf.read("EMG0"), physical[0])
+    assert np.allclose(edf.read(1, 999, 2001), physical[1, 999:2001])
+    assert edf.read(1, 10, 10).shape == (0,)
+    assert edf.read(1, 0, 10, physical=False).dtype == np.dtype("<i2")
+
+
+def test_edf_triggers(edf):
+    edf, physical = edf
+    annotations = edf.annotations()
+    assert [a.description for a in annotations] == ["TMS", "TMS", "sham", "TMS"]
+    assert list(edf.triggers("EMG0", "TMS")) == [500, 1250, 3500]
+    assert list(edf.triggers("EMG0")) == [500, 1250, 2000, 3500]
+    epochs = edf.epochs("EMG0", edf.triggers("EMG0", "TMS"), 200, 300)
+    assert epochs.shape == (3, 500)
+    assert np.allclose(epochs[1], physical[0, 1050:1550])
+
+
+def test_edf_discontinuous(tmp_path):
+    signals = np.random.randn(1, 4000) * 100
+    # the recording was paused for 10s after the second data record
+    onsets = [0.0, 1.0, 12.0, 13.0]
+    annotations = [(0.5, "TMS"), (5.0, "TMS"), (12.05, "TMS"), (13.9, "TMS")]
+    fname = tmp_path / "session.edf"
+    physical = write_edf(fname, signals, 1000, annotations, onsets=onsets)
+    edf = EDF(fname)
+    assert edf.is_discontinuous
+    assert list(edf.record_onsets()) == onsets
+    # the pulse at 5s lies within the gap and has no sample
+    pulses = edf.triggers("EMG0", "TMS")
+    assert list(pulses) == [500, 2050, 3900]
+    # the epoch around 12.05s would span the gap before it
+    epochs = edf.epochs("EMG0", pulses, 100, 100)
+    assert epochs.shape == (2, 200)
+    assert np.allclose(epochs[0], physical[0, 400:600])
+    assert np.allclose(epochs[1], physical[0, 3800:4000])
+    assert len(edf.epochs("EMG0", pulses, 40, 50)) == 3
+
+
+def test_parse_tal():
+    raw = b"+0\x14\x14\x00+1.5\x150.2\x14TMS\x14second\x14\x00\x00\x00"
+    annotations = parse_tal(raw)
+    assert annotations[0].onset == 1.5
+    assert annotations[0].duration == 0.2
+    assert [a.description for a in annotations] == ["TMS", "second"]
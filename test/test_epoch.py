@@ -0,0 +1,44 @@
+from dimep.epoch import epoch
+from dimep.api import batch
+import numpy as np
+import pytest
+
+
+def test_epoch():
+    recording = np.arange(10000.0)
+    epochs = epoch(recording, [100, 3000, 5000, 9950], 1000, 200, 100)
+    assert epochs.shape == (2, 300)
+    assert epochs.tms_sampleidx == 200
+    assert list(epochs.pulses) == [3000, 5000]
+    assert list(epochs.dropped) == [100, 9950]
+    for trial, pulse in zip(epochs, epochs.pulses):
+        assert np.shares_memory(trial, recording)
+        assert trial[epochs.tms_sampleidx] == pulse
+    assert np.array_equal(epochs[1], recording[4800:5100])
+    assert len(epochs[1:]) == 1
+    assert np.array_equal(np.asarray(epochs)[0], recording[2800:3100])
+    with pytest.raises(ValueError):
+        epoch(recording, [100, 3000], 1000, 200, 100, edges="raise")
+
+
+def test_epoch_view(tmp_path):
+    fname = tmp_path / "recording.npy"
+    np.save(fname, np.random.randn(2, 10000))
+    memmap = np.load(fname, mmap_mode="r")
+    epochs = epoch(memmap[1], np.arange(500, 9500, 1000), 1000, 200, 300)
+    view = epochs.view()
+    assert view.shape == (9, 500)
+    assert np.shares_memory(view, memmap)
+    assert np.array_equal(view, np.asarray(epochs))
+    with pytest.raises(ValueError):
+        epoch(memmap[1], [500, 1000, 3000], 1000, 200, 300).view()
+
+
+def test_epoch_batch(traces):
+    recording = traces.ravel()
+    pulses = np.arange(len(traces)) * traces.shape[1] + 1000
+    epochs = epoch(recording, pulses, 1000, 1000, 1000)
+    estimates = batch(epochs, epochs.tms_sampleidx, 1000, ["bawa", "chen"])
+    reference = batch(traces, 1000, 1000, ["bawa", "chen"])
+    for algo in reference:
+        assert np.allclose(estimates[algo], reference[algo])
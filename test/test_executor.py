@@ -0,0 +1,102 @@
+from dimep.executor import Executor, chunks
+from dimep.api import batch
+from os import cpu_count
+from pytest import mark
+from time import perf_counter
+import dimep.executor
+import numpy as np
+
+
+def test_chunks():
+    assert chunks(5, 2) == [slice(0, 2), slice(2, 4), slice(4, 5)]
+    assert chunks(0, 2) == []
+    assert chunks(5, 2, start=1) == [slice(1, 3), slice(3, 5)]
+
+
+def test_executor(traces):
+    traces = np.tile(traces, (4, 1))
+    exclude = np.zeros(len(traces), dtype=int)
+    exclude[3] = 1
+    executor = Executor(n_workers=3, chunksize=3)
+    estimates = executor.run(traces, 1000, 1000, exclude=exclude)
+    reference = batch(traces, 1000, 1000, exclude=exclude)
+    assert list(estimates.keys()) == list(reference.keys())
+    for algo in reference:
+        assert np.array_equal(estimates[algo], reference[algo], equal_nan=True)
+
+
+def test_executor_calibrate(traces):
+    executor = Executor(n_workers=2)
+    chunksize = executor.calibrate(
+        traces, 1000, 1000, ["bawa", "rotenberg"], candidates=[1, 2, 4]
+    )
+    assert chunksize in (1, 2, 4)
+    assert executor.chunksize == chunksize
+    # calibrates automatically if no chunksize was set
+    executor = Executor(n_workers=2)
+    details = executor.run(traces, 1000, 1000, ["bawa"], details=True)
+    assert executor.chunksize is not None
+    reference = batch(traces, 1000, 1000, ["bawa"], details=True)
+    for field in ("estimate", "onset", "offset", "peak_max", "peak_min"):
+        assert np.array_equal(details["bawa"][field], reference["bawa"][field])
+
+
+def test_executor_axis(traces):
+    executor = Executor(n_workers=2, chunksize=7)
+    a = executor.run(traces.T, 1000, algorithms=["lewis"], axis=0)
+    b = executor.run(traces, 1000, algorithms=["lewis"])
+    assert np.array_equal(a["lewis"], b["lewis"], equal_nan=True)
+
+
+def test_executor_processes(traces):
+    exclude = np.array([0, 1, 0, 0, 0])
+    executor = Executor(n_workers=2, chunksize=2, processes=True)
+    estimates = executor.run(traces, 1000, exclude=exclude)
+    reference = batch(traces, 1000, exclude=exclude)
+    for algo in reference:
+        assert np.array_equal(estimates[algo], reference[algo], equal_nan=True)
+
+
+def test_executor_calibration_reused(traces, monkeypatch):
+    traces = np.tile(traces, (20, 1))
+    estimated = []
+
+    def counting(chunk, tms, kwargs):
+        estimated.append(len(chunk))
+        return batch(chunk, tms, **kwargs)
+
+    monkeypatch.setattr(dimep.executor, "_run_chunk", counting)
+    monkeypatch.setattr(dimep.executor, "CACHE_BYTES", 4 * traces[0].nbytes)
+    executor = Executor(n_workers=2)
+    estimates = executor.run(traces, 1000, algorithms=["bawa"])
+    # the calibration blocks are part of the run, no trial is estimated twice
+    assert sum(estimated) == len(traces)
+    assert executor.chunksize in (1, 2, 4, 8)
+    assert np.array_equal(
+        estimates["bawa"], batch(traces, 1000, algorithms=["bawa"])["bawa"]
+    )
+
+
+@mark.benchmark
+def test_executor_benchmark(traces, record_property):
+    traces = np.tile(traces, (200, 1))
+    n_workers = cpu_count() or 1
+    t0 = perf_counter()
+    reference = batch(traces, 1000)
+    durations = {"batch": perf_counter() - t0}
+    for processes in (False, True):
+        executor = Executor(n_workers, chunksize=50, processes=processes)
+        t0 = perf_counter()
+        estimates = executor.run(traces, 1000)
+        durations["processes" if processes else "threads"] = (
+            perf_counter() - t0
+        )
+        for algo in reference:
+            assert np.array_equal(
+                estimates[algo], reference[algo], equal_nan=True
+            )
+    record_property("workers", n_workers)
+    for kind, duration in durations.items():
+        record_property(f"seconds_{kind}", duration)
+    if n_workers > 1:
+        assert durations["processes"] < durations["batch"]
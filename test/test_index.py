@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+from dimep.algo.chen import chen_baseline
+from dimep.api import batch
+from dimep.index import SessionIndex, sidecar, write_index
+
+
+def test_index_matrix(tmp_path, traces):
+    path = tmp_path / "session.npy"
+    np.save(path, traces)
+    index = write_index(path, tms_sampleidx=1000, fs=1000)
+    assert sidecar(path).exists()
+    reopened = SessionIndex(path)
+    assert len(reopened) == len(traces) and reopened.fs == 1000
+    assert isinstance(reopened.records, np.memmap)
+    assert reopened.verify()
+    for ix, trace in enumerate(traces):
+        assert np.array_equal(reopened.trial(ix), trace)
+        assert np.allclose(reopened.baseline[ix], chen_baseline(trace, 1000))
+    assert np.array_equal(reopened.tms, [1000] * len(traces))
+    subset = reopened.trials(np.array([3, 1]))
+    assert np.array_equal(subset[0], traces[3])
+    assert np.array_equal(subset[1], traces[1])
+    assert not reopened.changed(index).any()
+    assert reopened.changed(None).all()
+
+
+def test_index_recording(tmp_path, traces):
+    path = tmp_path / "recording.npy"
+    recording = np.concatenate(
+        [
+            trace[:length]
+            for trace, length in zip(traces, [2000, 1500, 1800, 1200, 1100])
+        ]
+    )
+    np.save(path, recording)
+    offsets = np.array([0, 2000, 3500, 5300, 6500, 7600])
+    tms = np.array([1000, 1000, 1000, 50, 1000])
+    index = write_index(path, tms, fs=1000, offsets=offsets)
+    assert np.array_equal(index.offsets, offsets)
+    assert np.isnan(index.baseline[3]).all()
+    trials = index.trials()
+    assert np.array_equal(trials[4], traces[4][:1100])
+    estimates = batch(trials, index.tms, algorithms=["lewis"])
+    assert np.isfinite(estimates["lewis"]).sum() >= 4
+    with pytest.raises(ValueError):
+        write_index(path, 1000)
+
+
+def test_index_changed(tmp_path, traces):
+    path = tmp_path / "session.npy"
+    np.save(path, traces)
+    previous = write_index(path, tms_sampleidx=1000)
+    modified = np.array(traces)
+    modified[2, 500] += 1.0
+    np.save(path, modified)
+    assert not previous.verify()
+    index = write_index(path, tms_sampleidx=1000)
+    changed = index.changed(previous)
+    assert list(np.flatnonzero(changed)) == [2]
+    # the drivers skip the unchanged trials
+    estimates = batch(index.trials(), index.tms, exclude=~changed)
+    assert np.isfinite(estimates["lewis"]).sum() == 1
+    # a different pulse changes the trial, too
+    moved = write_index(
+        path, tms_sampleidx=np.array([1000, 999, 1000, 1000, 1000])
+    )
+    assert list(np.flatnonzero(moved.changed(index))) == [1]
+    sidecar(path).write_bytes(b"garbage")
+    with pytest.raises(ValueError):
+        SessionIndex(path)
+
+
+def test_index_grown(tmp_path, traces):
+    path = tmp_path / "session.npy"
+    np.save(path, traces[:4, :500])
+    write_index(path, tms_sampleidx=250)
+    # two trials are appended after the index was written
+    np.save(path, traces[:, :500][[0, 1, 2, 3, 0, 4]])
+    previous = SessionIndex(path)
+    assert previous.stale and len(previous) == 4
+    index = write_index(path, tms_sampleidx=250)
+    assert not index.stale
+    assert list(np.flatnonzero(index.changed(previous))) == [4, 5]
+
+
+def test_index_checks_data(tmp_path, traces):
+    path = tmp_path / "session.npy"
+    np.save(path, traces)
+    index = write_index(path, tms_sampleidx=1000)
+    # the data file is mapped once, and trials are views into it
+    assert np.shares_memory(index.trial(1), index.samples)
+    assert np.shares_memory(index.trials().samples, index.samples)
+    assert not index.stale
+    np.save(path, traces[:3])
+    # a stale index opens, but its trials are not accessible
+    stale = SessionIndex(path)
+    assert stale.stale
+    with pytest.raises(ValueError):
+        stale.trial(0)
+    np.save(path, np.asfortranarray(traces))
+    with pytest.raises(ValueError):
+        write_index(path, tms_sampleidx=1000)
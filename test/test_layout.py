@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+import tracemalloc
+from time import perf_counter
+from dimep.api import batch
+from dimep.screen import screen
+from dimep.tools import as_trials
+from dimep.algo.loyda import loyda_batch
+from dimep.algo.guggenberger import get_bank, match_bank
+
+
+def layouts(traces):
+    "the (samples, trials) matrix in C and Fortran order"
+    c = np.ascontiguousarray(traces.T)
+    f = np.asfortranarray(traces.T)
+    return [c, f]
+
+
+@pytest.mark.parametrize("order", [0, 1])
+def test_as_trials_is_a_view(traces, order):
+    data = layouts(traces)[order]
+    view = as_trials(data, axis=0)
+    assert view.shape == traces.shape
+    assert np.shares_memory(view, data)
+    assert np.array_equal(view, traces)
+
+
+@pytest.mark.parametrize("order", [0, 1])
+def test_axis_matches_trial_major(traces, order):
+    data = layouts(traces)[order]
+    tms = 1000
+    assert np.array_equal(screen(data, tms, axis=0), screen(traces, tms))
+    a = loyda_batch(data, tms, axis=0)
+    b = loyda_batch(traces, tms)
+    assert np.array_equal(a.estimate, b.estimate, equal_nan=True)
+    bank = get_bank(fs=1000)
+    for x, y in zip(
+        match_bank(bank, data, tms, axis=0), match_bank(bank, traces, tms)
+    ):
+        assert np.allclose(x, y)
+    a = batch(data, tms, algorithms=["lewis", "chen"], axis=0)
+    b = batch(traces, tms, algorithms=["lewis", "chen"])
+    for algo in a:
+        assert np.array_equal(a[algo], b[algo], equal_nan=True)
+
+
+def paths():
+    "the batched paths which accept an axis, with their arguments"
+    bank = get_bank(fs=1000)
+    return {
+        "batch": lambda d, axis: batch(d, 1000, algorithms=["lewis"], axis=axis),
+        "screen": lambda d, axis: screen(d, 1000, preactivation=50, axis=axis),
+        "loyda_batch": lambda d, axis: loyda_batch(d, 1000, axis=axis),
+        "match_bank": lambda d, axis: match_bank(bank, d, 1000, axis=axis),
+    }
+
+
+def peak_memory(run, data, axis):
+    tracemalloc.start()
+    run(data, axis)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+@pytest.mark.parametrize("order", [0, 1])
+@pytest.mark.parametrize("path", list(paths().keys()))
+def test_layout_does_not_copy(order, path):
+    # a benchmark of the peak memory: a (samples, trials) matrix must not be
+    # copied or transposed as a whole, so it takes no more memory than the
+    # same trials in (trials, samples) order
+    rng = np.random.default_rng(0)
+    traces = rng.normal(size=(400, 2000)) * 10
+    data = layouts(traces)[order]
+    run = paths()[path]
+    peak = peak_memory(run, data, 0)
+    assert peak <= 1.05 * peak_memory(run, traces, -1) + 2 ** 16
+    if path == "batch":
+        # per-trial processing allocates nothing of the size of the matrix
+        assert peak < data.nbytes / 4
+
+
+@pytest.mark.benchmark
+def test_layout_benchmark(record_property):
+    # strided access into a C-ordered (samples, trials) matrix is less cache
+    # friendly than the trial-major or Fortran-ordered layouts
+    rng = np.random.default_rng(0)
+    traces = rng.normal(size=(2000, 2000)) * 10
+    inputs = [(traces, -1)] + [(data, 0) for data in layouts(traces)]
+    for path, run in paths().items():
+        durations = []
+        for data, axis in inputs:
+            t0 = perf_counter()
+            run(data, axis)
+            durations.append(perf_counter() - t0)
+        ratios = [d / durations[0] for d in durations]
+        record_property(f"{path}_C", ratios[1])
+        record_property(f"{path}_F", ratios[2])
+        assert max(ratios) < 2
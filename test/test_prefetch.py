@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from threading import Event
+from time import sleep
+from dimep.prefetch import Prefetcher, _open, throughput
+
+
+@pytest.fixture
+def files(tmp_path, traces):
+    paths = []
+    for ix in range(4):
+        path = tmp_path / f"s{ix:02d}.npy"
+        np.save(path, np.asarray(traces) + ix)
+        paths.append(path)
+    return paths
+
+
+def test_prefetcher_order(files, traces):
+    with Prefetcher(files, depth=2, chunksize=2) as reader:
+        chunks = list(reader)
+    assert len(chunks) == 4 * len(range(0, len(traces), 2))
+    for ix, path in enumerate(files):
+        loaded = np.concatenate([c.traces for c in chunks if c.path == path])
+        assert np.array_equal(loaded, np.asarray(traces) + ix)
+    assert reader.stats.chunks == len(chunks)
+    assert reader.stats.nbytes == 4 * np.asarray(traces).nbytes
+
+
+def test_prefetcher_memory_cap(files, traces):
+    nbytes = np.asarray(traces[:2]).nbytes
+    reader = Prefetcher(files, depth=8, max_bytes=2 * nbytes, chunksize=2)
+    for chunk in reader:
+        sleep(0.01)
+        assert reader._held <= 2 * nbytes
+
+
+def test_prefetcher_error(tmp_path):
+    reader = Prefetcher([tmp_path / "missing.npy"])
+    with pytest.raises(FileNotFoundError):
+        list(reader)
+
+
+def test_prefetcher_overlaps(files):
+    # the next file is opened while the first chunk is still processed
+    opened = []
+    second = Event()
+
+    def opener(path):
+        opened.append(path)
+        if len(opened) == 2:
+            second.set()
+        return np.load(path, mmap_mode="r")
+
+    with Prefetcher(files, depth=1, opener=opener) as reader:
+        for ix, chunk in enumerate(reader):
+            if ix == 0:
+                assert second.wait(10)
+    assert opened == files
+
+
+def test_prefetcher_stopped(files):
+    reader = Prefetcher(files, chunksize=1)
+    reader._stop.set()
+    assert not reader._reserve(8)
+    assert reader._held == 0
+    # the time spent in the opener counts as loading
+    reader = Prefetcher(files, opener=lambda path: sleep(0.05) or _open(path))
+    list(reader)
+    assert reader.stats.loading >= 4 * 0.05
+
+
+@pytest.mark.benchmark
+def test_prefetcher_throughput(files, record_property):
+    def opener(path):
+        sleep(0.05)
+        return np.load(path, mmap_mode="r")
+
+    def process(chunk):
+        sleep(0.05)
+
+    rates = throughput(files, process, opener=opener)
+    record_property("speedup", rates["prefetched"] / rates["sequential"])
@@ -0,0 +1,147 @@
+import numpy as np
+import pytest
+from dimep.api import batch
+from dimep.algo.guggenberger import get_bank, match_bank
+from dimep.algo.loyda import loyda_batch
+from dimep.executor import Executor
+from dimep.ragged import Ragged, rectified
+from dimep.screen import screen
+
+
+@pytest.fixture
+def ragged(traces):
+    # epochs of different length, each followed by a large artifact at the
+    # start of the next epoch which must never leak into the previous one
+    lengths = [2000, 1500, 1103, 1900, 1210]
+    epochs = [
+        np.concatenate(([5000.0] * 3, trace[3:length]))
+        for trace, length in zip(traces, lengths)
+    ]
+    return epochs, Ragged.from_traces(epochs)
+
+
+def test_ragged_container(ragged):
+    epochs, trials = ragged
+    assert len(trials) == len(epochs)
+    assert list(trials.lengths) == [len(e) for e in epochs]
+    for epoch, trial in zip(epochs, trials):
+        assert np.shares_memory(trial, trials.samples)
+        assert np.array_equal(epoch, trial)
+    sub = trials[1:3]
+    assert np.shares_memory(sub.samples, trials.samples)
+    assert np.array_equal(sub[1], epochs[2])
+    picked = trials[np.array([4, 0])]
+    assert np.array_equal(picked[0], epochs[4])
+    with pytest.raises(ValueError):
+        Ragged(np.zeros(10), [0, 5, 3])
+
+
+def test_ragged_runs():
+    trials = Ragged.from_traces([np.ones(3), np.zeros(0), np.ones(2)])
+    row, start, stop = trials.runs(trials.values() > 0)
+    assert list(row) == [0, 2] and list(start) == [0, 0]
+    assert list(stop) == [3, 2]
+    row, start, stop = trials[2:3].runs(np.ones(2, bool))
+    assert list(row) == [0] and list(stop) == [2]
+
+
+def test_ragged_batch(ragged):
+    epochs, trials = ragged
+    algorithms = ["lewis", "chen", "loyda"]
+    estimates = batch(trials, 1000, algorithms=algorithms, details=True)
+    for ix, epoch in enumerate(epochs):
+        expected = batch(epoch, 1000, algorithms=algorithms, details=True)
+        for algo in algorithms:
+            assert estimates[algo][ix].tobytes() == expected[algo][0].tobytes()
+    parallel = Executor(n_workers=2, chunksize=2).run(trials, 1000)
+    sequential = batch(trials, 1000)
+    for algo, values in sequential.items():
+        assert np.allclose(parallel[algo], values, equal_nan=True)
+
+
+def test_ragged_screen(ragged):
+    epochs, trials = ragged
+    tms = np.array([1000, 1500, 100, 1000, 1000])
+    for kwargs in (dict(), dict(saturation=4000), dict(preactivation=50)):
+        reasons = screen(trials, tms, **kwargs)
+        for epoch, t, reason in zip(epochs, tms, reasons):
+            assert screen(epoch[None, :], t, **kwargs)[0] == reason
+
+
+def test_ragged_loyda_batch(ragged):
+    epochs, trials = ragged
+    tms = np.array([1000, 1200, 1000, 900, 1000])
+    results = loyda_batch(trials, tms)
+    shams = loyda_batch(trials, tms, sham_traces=trials[::-1])
+    for ix, epoch in enumerate(epochs):
+        expected = loyda_batch(epoch[None, :], tms[ix])
+        sham = epochs[len(epochs) - 1 - ix]
+        n = min(len(epoch), len(sham))
+        for field in ("estimate", "onset", "offset", "iMEPArea", "valid"):
+            assert np.allclose(
+                getattr(results, field)[ix],
+                getattr(expected, field)[0],
+                equal_nan=True,
+            )
+        paired = loyda_batch(
+            epoch[None, :n], tms[ix], sham_traces=sham[None, :n]
+        )
+        # each iMEP ends before the shorter of both trials, so cropping them
+        # to a matrix does not change the estimate
+        assert paired.offset[0] < n - 1
+        assert np.isclose(shams.estimate[ix], paired.estimate[0])
+    # the last three trials respond, and are paired with a different sham
+    assert np.all(shams.onset[2:] > 0) and np.all(shams.valid)
+    assert np.allclose(shams.estimate[2:], [100, 343.48, 780.53], atol=0.01)
+
+
+def test_ragged_match_bank(ragged):
+    epochs, trials = ragged
+    bank = get_bank(fs=1000)
+    for normalization in ("global", "local"):
+        scores, index, lags = match_bank(
+            bank, trials, 1000, normalization=normalization
+        )
+        for ix, epoch in enumerate(epochs):
+            expected = match_bank(
+                bank, epoch, 1000, normalization=normalization
+            )
+            assert np.isclose(scores[ix], expected[0][0])
+            assert index[ix] == expected[1][0] and lags[ix] == expected[2][0]
+
+
+@pytest.mark.parametrize("order", ["C", "F"])
+def test_rectified(ragged, traces, order):
+    epochs, trials = ragged
+    matrix = np.asarray(traces, order=order)
+    for batch, rows in ((trials, epochs), (matrix, list(matrix))):
+        for keep in (None, np.array([3, 0])):
+            rect = rectified(batch, keep)
+            picked = rows if keep is None else [rows[ix] for ix in keep]
+            assert len(rect) == len(picked)
+            for trial, row in zip(rect, picked):
+                assert np.array_equal(trial, np.abs(row))
+            buffer = batch.samples if isinstance(batch, Ragged) else batch
+            assert not np.shares_memory(rect.samples, buffer)
+    # a matrix becomes a batch of fixed-length trials
+    rect = rectified(matrix)
+    assert rect.width == matrix.shape[1] and trials.width is None
+
+
+def test_ragged_width(ragged, traces):
+    # the reductions along the rows of fixed-length trials match the binning
+    # of ragged trials
+    epochs, trials = ragged
+    rect = rectified(traces)
+    binned = Ragged(rect.samples, rect.offsets)
+    binned.width = None
+    values = rect.values()
+    start = np.array([0, 100, 1990, 500, 3000])
+    stop = np.array([2000, 50, 2000, 1500, 4000])
+    assert np.array_equal(rect.local(), binned.local())
+    assert np.allclose(rect.sum(values), binned.sum(values))
+    assert np.array_equal(rect.max(values), binned.max(values))
+    assert np.allclose(
+        rect.window_sum(values, start, stop),
+        binned.window_sum(values, start, stop),
+    )
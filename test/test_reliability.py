@@ -0,0 +1,28 @@
+import numpy as np
+from dimep.reliability import get_score, reliability
+from dimep.decomposition import first_components
+
+
+def test_get_score_match_svd(simulate):
+    data = simulate(300)
+    for pick in (data[:, :5], data[:, :200]):
+        c = pick - pick.mean(axis=0)
+        u, s, vt = np.linalg.svd(c, full_matrices=False)
+        exact = (
+            -u[:, 0] if np.argmax(u[:, 0]) > np.argmin(u[:, 0]) else u[:, 0]
+        )
+        assert np.allclose(get_score(pick), exact, atol=1e-6)
+    scores = first_components(np.stack((data[:, :5], data[:, 5:10])))
+    assert scores.shape == (2, data.shape[0])
+
+
+def test_reliability(simulate):
+    data = simulate(200)
+    ratio, r = reliability(data, ratio=[2, 10, 50], seed=1, n_workers=2)
+    assert list(ratio) == [2, 10, 50]
+    # reproducibility increases with the number of trials
+    assert np.all(np.diff(r) > 0)
+    assert r[-1] > 0.95
+    # reproducible independent of the number of workers
+    _, same = reliability(data, ratio=[2, 10, 50], seed=1, n_workers=4)
+    assert np.allclose(r, same)
@@ -0,0 +1,46 @@
+from dimep.algo import *
+from dimep.algo import __all__
+from dimep.algo.chen import chen_onoff
+from dimep.algo.guggenberger import get_template
+from dimep.result import Result, records
+from dimep.api import batch
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize("algo", (__all__))
+def test_details(traces, algo):
+    for trace in traces:
+        result = globals()[algo](trace, tms_sampleidx=1000, details=True)
+        assert isinstance(result, Result)
+        assert float(result) == globals()[algo](trace, tms_sampleidx=1000)
+
+
+def test_details_onoff(traces):
+    for trace in traces:
+        result = chen(trace, 1000, details=True)
+        assert (result.onset, result.offset) == chen_onoff(trace, 1000)
+        if result.offset > result.onset:
+            window = trace[result.onset : result.offset]
+            assert trace[result.peak_max] == window.max()
+            assert trace[result.peak_min] == window.min()
+
+
+def test_details_lag():
+    trace = np.zeros(1000)
+    template = get_template(fs=1000)
+    trace[520 : 520 + len(template)] = template
+    result = guggenberger(trace, 500, 1000, details=True)
+    assert result.lag == 20
+    assert result.onset == 520
+    assert np.isclose(float(result), 1.0)
+
+
+def test_records(traces):
+    results = [lewis(trace, 1000, details=True) for trace in traces]
+    array = records(results)
+    assert array.dtype == Result.dtype
+    assert np.array_equal(array["onset"], [r.onset or -1 for r in results])
+    assert np.all(array["lag"] == -1)
+    details = batch(traces, 1000, 1000, ["lewis"], details=True)
+    assert np.array_equal(details["lewis"], array)
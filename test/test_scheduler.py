@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from dimep.api import all
+from dimep.scheduler import PRIORITY, Scheduler
+
+
+def test_scheduler_unlimited(traces):
+    scheduler = Scheduler()
+    outcome = scheduler.run(traces[0], 1000, budget_in_ms=np.inf)
+    assert outcome.skipped == []
+    assert list(outcome.estimates.keys()) == list(PRIORITY)
+    expected = all(traces[0], 1000)
+    for algo, estimate in outcome.estimates.items():
+        assert np.isclose(estimate, expected[algo], equal_nan=True)
+    assert set(scheduler.costs_in_ms) == set(PRIORITY)
+
+
+def test_scheduler_budget(traces):
+    costs = {algo: 1.0 for algo in PRIORITY}
+    costs.update(wassermann=1e6, guggenberger=1e6)
+    scheduler = Scheduler(costs_in_ms=costs)
+    outcome = scheduler.run(traces[0], 1000, budget_in_ms=1e5)
+    assert outcome.skipped == ["wassermann", "guggenberger"]
+    assert list(outcome.estimates) == list(PRIORITY[:-2])
+    # nothing fits into an exhausted budget
+    outcome = scheduler.run(traces[0], 1000, budget_in_ms=0)
+    assert outcome.estimates == {} and outcome.skipped == list(PRIORITY)
+
+
+def test_scheduler_learns_costs(traces):
+    scheduler = Scheduler(priority=["bawa"], smoothing=0.5)
+    scheduler.costs_in_ms["bawa"] = 1000.0
+    scheduler.run(traces[0], 1000, budget_in_ms=np.inf)
+    # the moving average moves halfway to the measured duration
+    assert 500 <= scheduler.costs_in_ms["bawa"] < 510
+    costs = scheduler.warmup(traces[0], 1000, repetitions=20)
+    assert costs["bawa"] < 1
+
+
+def test_scheduler_recovers(traces):
+    # a cold first call overestimates the cost
+    scheduler = Scheduler(priority=["bawa"], costs_in_ms={"bawa": 100.0})
+    assert scheduler.run(traces[0], 1000, budget_in_ms=50).skipped == ["bawa"]
+    assert scheduler.stale == ["bawa"] and scheduler.costs_in_ms["bawa"] == 100
+    # calibrating replaces the estimate with the measured duration
+    assert scheduler.calibrate(traces[0], 1000)["bawa"] < 50
+    assert scheduler.stale == []
+    assert scheduler.run(traces[0], 1000, budget_in_ms=50).skipped == []
+    # an exhausted budget does not mark algorithms as stale
+    scheduler.run(traces[0], 1000, budget_in_ms=0)
+    assert scheduler.stale == []
+
+
+def test_scheduler_keeps_the_budget(traces, monkeypatch):
+    import dimep.algo
+    from time import sleep
+
+    def expensive(*args, **kwargs):
+        sleep(0.005)
+        return 0.0
+
+    monkeypatch.setattr(dimep.algo, "wassermann", expensive)
+    scheduler = Scheduler(priority=["bawa", "wassermann"])
+    scheduler.warmup(traces[0], 1000, repetitions=1)
+    overruns = 0
+    for _ in range(200):
+        outcome = scheduler.run(traces[0], 1000, budget_in_ms=2)
+        overruns += outcome.elapsed_in_ms > 2
+        assert outcome.skipped == ["wassermann"]
+        scheduler.calibrate(traces[0], 1000)
+    assert overruns == 0
+    assert scheduler.costs_in_ms["wassermann"] >= 5
+
+
+def test_scheduler_unknown():
+    with pytest.raises(ValueError):
+        Scheduler(priority=["bawa", "unknown"])
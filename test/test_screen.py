@@ -0,0 +1,37 @@
+from dimep.screen import *
+import numpy as np
+
+
+def test_screen(traces):
+    assert list(screen(traces, tms_sampleidx=1000, fs=1000)) == [OK] * len(
+        traces
+    )
+
+
+def test_screen_reasons():
+    traces = np.random.randn(5, 2000)
+    traces[1, 1010:1015] = 100
+    traces[3, 900:1000] += 50
+    tms_sampleidx = np.asarray([1000, 1000, 150, 1000, 2000])
+    reasons = screen(
+        traces, tms_sampleidx, 1000, saturation=100, preactivation=10
+    )
+    assert reasons[0] == OK
+    assert reasons[1] == SATURATED
+    assert reasons[2] == NO_BASELINE
+    assert reasons[3] == PREACTIVATION
+    assert reasons[4] == NO_POSTSTIM
+    assert explain(reasons[4]) == ["no post-stimulus period"]
+    # above the amplifier limit
+    reasons = screen(traces, 1000, 1000, saturation=200)
+    assert reasons[1] == OK
+    assert explain(SATURATED | NO_BASELINE) == ["saturated", "no baseline"]
+
+
+def test_screen_quantized():
+    # integer data repeats its maximum without being clipped
+    traces = np.round(np.random.randn(5, 2000) * 2).astype(np.int16)
+    traces[:, 10:20] = traces.max()
+    assert list(screen(traces, 1000, 1000)) == [OK] * len(traces)
+    reasons = screen(traces, 1000, 1000, saturation=traces.max())
+    assert list(reasons) == [SATURATED] * len(traces)
@@ -0,0 +1,56 @@
+import numpy as np
+from dimep.simulate import generate, to_memmap
+from dimep.api import batch
+
+
+def test_generate_reproducible():
+    a = list(generate(10, seed=1, chunksize=4))
+    b = list(generate(10, seed=1, chunksize=4))
+    assert [len(c.traces) for c in a] == [4, 4, 2]
+    for x, y in zip(a, b):
+        assert np.array_equal(x.traces, y.traces)
+        assert np.array_equal(x.truth, y.truth)
+    c = next(generate(4, seed=2, chunksize=4))
+    assert not np.array_equal(a[0].traces, c.traces)
+
+
+def test_generate_truth():
+    fs = 5000
+    chunk = next(
+        generate(
+            200,
+            fs=fs,
+            seed=0,
+            chunksize=200,
+            noise_in_uv=0.0,
+            amplitude_in_uv=(100, 500),
+        )
+    )
+    truth = chunk.truth
+    assert np.all(truth["onset"] - chunk.tms >= 15 * fs / 1000)
+    assert np.all(truth["onset"] - chunk.tms <= 30 * fs / 1000 + 1)
+    for trace, t in zip(chunk.traces, truth):
+        response = trace[t["onset"] : t["offset"] + 1]
+        assert np.isclose(np.ptp(response), t["amplitude"], rtol=0.05)
+        assert np.all(trace[: t["onset"]] == 0)
+        assert np.all(trace[t["offset"] + 1 :] == 0)
+
+
+def test_generate_noise():
+    chunk = next(generate(50, seed=0, amplitude_in_uv=(0, 0), color=0.5))
+    traces = chunk.traces
+    assert np.isclose(traces.std(), 10, rtol=0.1)
+    lag = np.mean(traces[:, 1:] * traces[:, :-1]) / traces.var()
+    assert np.isclose(lag, 0.5, atol=0.05)
+
+
+def test_to_memmap(tmp_path):
+    path = tmp_path / "sim.npy"
+    traces, truth = to_memmap(path, 10, seed=3, chunksize=3, fs=1000)
+    expected = np.concatenate(
+        [c.traces for c in generate(10, seed=3, chunksize=3)]
+    )
+    assert np.array_equal(np.load(path, mmap_mode="r"), expected)
+    assert len(truth) == 10
+    estimates = batch(traces, 250, algorithms=["lewis"])
+    assert np.corrcoef(estimates["lewis"], truth["amplitude"])[0, 1] > 0.9
@@ -0,0 +1,140 @@
+import csv
+import sqlite3
+import numpy as np
+import pytest
+import dimep.api
+from time import perf_counter
+from dimep.api import batch
+from dimep.executor import Executor
+from dimep.sinks import (
+    CSVSink,
+    MemmapSink,
+    NPZSink,
+    Sink,
+    SQLiteSink,
+    columns,
+    load_npz,
+)
+
+
+def test_columns(traces):
+    estimates = batch(traces[:3], 1000, algorithms=["chen"], details=True)
+    cols = columns(np.arange(3), estimates)
+    assert list(cols)[:4] == ["trial", "chen", "chen_onset", "chen_offset"]
+    assert np.array_equal(cols["chen"], estimates["chen"]["estimate"])
+
+
+def read(kind, path):
+    if kind == "memmap":
+        return np.load(path, mmap_mode="r")
+    if kind == "npz":
+        return load_npz(path)
+    if kind == "csv":
+        with open(path) as f:
+            rows = list(csv.DictReader(f))
+        return {k: np.array([float(r[k]) for r in rows]) for k in rows[0]}
+    with sqlite3.connect(str(path)) as connection:
+        cursor = connection.execute("SELECT * FROM estimates ORDER BY trial")
+        names = [d[0] for d in cursor.description]
+        rows = cursor.fetchall()
+    return {
+        n: np.array([np.nan if r[i] is None else r[i] for r in rows], float)
+        for i, n in enumerate(names)
+    }
+
+
+@pytest.mark.parametrize("kind", ["memmap", "npz", "csv", "sqlite"])
+def test_sinks(traces, tmp_path, kind):
+    path = tmp_path / "out"
+    sink = dict(
+        memmap=lambda: MemmapSink(path, capacity=2),
+        npz=lambda: NPZSink(path),
+        csv=lambda: CSVSink(path),
+        sqlite=lambda: SQLiteSink(path),
+    )[kind]()
+    algorithms = ["lewis", "chen"]
+    with sink:
+        expected = Executor(n_workers=2, chunksize=2).run(
+            traces, 1000, algorithms=algorithms, details=True, sink=sink
+        )
+    written = read(kind, path)
+    assert np.array_equal(written["trial"], np.arange(len(traces)))
+    for algo in algorithms:
+        for field, name in [("estimate", algo), ("onset", f"{algo}_onset")]:
+            assert np.allclose(
+                written[name], expected[algo][field], equal_nan=True
+            )
+
+
+def test_batch_sink(traces, tmp_path):
+    with MemmapSink(tmp_path / "out.npy") as sink:
+        expected = batch(traces[:4], 1000, algorithms=["lewis"], sink=sink)
+    written = np.load(tmp_path / "out.npy")
+    assert written.shape == (4,)
+    assert np.array_equal(written["lewis"], expected["lewis"])
+
+
+class Recorder(Sink):
+    def __init__(self):
+        self.chunks = []
+
+    def append(self, chunk):
+        self.chunks.append(chunk)
+
+
+def test_batch_sink_chunks(traces, monkeypatch):
+    monkeypatch.setattr(dimep.api, "CHUNK_ROWS", 2)
+    sink = Recorder()
+    expected = batch(
+        traces, 1000, algorithms=["lewis"], exclude=[0, 1, 0, 0, 0], sink=sink
+    )
+    # chunks are written while the trials are estimated, skipped ones as nan
+    assert [list(chunk["trial"]) for chunk in sink.chunks] == [
+        [0, 1],
+        [2, 3],
+        [4],
+    ]
+    written = np.concatenate([chunk["lewis"] for chunk in sink.chunks])
+    assert np.array_equal(written, expected["lewis"], equal_nan=True)
+
+
+def test_sink_interface(tmp_path):
+    with pytest.raises(TypeError):
+        Sink()
+    path = tmp_path / "out.npy"
+    path.write_bytes(b"keep")
+    with pytest.raises(FileExistsError):
+        MemmapSink(path)
+    assert path.read_bytes() == b"keep"
+    with MemmapSink(path, overwrite=True) as sink:
+        sink.write(np.arange(2), {"lewis": np.ones(2)})
+    assert np.array_equal(np.load(path)["lewis"], np.ones(2))
+
+
+@pytest.mark.benchmark
+def test_sink_benchmark(traces, tmp_path, record_property):
+    n_rows, chunksize = 200000, 1000
+    estimates = batch(traces, 1000, algorithms=["lewis", "chen"], details=True)
+    chunk = {
+        algo: np.resize(values, chunksize)
+        for algo, values in estimates.items()
+    }
+    sinks = dict(
+        memmap=lambda path: MemmapSink(path),
+        npz=lambda path: NPZSink(path),
+        csv=lambda path: CSVSink(path),
+        sqlite=lambda path: SQLiteSink(path),
+    )
+    rates = {}
+    for kind, sink in sinks.items():
+        t0 = perf_counter()
+        with sink(tmp_path / kind) as opened:
+            for start in range(0, n_rows, chunksize):
+                opened.write(np.arange(start, start + chunksize), chunk)
+        rates[kind] = n_rows / (perf_counter() - t0)
+        record_property(f"rows_per_second_{kind}", rates[kind])
+    t0 = perf_counter()
+    batch(traces, 1000, algorithms=["lewis", "chen"], details=True)
+    estimation = len(traces) / (perf_counter() - t0)
+    record_property("trials_per_second_estimation", estimation)
+    assert min(rates.values()) > estimation
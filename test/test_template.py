@@ -0,0 +1,46 @@
+import numpy as np
+from dimep.template import OnlineTemplate
+from dimep.decomposition import orient
+from dimep.algo.guggenberger import get_template, match_template
+
+
+def embed(data):
+    "the (trials, 300) traces with the iMEPs starting at sample 100"
+    traces = np.zeros((data.shape[1], 300))
+    traces[:, 100 : 100 + data.shape[0]] = data.T
+    return traces
+
+
+def test_online_template_matches_pca(simulate):
+    traces = embed(simulate(50, noise=0.05))
+    learner = OnlineTemplate(fs=1000)
+    for part in np.array_split(traces, 7):
+        learner.update(part, tms_sampleidx=100)
+    assert learner.count == 50
+    # the first principal component of the (samples, trials) matrix
+    data = learner.segments(traces, 100).T
+    u, s, vt = np.linalg.svd(data - data.mean(axis=0), full_matrices=False)
+    assert np.allclose(learner.template, orient(u[:, 0]) * u[:, 0], atol=1e-6)
+    assert np.isclose(np.linalg.norm(learner.template), 1)
+    assert learner.explained > 0.8
+
+
+def test_online_template_match(simulate):
+    traces = embed(simulate(20, noise=0.05))
+    waveform = get_template(fs=1000)
+    learner = OnlineTemplate(fs=1000).update(traces, 100)
+    assert np.corrcoef(learner.template, waveform)[0, 1] > 0.99
+    score = match_template(learner.template, traces[0], 100, fs=1000)
+    assert np.isclose(
+        score, match_template(waveform, traces[0], 100), atol=0.05
+    )
+
+
+def test_online_template_merge(simulate):
+    traces = embed(simulate(40, noise=0.05))
+    a = OnlineTemplate().update(traces[:25], 100)
+    b = OnlineTemplate().update(traces[25:], 100)
+    full = OnlineTemplate().update(traces, 100)
+    a.merge(b)
+    assert np.allclose(a.scatter, full.scatter)
+    assert np.allclose(a.template, full.template)
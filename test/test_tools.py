@@ -21,3 +21,12 @@ def test_bwboundaries():
     assert np.allclose(bw_boundaries([1, 1, 1, 1, 1]), [1, 1, 1, 1, 1])
     assert np.allclose(bw_boundaries([1, 1, 0, 0, 1]), [1, 1, 0, 0, 2])
     assert np.allclose(bw_boundaries([1, 1, 0, 1, 0, 1]), [1, 1, 0, 2, 0, 3])
+
+
+def test_runs():
+    bools = np.asarray([[0, 1, 1, 0, 1], [1, 1, 1, 1, 1], [0, 0, 0, 0, 0]])
+    row, start, stop = runs(bools)
+    assert list(row) == [0, 0, 1]
+    assert list(start) == [1, 4, 0]
+    assert list(stop) == [3, 5, 5]
+    assert list(first_per_row(row, start, 3)) == [1, 0, -1]
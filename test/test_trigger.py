@@ -0,0 +1,48 @@
+from dimep.trigger import detect, estimate_threshold
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def recording():
+    recording = np.random.randn(2, 50000)
+    pulses = np.arange(1000, 50000, 4999)
+    for pulse in pulses:
+        # a ringing artifact, which crosses the threshold several times
+        recording[0, pulse : pulse + 20 : 2] = 1000
+    yield recording, pulses
+
+
+def test_detect(recording):
+    recording, pulses = recording
+    assert np.array_equal(detect(recording, fs=1000, threshold=100), pulses)
+    assert np.array_equal(detect(recording, fs=1000), pulses)
+    assert np.array_equal(detect(recording[0], fs=1000, slope=True), pulses)
+    assert np.array_equal(detect(recording.T, fs=1000, axis=0), pulses)
+
+
+def test_detect_refractory(recording):
+    recording, pulses = recording
+    # without refractory period, each crossing of the artifact counts
+    assert len(detect(recording, 1000, 100, refractory_in_ms=0)) == 10 * len(
+        pulses
+    )
+    # too long a refractory period swallows every second pulse
+    found = detect(recording, 1000, 100, refractory_in_ms=6000)
+    assert np.array_equal(found, pulses[::2])
+
+
+@pytest.mark.parametrize("chunksize", [7, 1000, 4999, 2 ** 20])
+def test_detect_chunked(recording, chunksize, tmp_path):
+    recording, pulses = recording
+    fname = tmp_path / "recording.npy"
+    np.save(fname, recording)
+    memmap = np.load(fname, mmap_mode="r")
+    found = detect(memmap, 1000, threshold=100, chunksize=chunksize)
+    assert np.array_equal(found, pulses)
+
+
+def test_estimate_threshold():
+    noise = np.random.randn(100000)
+    threshold = estimate_threshold(noise, relative_threshold=3)
+    assert 2 < threshold < 4